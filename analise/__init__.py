@@ -0,0 +1,2 @@
+# analise/__init__.py
+# Núcleo da página de Análise de Dados (GitHub): backends de consulta, SQL e fixtures offline.
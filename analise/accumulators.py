@@ -0,0 +1,265 @@
+# analise/accumulators.py
+# Acumuladores mergeáveis (Welford/Chan) para as estatísticas da página: processam a visão por repo
+# em pedaços (DataFrame, RecordBatch ou bucket cacheado) e se combinam entre pedaços/workers
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from analise.inference import fisher_ci, pearson_from_moments, welch_from_moments
+from analise.sketches import GroupedDigests
+
+METRICS = ("log10_total_bytes", "total_bytes")
+
+
+@dataclass
+class Moments:
+    """n, média e M2 = Σ(x − média)²; merge exato pela fórmula de Chan et al."""
+
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    @classmethod
+    def from_array(cls, x) -> "Moments":
+        x = np.asarray(x, dtype=float)
+        if len(x) == 0:
+            return cls()
+        mean = float(x.mean())
+        return cls(len(x), mean, float(((x - mean) ** 2).sum()))
+
+    @classmethod
+    def from_stats(cls, n: int, mean: float, var: float) -> "Moments":
+        """A partir de n, média e variância amostral (ddof=1) — ex.: saída do pushdown em SQL."""
+        n = int(n)
+        return cls(n, float(mean) if n else 0.0, float(var) * (n - 1) if n > 1 else 0.0)
+
+    def update(self, x) -> "Moments":
+        return self.merge(Moments.from_array(x))
+
+    def merge(self, other: "Moments") -> "Moments":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def var(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.var))
+
+
+@dataclass
+class CoMoments:
+    """Momentos conjuntos de (x, y): médias, M2 de cada um e C = Σ(x − x̄)(y − ȳ)."""
+
+    n: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0
+    m2_y: float = 0.0
+    c_xy: float = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y) -> "CoMoments":
+        x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return cls()
+        mx, my = float(x.mean()), float(y.mean())
+        dx, dy = x - mx, y - my
+        return cls(len(x), mx, my, float(dx @ dx), float(dy @ dy), float(dx @ dy))
+
+    @classmethod
+    def from_stats(cls, n: int, mean_x: float, mean_y: float, var_x: float, var_y: float, cov_xy: float) -> "CoMoments":
+        n = int(n); k = n - 1 if n > 1 else 0
+        return cls(n, float(mean_x), float(mean_y), float(var_x) * k, float(var_y) * k, float(cov_xy) * k)
+
+    def update(self, x, y) -> "CoMoments":
+        return self.merge(CoMoments.from_arrays(x, y))
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        n = self.n + other.n
+        dx, dy = other.mean_x - self.mean_x, other.mean_y - self.mean_y
+        w = self.n * other.n / n
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.m2_x += other.m2_x + dx * dx * w
+        self.m2_y += other.m2_y + dy * dy * w
+        self.c_xy += other.c_xy + dx * dy * w
+        self.n = n
+        return self
+
+    def pearson(self) -> tuple[float, float]:
+        """(r, p bilateral)."""
+        if self.n < 3:
+            return np.nan, np.nan
+        k = self.n - 1
+        return pearson_from_moments(self.n, self.c_xy / k, self.m2_x / k, self.m2_y / k)
+
+
+@dataclass
+class GroupedMoments:
+    """Um `Moments` por chave (ex.: linguagem dominante), com update vetorizado por pedaço."""
+
+    groups: dict = field(default_factory=dict)
+
+    def update(self, keys, values) -> "GroupedMoments":
+        codes, uniques = pd.factorize(np.asarray(keys, dtype=object), sort=False)
+        x = np.asarray(values, dtype=float)
+        ok = codes >= 0
+        codes, x = codes[ok], x[ok]
+        k = len(uniques)
+        n = np.bincount(codes, minlength=k)
+        mean = np.bincount(codes, weights=x, minlength=k) / np.maximum(n, 1)
+        m2 = np.bincount(codes, weights=(x - mean[codes]) ** 2, minlength=k)
+        for key, n_i, mean_i, m2_i in zip(uniques, n, mean, m2):
+            if n_i:
+                self.groups.setdefault(key, Moments()).merge(Moments(int(n_i), float(mean_i), float(m2_i)))
+        return self
+
+    def merge(self, other: "GroupedMoments") -> "GroupedMoments":
+        for key, m in other.groups.items():
+            self.groups.setdefault(key, Moments()).merge(Moments(m.n, m.mean, m.m2))
+        return self
+
+    def to_frame(self, key_name: str = "key") -> pd.DataFrame:
+        rows = [(key, m.n, m.mean, m.std) for key, m in self.groups.items()]
+        return (pd.DataFrame(rows, columns=[key_name, "count", "mean", "std"])
+                .sort_values("count", ascending=False).reset_index(drop=True))
+
+
+def _columns(chunk) -> dict:
+    """Colunas de um pedaço (DataFrame, pa.Table ou pa.RecordBatch) como arrays NumPy."""
+    names = ("dominant_language", "num_languages", "total_bytes")
+    if isinstance(chunk, (pa.Table, pa.RecordBatch)):
+        out = {}
+        for name in names:
+            col = chunk.column(name)
+            if pa.types.is_dictionary(col.type):
+                col = col.cast(col.type.value_type)
+            out[name] = col.to_numpy(zero_copy_only=False)
+        return out
+    return {name: chunk[name].to_numpy() for name in names}
+
+
+@dataclass
+class PerRepoAccumulator:
+    """Tudo que a página reporta a partir da visão por repo, em memória constante:
+
+    - `by_language[metric]`: tabela descritiva (count/mean/std) por linguagem dominante;
+    - `quantiles[metric]`: t-digest por linguagem dominante → mediana e quartis (boxplot);
+    - `corr`: co-momentos (num_languages, log10_total_bytes) → Pearson r e IC de Fisher;
+    - `mono` / `multi`: momentos de log10_total_bytes → Welch.
+    """
+
+    by_language: dict = field(default_factory=lambda: {m: GroupedMoments() for m in METRICS})
+    quantiles: dict = field(default_factory=lambda: {m: GroupedDigests() for m in METRICS})
+    corr: CoMoments = field(default_factory=CoMoments)
+    mono: Moments = field(default_factory=Moments)
+    multi: Moments = field(default_factory=Moments)
+
+    def update(self, chunk) -> "PerRepoAccumulator":
+        cols = _columns(chunk)
+        total = cols["total_bytes"].astype(float)
+        values = {"log10_total_bytes": np.log10(total + 1), "total_bytes": total}
+        k = cols["num_languages"].astype(float)
+        for metric, grouped in self.by_language.items():
+            grouped.update(cols["dominant_language"], values[metric])
+        for metric, digests in self.quantiles.items():
+            digests.update(cols["dominant_language"], values[metric])
+        self.corr.update(k, values["log10_total_bytes"])
+        self.mono.update(values["log10_total_bytes"][k == 1])
+        self.multi.update(values["log10_total_bytes"][k >= 2])
+        return self
+
+    def merge(self, other: "PerRepoAccumulator") -> "PerRepoAccumulator":
+        for metric, grouped in other.by_language.items():
+            self.by_language.setdefault(metric, GroupedMoments()).merge(grouped)
+        for metric, digests in other.quantiles.items():
+            self.quantiles.setdefault(metric, GroupedDigests()).merge(digests)
+        self.corr.merge(other.corr)
+        self.mono.merge(other.mono)
+        self.multi.merge(other.multi)
+        return self
+
+    def describe(self, metric: str) -> pd.DataFrame:
+        """count/mean/std exatos por linguagem; median estimada pelo t-digest."""
+        desc = self.by_language[metric].to_frame("dominant_language")
+        medians = {k: d.quantile(0.5)[0] for k, d in self.quantiles[metric].groups.items()}
+        desc.insert(3, "median", desc["dominant_language"].map(medians).astype(float))
+        return desc
+
+    def box_quartiles(self, metric: str, top: int = 10) -> pd.DataFrame:
+        """Quartis (t-digest) das `top` linguagens com mais repos; bigodes = cercas de Tukey limitadas a mín/máx."""
+        q = self.quantiles[metric].quantiles([0.25, 0.5, 0.75], "dominant_language")
+        q.columns = ["dominant_language", "n", "q1", "median", "q3"]
+        q = q.sort_values("n", ascending=False).head(top).reset_index(drop=True)
+        extents = {k: (d.min, d.max) for k, d in self.quantiles[metric].groups.items()}
+        q["min"] = q["dominant_language"].map(lambda k: extents[k][0])
+        q["max"] = q["dominant_language"].map(lambda k: extents[k][1])
+        iqr = q["q3"] - q["q1"]
+        q["whisker_lo"] = np.maximum(q["min"], q["q1"] - 1.5 * iqr)
+        q["whisker_hi"] = np.minimum(q["max"], q["q3"] + 1.5 * iqr)
+        return q
+
+    def to_state(self) -> tuple[pa.Table, dict]:
+        """(centróides dos digests em Arrow, momentos em JSON) — formato gravado no DiskCache."""
+        parts, extents = [], {}
+        for metric, digests in self.quantiles.items():
+            keys, means, weights, ext = digests.to_arrays()
+            parts.append(pa.table({"metric": pa.array([metric] * len(keys), pa.string()),
+                                   "key": pa.array(keys, pa.string()), "mean": means, "weight": weights}))
+            extents[metric] = ext
+        meta = {
+            "moments": {metric: {k: [m.n, m.mean, m.m2] for k, m in g.groups.items()}
+                        for metric, g in self.by_language.items()},
+            "extents": extents,
+            "corr": list(self.corr.__dict__.values()),
+            "mono": [self.mono.n, self.mono.mean, self.mono.m2],
+            "multi": [self.multi.n, self.multi.mean, self.multi.m2],
+        }
+        return pa.concat_tables(parts), meta
+
+    @classmethod
+    def from_state(cls, table: pa.Table, meta: dict) -> "PerRepoAccumulator":
+        acc = cls()
+        metric_col = table.column("metric").to_numpy(zero_copy_only=False)
+        keys = table.column("key").to_numpy(zero_copy_only=False)
+        means = table.column("mean").to_numpy()
+        weights = table.column("weight").to_numpy()
+        for metric, ext in meta["extents"].items():
+            mask = metric_col == metric
+            acc.quantiles[metric] = GroupedDigests.from_arrays(keys[mask], means[mask], weights[mask], ext)
+        for metric, groups in meta["moments"].items():
+            acc.by_language[metric] = GroupedMoments({k: Moments(*v) for k, v in groups.items()})
+        acc.corr = CoMoments(*meta["corr"])
+        acc.mono, acc.multi = Moments(*meta["mono"]), Moments(*meta["multi"])
+        return acc
+
+    def correlation(self, alpha=0.05) -> tuple[float, float, float, float, int]:
+        """(r, p, r_low, r_high, n)."""
+        r, p = self.corr.pearson()
+        r_low, r_high = fisher_ci(r, self.corr.n, alpha=alpha)
+        return r, p, r_low, r_high, self.corr.n
+
+    def welch(self, alpha=0.05):
+        """Welch (multi − mono) em log10; mesmo retorno de `welch_t_ci`."""
+        return welch_from_moments(self.multi.mean, self.multi.var, self.multi.n,
+                                  self.mono.mean, self.mono.var, self.mono.n, alpha=alpha)
@@ -0,0 +1,120 @@
+# analise/analysis.py
+# Etapas da análise sobre a visão por repo (modo linhas) — funções puras, sem Streamlit
+
+import numpy as np
+import pandas as pd
+
+from analise.inference import fisher_ci, welch_t_ci
+
+
+def add_log10(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia da visão por repo com `log10_total_bytes` (log10(total_bytes + 1))."""
+    df = df.copy()
+    df["log10_total_bytes"] = np.log10(df["total_bytes"] + 1)
+    return df
+
+
+def top_shares(df_top: pd.DataFrame) -> tuple[str | None, float, float]:
+    """(linguagem líder, % do líder, % das 3 primeiras) dentro do Top-N por bytes."""
+    if not len(df_top):
+        return None, np.nan, np.nan
+    total = df_top["total_bytes"].sum()
+    top1 = df_top.iloc[0]["total_bytes"] / total * 100 if total else np.nan
+    top3 = df_top.iloc[:3]["total_bytes"].sum() / total * 100 if len(df_top) >= 3 and total else np.nan
+    return df_top.iloc[0]["language_name"], float(top1), float(top3)
+
+
+def describe(df: pd.DataFrame, metric: str, top: int = 20) -> pd.DataFrame:
+    """count/mean/median/std por linguagem dominante, ordenado por contagem."""
+    return (
+        df.groupby("dominant_language", observed=True)[metric]
+        .agg(["count", "mean", "median", "std"])
+        .reset_index()
+        .sort_values("count", ascending=False)
+        .head(top)
+    )
+
+
+def hist_bins(df: pd.DataFrame, metric: str, maxbins: int = 50) -> pd.DataFrame:
+    """Histograma de largura fixa → (bin_start, bin_end, count), mesmo formato de `pushdown.hist_bins`."""
+    values = df[metric].to_numpy(dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return pd.DataFrame(columns=["bin_start", "bin_end", "count"])
+    lo, hi = float(values.min()), float(values.max())
+    nbins = 1 if np.isclose(lo, hi) else maxbins
+    counts, edges = np.histogram(values, bins=nbins, range=(lo, hi if hi > lo else lo + 1))
+    return pd.DataFrame({"bin_start": edges[:-1], "bin_end": edges[1:], "count": counts})
+
+
+def box_quartiles(df: pd.DataFrame, metric: str, top: int = 10) -> pd.DataFrame:
+    """Quartis e bigodes de Tukey (1,5×IQR) das `top` linguagens dominantes mais frequentes.
+
+    Colunas: dominant_language, n, min, whisker_lo, q1, median, q3, whisker_hi, max, outliers.
+    """
+    codes, langs = pd.factorize(df["dominant_language"])  # categórico: usa os códigos, sem comparar strings
+    counts = np.bincount(codes[codes >= 0], minlength=len(langs))
+    values = df[metric].to_numpy(dtype=float)
+    rows = []
+    for i in np.argsort(-counts, kind="stable")[:top]:
+        lang = langs[i]
+        v = values[codes == i]
+        v = v[np.isfinite(v)]
+        if not len(v):
+            continue
+        vmin, q1, med, q3, vmax = np.quantile(v, [0, 0.25, 0.5, 0.75, 1])
+        inside = v[(v >= q1 - 1.5 * (q3 - q1)) & (v <= q3 + 1.5 * (q3 - q1))]
+        rows.append([lang, len(v), vmin, inside.min(), q1, med, q3, inside.max(), vmax, len(v) - len(inside)])
+    return pd.DataFrame(rows, columns=["dominant_language", "n", "min", "whisker_lo", "q1", "median", "q3",
+                                       "whisker_hi", "max", "outliers"])
+
+
+def scatter_bins(df: pd.DataFrame, x: str = "num_languages", y: str = "log10_total_bytes",
+                 ybins: int = 40) -> pd.DataFrame:
+    """Densidade 2D para o scatter: uma coluna por valor inteiro de `x`, `ybins` faixas em `y`.
+
+    Devolve só as células não vazias: (x_start, x_end, y_start, y_end, count).
+    """
+    xs = df[x].to_numpy(dtype=np.int64)
+    ys = df[y].to_numpy(dtype=float)
+    ok = np.isfinite(ys)
+    xs, ys = xs[ok], ys[ok]
+    if not len(xs):
+        return pd.DataFrame(columns=["x_start", "x_end", "y_start", "y_end", "count"])
+    x0, nx = int(xs.min()), int(xs.max() - xs.min()) + 1
+    lo, hi = float(ys.min()), float(ys.max())
+    width = (hi - lo) / ybins if hi > lo else 1.0
+    yi = np.minimum(((ys - lo) / width).astype(np.int64), ybins - 1)
+    counts = np.bincount((xs - x0) * ybins + yi, minlength=nx * ybins)
+    cells = np.flatnonzero(counts)
+    cx, cy = np.divmod(cells, ybins)
+    return pd.DataFrame({
+        "x_start": x0 + cx - 0.5, "x_end": x0 + cx + 0.5,
+        "y_start": lo + cy * width, "y_end": lo + (cy + 1) * width,
+        "count": counts[cells],
+    })
+
+
+def correlation(df: pd.DataFrame) -> tuple[float, float, float, float, int]:
+    """Pearson entre nº de linguagens e log10 do tamanho: (r, p, r_low, r_high, n)."""
+    from scipy import stats
+    corr_df = df[["num_languages", "log10_total_bytes"]].dropna()
+    n = len(corr_df)
+    if n < 4:
+        return np.nan, np.nan, np.nan, np.nan, n
+    r, p = stats.pearsonr(corr_df["num_languages"], corr_df["log10_total_bytes"])
+    r_low, r_high = fisher_ci(r, n)
+    return float(r), float(p), r_low, r_high, n
+
+
+def mono_multi(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """log10_total_bytes dos repos monolíngues e multilíngues (≥2 linguagens)."""
+    mono = df.loc[df["num_languages"] == 1, "log10_total_bytes"].dropna().to_numpy()
+    multi = df.loc[df["num_languages"] >= 2, "log10_total_bytes"].dropna().to_numpy()
+    return mono, multi
+
+
+def welch(mono: np.ndarray, multi: np.ndarray, alpha: float = 0.05) -> tuple:
+    """Welch multi − mono: (diff, t, p_two, df, lci, uci)."""
+    return welch_t_ci(multi, mono, alpha=alpha)
+
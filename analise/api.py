@@ -0,0 +1,299 @@
+# analise/api.py
+# Serviço HTTP (ASGI puro, sem framework) com as métricas da página: Top-N, descritivas por
+# linguagem, correlação e Welch
+#
+# Uso:
+#   ANALISE_BACKEND=local uvicorn analise.api:app --port 8000
+#   curl 'localhost:8000/v1/descriptives?sample_pct=10&scale=log10'
+#
+# Mesma camada de consulta da página: DiskCache (Top-N via CachedBackend, visão por repo via
+# BucketedPerRepo) e, no BigQuery, o Governor com o ledger compartilhado (sessão "api"). Em cima disso:
+# - versão dos dados = `backend.source_modified()` (relida a cada VERSION_TTL_S) → Last-Modified, e
+#   ETag = hash(rota, parâmetros, versão): um If-None-Match/If-Modified-Since válido responde 304 sem calcular;
+# - respostas prontas num LRU por (rota, parâmetros, versão);
+# - pedidos idênticos simultâneos esperam o mesmo cálculo (um Future por chave) em vez de repeti-lo;
+# - abaixo disso, um SingleFlight (lock em ANALISE_LOCKS_DIR) compartilhado pelo CachedBackend (Top-N)
+#   e pelo BucketedPerRepo (cada faixa de buckets e seus dry-runs): vários workers do uvicorn pedindo a
+#   mesma consulta ao mesmo tempo disparam um job só.
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qs
+
+from analise import analysis, pipeline, queries
+from analise.backends import make_backend
+from analise.buckets import BucketedPerRepo
+from analise.cache import CachedBackend, DiskCache
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.frames import compact_per_repo
+from analise.governor import DEFAULT_LEDGER_PATH, BudgetExceeded, ByteLedger, GovernedBackend, Governor
+from analise.report import to_jsonable
+from analise.sampling import DEFAULT_LOCAL_BUCKETED_DIR
+from analise.singleflight import DEFAULT_LOCKS_DIR, SingleFlight
+
+API_VERSION = "1"  # entra no ETag: mudar o formato das respostas invalida os ETags antigos
+VERSION_TTL_S = 60.0
+RESPONSE_CACHE_SIZE = 256
+FRAME_CACHE_SIZE = 4
+METRICS = {"log10": "log10_total_bytes", "linear": "total_bytes"}
+
+
+class BadRequest(ValueError):
+    """Parâmetro ausente/fora do intervalo → 400."""
+
+
+def _int(params: dict, name: str, default: int, lo: int, hi: int) -> int:
+    raw = params.get(name, [str(default)])[-1]
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} deve ser inteiro (recebido {raw!r})") from None
+    if not lo <= value <= hi:
+        raise BadRequest(f"{name} deve estar entre {lo} e {hi}")
+    return value
+
+
+def _float(params: dict, name: str, default: float, lo: float, hi: float) -> float:
+    raw = params.get(name, [str(default)])[-1]
+    try:
+        value = float(raw)
+    except ValueError:
+        raise BadRequest(f"{name} deve ser numérico (recebido {raw!r})") from None
+    if not lo < value < hi:
+        raise BadRequest(f"{name} deve estar em ({lo}, {hi})")
+    return value
+
+
+def _choice(params: dict, name: str, default: str, options) -> str:
+    value = params.get(name, [default])[-1]
+    if value not in options:
+        raise BadRequest(f"{name} deve ser um de {sorted(options)}")
+    return value
+
+
+class MetricsService:
+    """Cálculos das rotas (síncronos, rodam em threads) + versão dos dados."""
+
+    def __init__(self, backend, cache: DiskCache, flight: SingleFlight | None = None):
+        self.backend = backend  # sem CachedBackend: o BucketedPerRepo cacheia por bucket
+        self.cache = cache
+        self.cached = CachedBackend(backend, cache, flight=flight)
+        self.store = BucketedPerRepo(backend, cache, self.cached.flight)
+        self._version: tuple[float, float] | None = None  # (lido em, versão)
+        self._frames: OrderedDict = OrderedDict()
+        self.started_at = time.time()
+
+    @classmethod
+    def from_env(cls) -> "MetricsService":
+        kind = os.environ.get("ANALISE_BACKEND", "bigquery")
+        backend = make_backend(kind, local_path=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH),
+                               location=os.environ.get("ANALISE_LOCATION", "US"),
+                               bucketed=os.environ.get("ANALISE_BUCKETED_TABLE") if kind == "bigquery"
+                               else os.environ.get("ANALISE_LOCAL_BUCKETED", DEFAULT_LOCAL_BUCKETED_DIR))
+        if kind == "bigquery":
+            governor = Governor(ByteLedger(os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)),
+                                daily_budget=int(float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0")) * 1024**3),
+                                session_resolver=lambda: "api")
+            backend = GovernedBackend(backend, governor)
+        cache = DiskCache(os.environ.get("ANALISE_CACHE_DIR", os.path.join("data", "cache")))
+        return cls(backend, cache, SingleFlight(os.environ.get("ANALISE_LOCKS_DIR", DEFAULT_LOCKS_DIR)))
+
+    def version(self) -> float:
+        """Última modificação da fonte (segundos inteiros, como no Last-Modified); relida a cada VERSION_TTL_S."""
+        now = time.time()
+        if self._version is None or now - self._version[0] > VERSION_TTL_S:
+            modified = self.backend.source_modified()
+            self._version = (now, float(int(modified if modified is not None else self.started_at)))
+        return self._version[1]
+
+    def per_repo(self, sample_pct: int, version: float):
+        """Visão por repo já transformada (log10), com fingerprint — as etapas do pipeline memoizam em cima dela."""
+        key = (sample_pct, version)
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return self._frames[key]
+        table, _, _ = self.store.load(sample_pct)
+        df = pipeline.transform(pipeline.with_fingerprint(compact_per_repo(table)))
+        self._frames[key] = df
+        while len(self._frames) > FRAME_CACHE_SIZE:
+            self._frames.popitem(last=False)
+        return df
+
+    def top_languages(self, top_n: int) -> dict:
+        spec = queries.top_langs(top_n, self.backend.dialect)
+        df = spec.apply(self.cached.query(spec.sql)[0])
+        top1_name, top1_share, top3_share = analysis.top_shares(df)
+        return {"top_n": top_n, "languages": df, "top1_name": top1_name,
+                "top1_share": top1_share, "top3_share": top3_share}
+
+    def descriptives(self, sample_pct: int, scale: str, top: int, version: float) -> dict:
+        df = self.per_repo(sample_pct, version)
+        return {"sample_pct": sample_pct, "scale": scale, "metric": METRICS[scale], "n_repos": len(df),
+                "languages": pipeline.descriptives(df, METRICS[scale], top=top)}
+
+    def correlation(self, sample_pct: int, version: float) -> dict:
+        r, p, r_low, r_high, n = pipeline.correlation(self.per_repo(sample_pct, version))
+        return {"sample_pct": sample_pct, "method": "pearson", "x": "num_languages", "y": "log10_total_bytes",
+                "r": r, "p": p, "ci95": [r_low, r_high], "n": n}
+
+    def welch(self, sample_pct: int, alpha: float, version: float) -> dict:
+        n_mono, n_multi, result = pipeline.welch(self.per_repo(sample_pct, version), alpha=alpha)
+        out = {"sample_pct": sample_pct, "alpha": alpha, "metric": "log10_total_bytes",
+               "n_mono": n_mono, "n_multi": n_multi, "result": None}
+        if result is not None:
+            diff, tval, p_two, dfw, lci, uci = result
+            p_one = (p_two / 2) if diff > 0 else 1 - (p_two / 2)
+            out["result"] = {"diff": diff, "t": tval, "df": dfw, "p_two_sided": p_two, "p_one_sided": p_one,
+                             "ci": [lci, uci], "factor": 10 ** diff}
+        return out
+
+
+class MetricsAPI:
+    """Aplicação ASGI: roteamento, cabeçalhos de validação, cache de respostas e coalescência."""
+
+    def __init__(self, service_factory=MetricsService.from_env):
+        self._factory = service_factory
+        self._service: MetricsService | None = None
+        self._responses: OrderedDict = OrderedDict()  # chave → corpo JSON
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "not_modified": 0, "hits": 0, "coalesced": 0, "computed": 0, "errors": 0}
+        self.routes = {
+            "/v1/top-languages": self._top_languages,
+            "/v1/descriptives": self._descriptives,
+            "/v1/correlation": self._correlation,
+            "/v1/welch": self._welch,
+        }
+
+    @property
+    def service(self) -> MetricsService:
+        if self._service is None:  # só no primeiro pedido: importar o módulo não abre o backend
+            self._service = self._factory()
+        return self._service
+
+    # Cada rota devolve (parâmetros normalizados, função que calcula o corpo) — a chave não depende
+    # da ordem/forma dos parâmetros na URL
+    def _top_languages(self, params, version):
+        top_n = _int(params, "top_n", 20, 1, 100)
+        return {"top_n": top_n}, lambda: self.service.top_languages(top_n)
+
+    def _descriptives(self, params, version):
+        pct = _int(params, "sample_pct", 10, 1, 100)
+        scale = _choice(params, "scale", "log10", METRICS)
+        top = _int(params, "top", 20, 1, 100)
+        return ({"sample_pct": pct, "scale": scale, "top": top},
+                lambda: self.service.descriptives(pct, scale, top, version))
+
+    def _correlation(self, params, version):
+        pct = _int(params, "sample_pct", 10, 1, 100)
+        return {"sample_pct": pct}, lambda: self.service.correlation(pct, version)
+
+    def _welch(self, params, version):
+        pct = _int(params, "sample_pct", 10, 1, 100)
+        alpha = _float(params, "alpha", 0.05, 0.0, 1.0)
+        return {"sample_pct": pct, "alpha": alpha}, lambda: self.service.welch(pct, alpha, version)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        self.stats["requests"] += 1
+        status, headers, body = await self._handle(scope)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+        await send({"type": "http.response.body", "body": body if scope["method"] != "HEAD" else b""})
+
+    async def _handle(self, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            return self._json(405, {"error": "use GET"})
+        path = scope["path"].rstrip("/") or "/"
+        if path == "/health":
+            return self._json(200, {"status": "ok", "stats": self.stats, "inflight": len(self._inflight),
+                                    "single_flight": self.service.cached.flight.stats()})
+        route = self.routes.get(path)
+        if route is None:
+            return self._json(404, {"error": f"rota desconhecida: {path}", "routes": sorted(self.routes)})
+
+        params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            version = await asyncio.to_thread(self.service.version)
+            normalized, compute = route(params, version)
+        except BadRequest as e:
+            return self._json(400, {"error": str(e)})
+        key = json.dumps([path, normalized, version], sort_keys=True)
+        etag = '"' + hashlib.sha256(f"{API_VERSION}|{key}".encode()).hexdigest()[:32] + '"'
+        validators = [("ETag", etag), ("Last-Modified", formatdate(version, usegmt=True)),
+                      ("Cache-Control", f"public, max-age={int(VERSION_TTL_S)}")]
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        if self._not_modified(request_headers, etag, version):
+            self.stats["not_modified"] += 1
+            return 304, validators, b""
+
+        try:
+            body, how = await self._body(key, compute)
+        except BudgetExceeded as e:
+            return self._json(429, {"error": str(e)})
+        except Exception as e:  # noqa: BLE001 — erro do backend vira 502 com a mensagem
+            self.stats["errors"] += 1
+            return self._json(502, {"error": f"{type(e).__name__}: {e}"})
+        return 200, [("Content-Type", "application/json; charset=utf-8"), *validators, ("X-Cache", how)], body
+
+    @staticmethod
+    def _not_modified(headers: dict, etag: str, version: float) -> bool:
+        if "if-none-match" in headers:  # tem precedência sobre If-Modified-Since (RFC 9110)
+            tags = [t.strip() for t in headers["if-none-match"].split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if "if-modified-since" in headers:
+            try:
+                return version <= parsedate_to_datetime(headers["if-modified-since"]).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def _body(self, key: str, compute) -> tuple[bytes, str]:
+        """Corpo da resposta e como foi obtido: "hit" (LRU), "coalesced" (esperou outro pedido) ou "miss"."""
+        if key in self._responses:
+            self._responses.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._responses[key], "hit"
+        if key in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key]), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await asyncio.to_thread(compute)
+            body = json.dumps(to_jsonable(value), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # marca como lida: sem "exception was never retrieved" se ninguém esperava
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.stats["computed"] += 1
+        future.set_result(body)
+        self._responses[key] = body
+        while len(self._responses) > RESPONSE_CACHE_SIZE:
+            self._responses.popitem(last=False)
+        return body, "miss"
+
+    @staticmethod
+    def _json(status: int, payload: dict):
+        body = json.dumps(to_jsonable(payload), ensure_ascii=False).encode("utf-8")
+        return status, [("Content-Type", "application/json; charset=utf-8")], body
+
+
+app = MetricsAPI()
@@ -0,0 +1,198 @@
+# analise/backends.py
+# Backends de consulta: BigQuery (produção) e DuckDB sobre Parquet (offline, dev/CI)
+
+import glob
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from analise.fixtures import DEFAULT_FIXTURE_PATH, ensure_fixture
+from analise import queries
+from analise.queries import LANGUAGES_TABLE
+
+
+class QueryBackend:
+    """Interface comum usada pela página: consulta, dry-run e teste de conexão."""
+
+    name = "base"
+    dialect = "bigquery"
+    location = None
+
+    def query_arrow(self, sql: str) -> tuple[pa.Table, int]:
+        """Retorna (tabela Arrow, bytes processados)."""
+        raise NotImplementedError
+
+    def query(self, sql: str) -> tuple[pd.DataFrame, int]:
+        """Retorna (DataFrame, bytes processados)."""
+        table, bytes_processed = self.query_arrow(sql)
+        return table.to_pandas(), bytes_processed
+
+    def estimate_bytes(self, sql: str) -> int:
+        raise NotImplementedError
+
+    def profile(self, sql: str) -> dict:
+        """Executa `sql` sem cache de resultados e devolve métricas de execução (para benchmarks).
+
+        Campos: elapsed_s (wall, com download), bytes_processed, rows; slot_ms / shuffle_bytes / stages
+        só quando o motor informa (None aqui).
+        """
+        t0 = time.perf_counter()
+        table, bytes_processed = self.query_arrow(sql)
+        return {"elapsed_s": time.perf_counter() - t0, "bytes_processed": bytes_processed, "rows": table.num_rows,
+                "slot_ms": None, "shuffle_bytes": None, "stages": None}
+
+    def ping(self) -> None:
+        """Levanta exceção se o backend não estiver acessível."""
+        self.query("SELECT 1 AS ok")
+
+    def execute(self, sql: str) -> int:
+        """Roda DDL/DML (sem resultado) e devolve os bytes processados."""
+        raise NotImplementedError
+
+    def source_modified(self) -> float | None:
+        """Timestamp (epoch) da última alteração da tabela de origem, se o backend souber informar."""
+        return None
+
+
+class BigQueryBackend(QueryBackend):
+    name = "bigquery"
+    dialect = "bigquery"
+
+    def __init__(self, client, location: str = "US", read_client=None, bucketed_table: str | None = None):
+        self.client = client
+        self.location = location
+        self.read_client = read_client  # BigQueryReadClient (Storage Read API), reaproveitado entre consultas
+        # cópia particionada por bucket (`python -m analise.sampling create`): amostras leem só as partições
+        self.bucketed_table = bucketed_table
+        if bucketed_table:
+            self.dialect = queries.bucketed_dialect("bigquery", bucketed_table)
+
+    def query_arrow(self, sql: str) -> tuple[pa.Table, int]:
+        job = self.client.query(sql, location=self.location)
+        # com read_client, o download usa streams paralelos da Storage Read API e já chega em Arrow
+        table = job.result().to_arrow(bqstorage_client=self.read_client,
+                                      create_bqstorage_client=self.read_client is None)
+        bytes_processed = getattr(job, "total_bytes_processed", None)
+        return table, (int(bytes_processed) if bytes_processed is not None else -1)
+
+    def estimate_bytes(self, sql: str) -> int:
+        from google.cloud.bigquery import QueryJobConfig
+        qcfg = QueryJobConfig(dry_run=True, use_query_cache=False)
+        job = self.client.query(sql, location=self.location, job_config=qcfg)
+        return int(job.total_bytes_processed)
+
+    def profile(self, sql: str) -> dict:
+        from google.cloud.bigquery import QueryJobConfig
+        t0 = time.perf_counter()
+        job = self.client.query(sql, location=self.location, job_config=QueryJobConfig(use_query_cache=False))
+        table = job.result().to_arrow(bqstorage_client=self.read_client, create_bqstorage_client=self.read_client is None)
+        plan = job.query_plan or []
+        return {
+            "elapsed_s": time.perf_counter() - t0,
+            "exec_s": (job.ended - job.started).total_seconds() if job.ended and job.started else None,
+            "bytes_processed": int(job.total_bytes_processed or 0),
+            "rows": table.num_rows,
+            "slot_ms": job.slot_millis,
+            "shuffle_bytes": sum(int(s.shuffle_output_bytes or 0) for s in plan),
+            "stages": len(plan),
+        }
+
+    def execute(self, sql: str) -> int:
+        job = self.client.query(sql, location=self.location)
+        job.result()
+        return int(job.total_bytes_processed or 0)
+
+    def source_modified(self) -> float | None:
+        # metadado: não processa bytes
+        modified = self.client.get_table(self.bucketed_table or LANGUAGES_TABLE).modified
+        return modified.timestamp() if modified is not None else None
+
+
+class LocalBackend(QueryBackend):
+    """DuckDB sobre Parquet no formato de `github_repos.languages` (view `languages`).
+
+    Sem rede e sem custo: serve para perfilar/benchmarkar a página e como fallback
+    quando o BigQuery está indisponível ou lento.
+    """
+
+    name = "local"
+    dialect = "duckdb"
+    location = "local"
+
+    def __init__(self, path: str = DEFAULT_FIXTURE_PATH, bucketed_path: str | None = None):
+        import duckdb
+        if not os.path.isdir(path):
+            path = ensure_fixture(path)
+        self.path = path
+        self.files = sorted(glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True)) if os.path.isdir(path) else [path]
+        if not self.files:
+            raise FileNotFoundError(f"Nenhum Parquet encontrado em {path}")
+        self._con = duckdb.connect(database=":memory:")
+        files_sql = ", ".join("'" + f.replace("'", "''") + "'" for f in self.files)
+        self._con.execute(f"CREATE VIEW languages AS SELECT * FROM read_parquet([{files_sql}])")
+        # cópia particionada por bucket (Hive: bucket=N/*.parquet), se existir: vira a fonte das consultas
+        self.bucketed_files = sorted(glob.glob(os.path.join(bucketed_path, "bucket=*", "*.parquet"))) if bucketed_path else []
+        if self.bucketed_files:
+            pattern = os.path.join(bucketed_path, "bucket=*", "*.parquet").replace("'", "''")
+            self._con.execute(f"CREATE VIEW {queries.BUCKETED_LOCAL_VIEW} AS "
+                              f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, "
+                              "hive_types = {'bucket': INTEGER})")  # mesmo tipo do hash() % 100 da tabela original
+            self.dialect = queries.bucketed_dialect("duckdb", queries.BUCKETED_LOCAL_VIEW)
+
+    def _scan_bytes(self, sql: str | None = None) -> int:
+        # DuckDB não tem dry-run: usamos o tamanho dos arquivos lidos como estimativa (scan completo).
+        # Na cópia particionada, o EXPLAIN informa quantas partições sobram após a poda ("Scanning Files: a/b").
+        full = int(sum(os.path.getsize(f) for f in self.files))
+        if not self.bucketed_files or sql is None or queries.BUCKETED_LOCAL_VIEW not in sql:
+            return full
+        plan = self._con.cursor().execute("EXPLAIN (FORMAT JSON) " + sql).fetchall()[0][1]
+        scans = [int(a) / int(b) for a, b in re.findall(r'"Scanning Files":\s*"(\d+)/(\d+)"', plan)]
+        total = sum(os.path.getsize(f) for f in self.bucketed_files)
+        return int(total * (sum(scans) if scans else 1.0))
+
+    def query_arrow(self, sql: str) -> tuple[pa.Table, int]:
+        # cursor() = conexão duplicada; seguro para uso a partir de threads diferentes
+        cur = self._con.cursor().execute(sql)
+        fetch = getattr(cur, "to_arrow_table", None) or cur.fetch_arrow_table  # nome mudou no DuckDB 1.4
+        return _bigquery_like_types(fetch()), self._scan_bytes(sql)
+
+    def estimate_bytes(self, sql: str) -> int:
+        return self._scan_bytes(sql)
+
+    def execute(self, sql: str) -> int:
+        self._con.cursor().execute(sql)
+        return self._scan_bytes(sql)
+
+    def source_modified(self) -> float | None:
+        return max(os.path.getmtime(f) for f in self.files + self.bucketed_files)
+
+
+def make_backend(kind: str, local_path: str = DEFAULT_FIXTURE_PATH, location: str = "US",
+                 bucketed: str | None = None) -> QueryBackend:
+    """Backend fora do Streamlit (CLI/jobs): BigQuery via ADC (`gcloud auth application-default login`) ou local.
+
+    `bucketed`: cópia particionada por bucket (tabela no BigQuery, diretório Hive no local), se houver.
+    """
+    if kind == "local":
+        return LocalBackend(local_path, bucketed_path=bucketed)
+    if kind != "bigquery":
+        raise ValueError(f"Backend desconhecido: {kind!r} (use 'bigquery' ou 'local')")
+    from google.cloud import bigquery
+    try:
+        from google.cloud import bigquery_storage
+        read_client = bigquery_storage.BigQueryReadClient()
+    except ImportError:
+        read_client = None
+    return BigQueryBackend(bigquery.Client(), location=location, read_client=read_client, bucketed_table=bucketed)
+
+
+def _bigquery_like_types(table: pa.Table) -> pa.Table:
+    """SUM(BIGINT) no DuckDB vira HUGEINT (decimal128 no Arrow); no BigQuery é INT64 — alinhamos os tipos."""
+    schema = pa.schema([
+        pa.field(f.name, pa.int64()) if pa.types.is_decimal(f.type) and f.type.scale == 0 else f
+        for f in table.schema
+    ])
+    return table if schema.equals(table.schema) else table.cast(schema)
@@ -0,0 +1,235 @@
+# analise/batch.py
+# Execução headless da análise + relatório para grades de parâmetros (sem Streamlit)
+#
+# Uso (fora do Streamlit):
+#   python -m analise.batch --backend local --sample-pct 5 10 --top-n 10 20 --scale log10 linear
+#   python -m analise.batch --backend bigquery --sample-pct 1 10 --out data/reports/$(date +%F)
+#
+# As consultas são feitas no processo principal, uma vez por consulta distinta e pelo mesmo DiskCache
+# da página: Top-N por valor de top_n, visão por repo por sample_pct (buckets compartilhados: 10%
+# reaproveita os buckets de 5%). Cada sample_pct vira uma tarefa no pool de processos: a visão por repo
+# vai por um arquivo Arrow IPC (memory-map, sem pickle) e as etapas que não dependem de top_n/scale
+# (log10, correlação, Welch, bootstrap) rodam uma vez por amostra.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+
+from analise import analysis, queries, resampling
+from analise.backends import make_backend
+from analise.buckets import BucketedPerRepo
+from analise.cache import CachedBackend, DiskCache
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.frames import compact_per_repo
+from analise.governor import DEFAULT_LEDGER_PATH, ByteLedger, GovernedBackend, Governor
+from analise.materialize import DEFAULT_MATERIALIZED_DIR, PER_REPO_COLUMNS, MaterializedPerRepo
+from analise.report import build_report_md, fmt_num, report_context, to_jsonable
+from analise.sampling import DEFAULT_LOCAL_BUCKETED_DIR
+
+DEFAULT_REPORTS_DIR = os.path.join("data", "reports")
+SCALES = ("log10", "linear")
+METRICS = {"log10": "log10_total_bytes", "linear": "total_bytes"}
+
+
+def grid(sample_pcts, top_ns, scales) -> list[dict]:
+    """Produto cartesiano dos parâmetros, na ordem (sample_pct, top_n, scale)."""
+    return [{"sample_pct": int(s), "top_n": int(t), "scale": sc}
+            for s, t, sc in itertools.product(sample_pcts, top_ns, scales)]
+
+
+def slug(config: dict) -> str:
+    return f"s{config['sample_pct']:03d}-top{config['top_n']:02d}-{config['scale']}"
+
+
+def _write_ipc(table: pa.Table, path: str) -> None:
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_ipc(path: str) -> pa.Table:
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def fetch(backend, cache: DiskCache, configs: list[dict], workdir: str,
+          materialized: MaterializedPerRepo | None = None, log=print) -> dict:
+    """Busca cada consulta distinta da grade uma vez só (o Top-N é uma consulta para todos os top_n).
+
+    Retorna {"tops": {top_n: DataFrame}, "per_repo": {sample_pct: caminho IPC}, "sources": {sample_pct: info}}.
+    """
+    cached = CachedBackend(backend, cache)
+    out = {"tops": {}, "per_repo": {}, "sources": {}}
+    top_ns = sorted({c["top_n"] for c in configs})
+    langs, b = cached.query(queries.top_langs(top_ns[0], backend.dialect).sql)  # o mesmo SQL para todo top_n
+    for top_n in top_ns:
+        out["tops"][top_n] = queries.top_langs(top_n, backend.dialect).apply(langs)
+    log(f"top_n={top_ns}: {len(langs)} linguagens numa consulta, {max(b, 0):,} bytes")
+    store = BucketedPerRepo(backend, cache, cached.flight)
+    for pct in sorted({c["sample_pct"] for c in configs}):
+        t0 = time.perf_counter()
+        if materialized is not None:
+            table, info = materialized.load(pct, PER_REPO_COLUMNS), {"source": "materializado", "bytes_processed": 0}
+        else:
+            table, b, info = store.load(pct)
+            info.update(source="buckets", bytes_processed=b)
+        path = os.path.join(workdir, f"per_repo-{pct:03d}.arrow")
+        _write_ipc(table, path)
+        out["per_repo"][pct] = path
+        out["sources"][pct] = {**info, "rows": table.num_rows, "fetch_s": time.perf_counter() - t0}
+        log(f"sample_pct={pct}: {table.num_rows:,} repos ({info['source']}, {info['bytes_processed']:,} bytes)")
+    return out
+
+
+def analyze_sample(path: str, sample_pct: int, configs: list[dict], tops: dict,
+                   n_resamples: int = 0, alpha: float = 0.05) -> list[dict]:
+    """Roda as etapas da página para uma amostra e todas as combinações (top_n, scale) dela."""
+    t0 = time.perf_counter()
+    df = analysis.add_log10(compact_per_repo(_read_ipc(path)))
+    corr = analysis.correlation(df)
+    mono, multi = analysis.mono_multi(df)
+    test = analysis.welch(mono, multi, alpha=alpha) if len(mono) > 5 and len(multi) > 5 else None
+    boot = None
+    if n_resamples and test is not None:
+        lci, uci = resampling.bootstrap_mean_diff(multi, mono, n_resamples, alpha=alpha)
+        _, p_perm = resampling.permutation_welch(multi, mono, n_resamples)
+        boot = {"lci": lci, "uci": uci, "p_perm": p_perm}
+    desc = {scale: analysis.describe(df, METRICS[scale], top=20) for scale in {c["scale"] for c in configs}}
+    shared_s = time.perf_counter() - t0
+
+    results = []
+    for config in configs:
+        ctx = report_context(config["top_n"], analysis.top_shares(tops[config["top_n"]]), corr, test, boot)
+        results.append({
+            "config": config,
+            "ctx": ctx,
+            "describe": desc[config["scale"]],
+            "report_md": build_report_md(ctx, calc_corr=True, calc_test=True),
+            "n_repos": len(df),
+            "analysis_s": shared_s,
+        })
+    return results
+
+
+def write_reports(results: list[dict], out_dir: str, meta: dict) -> str:
+    """Um .md e um .json por combinação + index.json/index.md com a grade inteira. Retorna o index.md."""
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    for res in results:
+        name = slug(res["config"])
+        with open(os.path.join(out_dir, f"{name}.md"), "w", encoding="utf-8") as f:
+            f.write(res["report_md"] + "\n")
+        doc = {k: res[k] for k in ("config", "ctx", "describe", "n_repos", "source")}
+        with open(os.path.join(out_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(to_jsonable(doc), f, indent=2, ensure_ascii=False)
+        ctx = res["ctx"]
+        rows.append({**res["config"], "report": f"{name}.md", "n_repos": res["n_repos"],
+                     "top1_name": ctx["top1_name"], "top1_share": ctx["top1_share"],
+                     "r": ctx.get("r"), "diff": ctx.get("diff"), "p_one": ctx.get("p_one")})
+
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(to_jsonable({**meta, "reports": rows}), f, indent=2, ensure_ascii=False)
+    lines = [
+        "# Relatórios por configuração",
+        "",
+        f"Backend: `{meta['backend']}` · gerado em {time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created_at']))}",
+        "",
+        "| amostra | top-N | escala | repos | líder | r | Δ (log10) | p (one-sided) | relatório |",
+        "|---:|---:|:---|---:|:---|---:|---:|---:|:---|",
+    ]
+    for row in rows:
+        lines.append(
+            f"| {row['sample_pct']}% | {row['top_n']} | {row['scale']} | {row['n_repos']:,} | {row['top1_name'] or '—'} "
+            f"| {fmt_num(row['r'])} | {fmt_num(row['diff'])} | {fmt_num(row['p_one'], '{:.3g}')} "
+            f"| [{row['report']}]({row['report']}) |"
+        )
+    path = os.path.join(out_dir, "index.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def run(backend, configs: list[dict], out_dir: str, cache: DiskCache, workers: int = 1,
+        materialized: MaterializedPerRepo | None = None, n_resamples: int = 0, log=print) -> str:
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="analise-batch-") as workdir:
+        data = fetch(backend, cache, configs, workdir, materialized, log=log)
+        fetch_s = time.perf_counter() - t0
+        by_sample = {}
+        for config in configs:
+            by_sample.setdefault(config["sample_pct"], []).append(config)
+
+        results = []
+        executor = resampling.make_pool(min(workers, len(by_sample))) if workers > 1 and len(by_sample) > 1 else None
+        try:
+            calls = [(data["per_repo"][pct], pct, group, {c["top_n"]: data["tops"][c["top_n"]] for c in group},
+                      n_resamples) for pct, group in by_sample.items()]
+            if executor is None:
+                parts = [analyze_sample(*args) for args in calls]
+            else:
+                parts = [f.result() for f in [executor.submit(analyze_sample, *args) for args in calls]]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        for part in parts:
+            for res in part:
+                res["source"] = data["sources"][res["config"]["sample_pct"]]
+                results.append(res)
+
+    meta = {
+        "created_at": time.time(), "backend": backend.name, "configs": len(configs),
+        "queries": {"top_n": sorted(data["tops"]), "sample_pct": sorted(data["per_repo"])},
+        "fetch_s": fetch_s, "total_s": time.perf_counter() - t0, "resamples": n_resamples,
+    }
+    return write_reports(results, out_dir, meta)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Roda a análise e gera relatórios (Markdown + JSON) para uma grade de parâmetros.")
+    parser.add_argument("--backend", choices=["bigquery", "local"], default=os.environ.get("ANALISE_BACKEND", "bigquery"))
+    parser.add_argument("--local-data", default=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH))
+    parser.add_argument("--location", default="US")
+    parser.add_argument("--bucketed", help="Cópia particionada por bucket (tabela no BigQuery / diretório no local); "
+                                           "padrão: ANALISE_BUCKETED_TABLE / ANALISE_LOCAL_BUCKETED.")
+    parser.add_argument("--sample-pct", type=int, nargs="+", default=[10])
+    parser.add_argument("--top-n", type=int, nargs="+", default=[20])
+    parser.add_argument("--scale", choices=SCALES, nargs="+", default=["log10"])
+    parser.add_argument("--resamples", type=int, default=0,
+                        help="Inclui IC bootstrap de Δ e p por permutação (0 = não calcula).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default=DEFAULT_REPORTS_DIR)
+    parser.add_argument("--cache-dir", default=os.environ.get("ANALISE_CACHE_DIR", os.path.join("data", "cache")))
+    parser.add_argument("--materialized-dir", default=os.environ.get("ANALISE_MATERIALIZED_DIR", DEFAULT_MATERIALIZED_DIR),
+                        help="Usada no lugar das consultas por bucket se estiver completa para o backend.")
+    parser.add_argument("--daily-budget-gb", type=float, default=float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0")),
+                        help="Orçamento diário de bytes no BigQuery (0 = sem limite); compartilha o ledger da página.")
+    args = parser.parse_args(argv)
+    if args.bucketed is None:
+        args.bucketed = (os.environ.get("ANALISE_BUCKETED_TABLE") if args.backend == "bigquery"
+                         else os.environ.get("ANALISE_LOCAL_BUCKETED", DEFAULT_LOCAL_BUCKETED_DIR))
+
+    backend = make_backend(args.backend, local_path=args.local_data, location=args.location, bucketed=args.bucketed)
+    if args.backend == "bigquery":
+        governor = Governor(ByteLedger(os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)),
+                            daily_budget=int(args.daily_budget_gb * 1024**3), session_resolver=lambda: "batch")
+        backend = GovernedBackend(backend, governor)
+    materialized = MaterializedPerRepo(args.materialized_dir)
+    materialized = materialized if materialized.available(backend.name) else None
+    cache = DiskCache(args.cache_dir)
+
+    configs = grid(args.sample_pct, args.top_n, args.scale)
+    log = lambda msg: print(msg, file=sys.stderr)  # noqa: E731
+    log(f"{len(configs)} configuração(ões); fonte da visão por repo: "
+        f"{'materializada' if materialized is not None else 'buckets'}")
+    print(run(backend, configs, args.out, cache, workers=args.workers, materialized=materialized,
+              n_resamples=args.resamples, log=log))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,230 @@
+# analise/bench.py
+# Benchmark do caminho quente da análise (modo linhas) sobre dados sintéticos de cauda pesada
+#
+# Uso (fora do Streamlit):
+#   python -m analise.bench --sizes 1e5 1e6 1e7
+#   python -m analise.bench --sizes 1e6 --repeat 5 --compare data/bench/<anterior>.json
+#
+# Cada etapa é cronometrada `--repeat` vezes (melhor tempo e mediana) e executada mais uma vez
+# sob tracemalloc para o pico de memória. O resultado vai para um JSON por commit em --out.
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pyarrow as pa
+
+from analise import analysis, density, resampling
+from analise.fixtures import DEFAULT_CHUNK_REPOS, iter_per_repo
+from analise.frames import compact_per_repo, frame_nbytes
+from analise.report import build_report_md, report_context
+
+DEFAULT_BENCH_DIR = os.path.join("data", "bench")
+DEFAULT_SIZES = [10**5, 10**6, 10**7]
+RESULTS_VERSION = 1
+
+
+def synthetic_per_repo(n_repos: int, seed: int = 42, chunk_size: int = DEFAULT_CHUNK_REPOS):
+    """Visão por repo sintética com os mesmos dtypes compactos da página."""
+    return compact_per_repo(pa.concat_tables(iter_per_repo(n_repos, seed, chunk_size)))
+
+
+def _welch_stage(state: dict) -> dict:
+    mono, multi = analysis.mono_multi(state["df"])
+    return {"mono": mono, "multi": multi, "test": analysis.welch(mono, multi)}
+
+
+def _resampling_stages(n_resamples: int, executor) -> list:
+    top = lambda s: tuple(s["desc"]["dominant_language"].astype(str))  # noqa: E731
+    return [
+        ("bootstrap_medians", lambda s: {"boot_medians": resampling.bootstrap_medians(
+            s["df"], "log10_total_bytes", top(s), n_resamples, executor=executor)}),
+        ("bootstrap_diff", lambda s: {"boot_diff": resampling.bootstrap_mean_diff(
+            s["multi"], s["mono"], n_resamples, executor=executor)}),
+        ("permutation_welch", lambda s: {"perm": resampling.permutation_welch(
+            s["multi"], s["mono"], n_resamples, executor=executor)}),
+    ]
+
+
+def stages(df_base, n_resamples: int = 0, executor=None) -> list:
+    """Etapas na ordem da página; cada uma recebe o estado acumulado e devolve o que produziu."""
+    return [
+        ("log10_transform", lambda s: {"df": analysis.add_log10(df_base)}),
+        ("desc_groupby", lambda s: {"desc": analysis.describe(s["df"], "log10_total_bytes", top=20)}),
+        ("hist_data", lambda s: {"hist": analysis.hist_bins(s["df"], "log10_total_bytes")}),
+        ("box_data", lambda s: {"box": analysis.box_quartiles(s["df"], "log10_total_bytes", top=10)}),
+        ("pearson_fisher", lambda s: {"corr": analysis.correlation(s["df"])}),
+        ("scatter_data", lambda s: {"scatter": analysis.scatter_bins(s["df"])}),
+        ("welch", _welch_stage),
+        ("kde", lambda s: {"kde": density.density_curves({"Monolíngue": s["mono"], "Multilíngue": s["multi"]})}),
+        ("build_report_md", lambda s: {"report": build_report_md(
+            report_context(20, (None, np.nan, np.nan), s["corr"], s["test"]), calc_corr=True, calc_test=True)}),
+    ] + (_resampling_stages(n_resamples, executor) if n_resamples else [])
+
+
+def _payload_bytes(df) -> int:
+    """Tamanho em Arrow do DataFrame que o Streamlit serializaria para o navegador."""
+    return int(pa.Table.from_pandas(df, preserve_index=False).nbytes)
+
+
+def run_size(n_repos: int, repeat: int = 3, seed: int = 42, n_resamples: int = 0, executor=None) -> dict:
+    t0 = time.perf_counter()
+    df = synthetic_per_repo(n_repos, seed)
+    gen_s = time.perf_counter() - t0
+
+    timings = {name: [] for name, _ in stages(df, n_resamples, executor)}
+    for _ in range(repeat):
+        state = {}
+        for name, fn in stages(df, n_resamples, executor):
+            t = time.perf_counter()
+            state.update(fn(state))
+            timings[name].append(time.perf_counter() - t)
+
+    # passada extra só para memória: tracemalloc distorce o tempo, então fica separada
+    peaks = {}
+    state = {}
+    tracemalloc.start()
+    for name, fn in stages(df, n_resamples, executor):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        state.update(fn(state))
+        peaks[name] = int(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    r = state["corr"][0]
+    diff = state["test"][0]
+    return {
+        "n_repos": int(n_repos),
+        "generate_s": gen_s,
+        "frame_bytes": frame_nbytes(df),
+        "stages": {
+            name: {
+                "best_s": min(ts),
+                "median_s": statistics.median(ts),
+                "peak_bytes": peaks[name],
+            }
+            for name, ts in timings.items()
+        },
+        "total_best_s": sum(min(ts) for ts in timings.values()),
+        "payload_bytes": {
+            "hist": _payload_bytes(state["hist"]),
+            "box": _payload_bytes(state["box"]),
+            "scatter": _payload_bytes(state["scatter"]),
+            "kde": _payload_bytes(state["kde"]),
+        },
+        "checks": {"r": r, "diff": diff},
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> dict:
+    import pandas as pd
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "scipy": scipy.__version__,
+    }
+
+
+def compare(current: dict, previous: dict, threshold: float = 0.10, min_delta_s: float = 0.005) -> list[str]:
+    """Linhas de texto com a variação de tempo por etapa; marca regressões acima do limiar.
+
+    Variações absolutas abaixo de `min_delta_s` não são marcadas (ruído em etapas de microssegundos).
+    """
+    prev_by_n = {r["n_repos"]: r for r in previous.get("results", [])}
+    lines = []
+    for res in current["results"]:
+        prev = prev_by_n.get(res["n_repos"])
+        if prev is None:
+            continue
+        for name, st in res["stages"].items():
+            old = prev["stages"].get(name, {}).get("best_s")
+            if not old:
+                continue
+            delta = st["best_s"] / old - 1
+            flag = "  ← REGRESSÃO" if delta > threshold and st["best_s"] - old > min_delta_s else ""
+            lines.append(f"n={res['n_repos']:>11,} {name:<16} {old:9.4f}s → {st['best_s']:9.4f}s ({delta:+.1%}){flag}")
+    return lines
+
+
+def _latest_result(out_dir: str, exclude: str) -> str | None:
+    files = [f for f in glob.glob(os.path.join(out_dir, "*.json")) if os.path.abspath(f) != os.path.abspath(exclude)]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das etapas da análise sobre dados sintéticos.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES,
+                        help="Nº de repos por rodada (aceita notação 1e6).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--resamples", type=int, default=0,
+                        help="Inclui bootstrap/permutação com este nº de reamostragens (0 = não mede).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default=DEFAULT_BENCH_DIR)
+    parser.add_argument("--compare", nargs="?", const="latest",
+                        help="JSON anterior para comparar (sem valor: o mais recente em --out).")
+    args = parser.parse_args(argv)
+
+    executor = resampling.make_pool(args.workers) if args.resamples and args.workers > 1 else None
+    results = []
+    for size in args.sizes:
+        res = run_size(int(size), repeat=args.repeat, seed=args.seed, n_resamples=args.resamples, executor=executor)
+        results.append(res)
+        print(f"n={res['n_repos']:,}: total {res['total_best_s']:.3f}s "
+              f"(geração {res['generate_s']:.1f}s, frame {res['frame_bytes'] / 2**20:,.1f} MiB)", file=sys.stderr)
+
+    if executor is not None:
+        executor.shutdown()
+    commit = _git_commit()
+    doc = {
+        "version": RESULTS_VERSION,
+        "created_at": time.time(),
+        "commit": commit,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "resamples": args.resamples,
+        "workers": args.workers,
+        "environment": _environment(),
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,  # Linux: KiB
+        "results": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print(path)
+
+    if args.compare:
+        prev_path = _latest_result(args.out, path) if args.compare == "latest" else args.compare
+        if prev_path:
+            with open(prev_path, encoding="utf-8") as f:
+                previous = json.load(f)
+            print(f"comparando com {prev_path} (commit {previous.get('commit')})")
+            print("\n".join(compare(doc, previous)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
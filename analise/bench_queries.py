@@ -0,0 +1,116 @@
+# analise/bench_queries.py
+# Benchmark dos planos SQL da visão por repo ("array" × "window") no backend escolhido
+#
+# Uso (fora do Streamlit):
+#   python -m analise.bench_queries --backend local --sample-pct 10 100
+#   python -m analise.bench_queries --backend bigquery --sample-pct 1 10 --repeat 2 --daily-budget-gb 50
+#
+# Para cada (sample_pct, modo): dry-run (bytes estimados) e `--repeat` execuções sem cache de resultados,
+# com latência, bytes processados e — no BigQuery — slot-time, bytes de shuffle e nº de estágios do plano.
+# Os dois modos precisam devolver a mesma visão: contagem de repos e soma de total_bytes são conferidas.
+# O resultado vai para um JSON em --out (subpasta própria: não se mistura com os do `analise.bench`).
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from analise import queries
+from analise.backends import make_backend
+from analise.bench import DEFAULT_BENCH_DIR, _git_commit
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.governor import DEFAULT_LEDGER_PATH, ByteLedger, GovernedBackend, Governor
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def run_mode(backend, sample_pct: int, mode: str, repeat: int = 3) -> dict:
+    sql = queries.sql_per_repo(sample_pct, backend.dialect, mode=mode)
+    runs = [backend.profile(sql) for _ in range(repeat)]
+    check, _ = backend.query_arrow(f"SELECT COUNT(*) AS repos, SUM(total_bytes) AS total_bytes FROM ({sql}) AS v")
+    check = check.to_pylist()[0]
+    return {
+        "sample_pct": sample_pct,
+        "mode": mode,
+        "estimate_bytes": backend.estimate_bytes(sql),
+        "best_s": min(r["elapsed_s"] for r in runs),
+        "median_s": _median(r["elapsed_s"] for r in runs),
+        "exec_s": _median(r.get("exec_s") for r in runs),
+        "bytes_processed": runs[-1]["bytes_processed"],
+        "slot_ms": _median(r["slot_ms"] for r in runs),
+        "shuffle_bytes": _median(r["shuffle_bytes"] for r in runs),
+        "stages": runs[-1]["stages"],
+        "rows": runs[-1]["rows"],
+        "check": {"repos": int(check["repos"]), "total_bytes": int(check["total_bytes"] or 0)},
+    }
+
+
+def _fmt(value, fmt: str) -> str:
+    return "—" if value is None else fmt.format(value)
+
+
+def summary_lines(results: list[dict]) -> list[str]:
+    lines = [f"{'amostra':>7} {'modo':<7} {'melhor':>9} {'mediana':>9} {'bytes':>14} {'slot-ms':>10} "
+             f"{'shuffle':>14} {'estágios':>8} {'repos':>10}"]
+    for r in results:
+        lines.append(f"{r['sample_pct']:>6}% {r['mode']:<7} {r['best_s']:>8.3f}s {r['median_s']:>8.3f}s "
+                     f"{r['bytes_processed']:>14,} {_fmt(r['slot_ms'], '{:,.0f}'):>10} "
+                     f"{_fmt(r['shuffle_bytes'], '{:,.0f}'):>14} {_fmt(r['stages'], '{}'):>8} {r['check']['repos']:>10,}")
+    by_pct = {}
+    for r in results:
+        by_pct.setdefault(r["sample_pct"], {})[r["mode"]] = r
+    for pct, modes in by_pct.items():
+        if {"array", "window"} <= set(modes):
+            a, w = modes["array"], modes["window"]
+            same = a["check"] == w["check"]
+            lines.append(f"{pct}%: array/window = {a['best_s'] / w['best_s']:.2f}× o tempo"
+                         + (f", {a['slot_ms'] / w['slot_ms']:.2f}× o slot-time" if a["slot_ms"] and w["slot_ms"] else "")
+                         + f" · mesma visão: {'sim' if same else 'NÃO'}")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara os planos SQL da visão por repo (array × window).")
+    parser.add_argument("--backend", choices=["bigquery", "local"], default=os.environ.get("ANALISE_BACKEND", "local"))
+    parser.add_argument("--local-data", default=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH))
+    parser.add_argument("--location", default="US")
+    parser.add_argument("--sample-pct", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--modes", choices=queries.PER_REPO_MODES, nargs="+", default=list(queries.PER_REPO_MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=os.path.join(DEFAULT_BENCH_DIR, "queries"))
+    parser.add_argument("--daily-budget-gb", type=float, default=float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0")),
+                        help="Orçamento diário de bytes no BigQuery (0 = sem limite); compartilha o ledger da página.")
+    args = parser.parse_args(argv)
+
+    backend = make_backend(args.backend, local_path=args.local_data, location=args.location)
+    if args.backend == "bigquery":
+        governor = Governor(ByteLedger(os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)),
+                            daily_budget=int(args.daily_budget_gb * 1024**3), session_resolver=lambda: "bench")
+        backend = GovernedBackend(backend, governor)
+
+    results = []
+    for pct in args.sample_pct:
+        for mode in args.modes:
+            res = run_mode(backend, pct, mode, args.repeat)
+            results.append(res)
+            print(f"{pct}% {mode}: {res['best_s']:.3f}s", file=sys.stderr)
+
+    commit = _git_commit()
+    doc = {"created_at": time.time(), "commit": commit, "backend": backend.name, "repeat": args.repeat,
+           "results": results}
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"queries-{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print("\n".join(summary_lines(results)))
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
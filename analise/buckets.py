@@ -0,0 +1,177 @@
+# analise/buckets.py
+# Fetch incremental da visão por repo por bucket de hash (FARM_FINGERPRINT % 100)
+
+import numpy as np
+import pyarrow as pa
+
+from analise import queries
+from analise.accumulators import PerRepoAccumulator
+from analise.backends import QueryBackend
+from analise.cache import CachedBackend, DiskCache
+from analise.singleflight import SingleFlight
+
+N_BUCKETS = 100
+# resumo por bucket (momentos + t-digests); mudar o formato de `PerRepoAccumulator.to_state` → nova versão
+SUMMARY_KIND = "bucket_summary_v1"
+
+
+def contiguous_ranges(buckets: list[int]) -> list[tuple[int, int]]:
+    """[0, 1, 2, 5, 6] → [(0, 3), (5, 7)] (intervalos semiabertos)."""
+    ranges = []
+    for b in sorted(buckets):
+        if ranges and ranges[-1][1] == b:
+            ranges[-1] = (ranges[-1][0], b + 1)
+        else:
+            ranges.append((b, b + 1))
+    return ranges
+
+
+def split_by_bucket(table: pa.Table, lo: int, hi: int) -> dict[int, pa.Table]:
+    """Divide o resultado de um intervalo em uma tabela por bucket (buckets vazios incluídos)."""
+    table = table.sort_by("bucket")
+    col = table.column("bucket").to_numpy()
+    edges = np.searchsorted(col, np.arange(lo, hi + 1), side="left")
+    return {b: table.slice(edges[i], edges[i + 1] - edges[i]) for i, b in enumerate(range(lo, hi))}
+
+
+class BucketedPerRepo:
+    """Visão por repo montada a partir de buckets cacheados individualmente no DiskCache.
+
+    Aumentar a amostra busca só os buckets que faltam (agrupados em intervalos contíguos);
+    diminuir apenas fatia o que já está em cache. Use com o backend "cru" (sem CachedBackend),
+    senão cada intervalo também seria gravado inteiro no cache.
+
+    Cada intervalo e cada dry-run passa pelo `flight` (SingleFlight, chave = SQL do intervalo): sessões
+    e workers que pedem a mesma amostra ao mesmo tempo esperam uma única consulta.
+    """
+
+    def __init__(self, backend: QueryBackend, cache: DiskCache, flight: SingleFlight | None = None):
+        self.backend = backend
+        self.cache = cache
+        self.flight = flight or SingleFlight()
+        self._estimates = CachedBackend(backend, cache, flight=self.flight)  # dry-runs: cacheados e coalescidos
+
+    def _key(self, bucket: int) -> str:
+        sql = queries.sql_per_repo_buckets(bucket, bucket + 1, self.backend.dialect)
+        return self.cache.key(sql, self.backend.name, self.backend.location, kind="bucket")
+
+    def _summary_key(self, bucket: int) -> str:
+        sql = queries.sql_per_repo_buckets(bucket, bucket + 1, self.backend.dialect)
+        return self.cache.key(sql, self.backend.name, self.backend.location, kind=SUMMARY_KIND)
+
+    def missing(self, sample_pct: int, summaries: bool = False) -> list[int]:
+        """Buckets de [0, sample_pct) sem tabela no cache (com `summaries`, também sem resumo cacheado)."""
+        out = []
+        for b in range(int(sample_pct)):
+            if summaries and self.cache.get_table(self._summary_key(b)) is not None:
+                continue
+            if self.cache.get_table(self._key(b)) is None:
+                out.append(b)
+        return out
+
+    def estimate_bytes(self, sample_pct: int, summaries: bool = False) -> int:
+        """Bytes que o próximo `load`/`accumulate` processaria: um dry-run por intervalo contíguo faltante."""
+        return sum(max(self._estimates.estimate_bytes(queries.sql_per_repo_buckets(lo, hi, self.backend.dialect)), 0)
+                   for lo, hi in contiguous_ranges(self.missing(sample_pct, summaries)))
+
+    def _fetch_range(self, lo: int, hi: int, refresh: bool = False) -> tuple[dict[int, pa.Table], int]:
+        """Tabelas dos buckets [lo, hi) numa consulta só, gravadas uma a uma; (tabelas, bytes processados aqui).
+
+        Quem chega com a mesma faixa em andamento (outra thread ou, pelo lock, outro worker) recebe o
+        resultado dela — lido do cache — com 0 bytes processados.
+        """
+        sql = queries.sql_per_repo_buckets(lo, hi, self.backend.dialect)
+
+        def lookup():
+            parts = {}
+            for b in range(lo, hi):
+                hit = self.cache.get_table(self._key(b))
+                if hit is None:
+                    return None
+                parts[b] = hit[0]
+            return parts, 0
+
+        def compute():
+            table, b_proc = self.backend.query_arrow(sql)
+            parts = split_by_bucket(table, lo, hi)
+            for b, part in parts.items():
+                self.cache.put_table(self._key(b), part, {"bytes_processed": 0, "backend": self.backend.name}, evict=False)
+            return parts, max(b_proc, 0)
+
+        key = self.cache.key(sql, self.backend.name, self.backend.location, kind="bucket_range")
+        (parts, b_proc), outcome = self.flight.do(key, (lambda: None) if refresh else lookup, compute, label="bucket_range")
+        return parts, b_proc if outcome == "miss" else 0
+
+    def iter_buckets(self, sample_pct: int, info: dict | None = None, buckets: list[int] | None = None,
+                     refresh: bool = False):
+        """Gera (bucket, tabela) para [0, sample_pct) (ou só `buckets`), buscando os ausentes por intervalo contíguo.
+
+        Os buckets já cacheados são lidos um a um (memory-map), então quem consome o gerador
+        sem concatenar (ex.: acumuladores) usa memória proporcional a um bucket. Com `refresh`, todos
+        contam como ausentes: são buscados de novo e substituem as entradas do cache.
+        """
+        wanted = range(int(sample_pct)) if buckets is None else sorted(buckets)
+        missing = list(wanted) if refresh else [b for b in wanted if self.cache.get_table(self._key(b)) is None]
+        ranges = contiguous_ranges(missing)
+        if info is not None:
+            info.update(cached_buckets=len(wanted) - len(missing), fetched_buckets=len(missing),
+                        queries=len(ranges), bytes_processed=0)
+        fetched: dict[int, pa.Table] = {}
+        for lo, hi in ranges:
+            parts, b_proc = self._fetch_range(lo, hi, refresh)
+            if info is not None:
+                info["bytes_processed"] += b_proc
+            fetched.update(parts)
+        if ranges:
+            self.cache.evict()
+        for b in wanted:
+            part = fetched.pop(b, None)
+            if part is None:
+                hit = self.cache.get_table(self._key(b))
+                if hit is None:  # evitado pelo LRU entre a checagem e a leitura: busca de novo (e regrava)
+                    parts, b_proc = self._fetch_range(b, b + 1)
+                    part = parts[b]
+                    if info is not None:
+                        info["bytes_processed"] += b_proc
+                        info["queries"] += 1
+                        info["cached_buckets"] -= 1
+                        info["fetched_buckets"] += 1
+                else:
+                    part = hit[0]
+            yield b, part
+
+    def load(self, sample_pct: int, refresh: bool = False) -> tuple[pa.Table, int, dict]:
+        """Retorna (tabela dos buckets [0, sample_pct), bytes processados nesta chamada, resumo)."""
+        info: dict = {}
+        tables = [part for _, part in self.iter_buckets(sample_pct, info, refresh=refresh)]
+        table = pa.concat_tables(tables) if tables else pa.table({})
+        return table, info.pop("bytes_processed"), info
+
+    def accumulate(self, sample_pct: int, info: dict | None = None, refresh: bool = False) -> PerRepoAccumulator:
+        """Acumulador de [0, sample_pct) montado a partir de resumos por bucket guardados no cache.
+
+        Buckets com resumo cacheado nem são lidos; os demais são acumulados (um bucket por vez),
+        têm o resumo gravado e entram no merge. Aumentar a amostra só processa os buckets novos.
+        Com `refresh`, todos os buckets são buscados e resumidos de novo (substituindo o cache).
+        """
+        info = {} if info is None else info
+        acc = PerRepoAccumulator()
+        missing = []
+        for b in range(int(sample_pct)):
+            hit = None if refresh else self.cache.get_table(self._summary_key(b))
+            if hit is None:
+                missing.append(b)
+            else:
+                acc.merge(PerRepoAccumulator.from_state(*hit))
+        info["summary_hits"] = int(sample_pct) - len(missing)
+        info.update(cached_buckets=0, fetched_buckets=0, queries=0, bytes_processed=0)
+        if missing:
+            for b, part in self.iter_buckets(sample_pct, info, buckets=missing, refresh=refresh):
+                bucket_acc = PerRepoAccumulator()
+                for batch in part.to_batches(max_chunksize=1_000_000):
+                    bucket_acc.update(batch)
+                table, meta = bucket_acc.to_state()
+                self.cache.put_table(self._summary_key(b), table, meta, evict=False)
+                acc.merge(bucket_acc)
+            self.cache.evict()
+        return acc
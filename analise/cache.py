@@ -0,0 +1,210 @@
+# analise/cache.py
+# Cache persistente em disco (Arrow IPC) para resultados de consultas: TTL, LRU por tamanho e escrita atômica
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+
+from analise.backends import QueryBackend
+from analise.singleflight import SingleFlight
+
+META_KEY = b"analise.meta"
+
+
+def normalize_sql(sql: str) -> str:
+    """Normaliza espaços/quebras de linha para que SQL equivalente gere a mesma chave."""
+    return " ".join(sql.split())
+
+
+class DiskCache:
+    """Cache compartilhável entre processos: um arquivo por entrada, gravado via rename atômico.
+
+    - Resultados tabulares: Arrow IPC (`.arrow`), lidos com memory-map (sem cópia para a RAM do processo);
+      os metadados (criação, bytes processados) vão no próprio schema → entrada = 1 arquivo.
+    - Valores pequenos (ex.: estimativas de dry-run): JSON (`.json`).
+    - LRU: o mtime é atualizado a cada hit; ao passar de `max_bytes`, remove os mais antigos.
+    """
+
+    def __init__(self, root: str, ttl_seconds: float = 24 * 3600, max_bytes: int = 2 * 1024**3):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- chaves / caminhos ----------
+    @staticmethod
+    def key(sql: str, backend: str, location: str | None = None, kind: str = "query") -> str:
+        raw = json.dumps([kind, backend, location, normalize_sql(sql)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}{ext}")
+
+    def _atomic_write(self, path: str, write) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)  # atômico no mesmo filesystem: leitores veem o arquivo antigo ou o novo
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl_seconds is None or (time.time() - created_at) <= self.ttl_seconds
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    # ---------- tabelas (Arrow IPC) ----------
+    def get_table(self, key: str) -> tuple[pa.Table, dict] | None:
+        path = self._path(key, ".arrow")
+        try:
+            # sem `with`: os buffers da tabela apontam para o mapa, que vive enquanto a tabela viver
+            table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        schema_meta = dict(table.schema.metadata or {})
+        meta = json.loads(schema_meta.pop(META_KEY, b"{}"))
+        if not self._fresh(meta.get("created_at", 0)):
+            return None
+        self._touch(path)
+        return table.replace_schema_metadata(schema_meta or None), meta
+
+    def put_table(self, key: str, table: pa.Table, meta: dict | None = None, evict: bool = True) -> None:
+        meta = {**(meta or {}), "created_at": time.time()}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: json.dumps(meta).encode()})
+
+        def write(f):
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+
+        self._atomic_write(self._path(key, ".arrow"), write)
+        if evict:
+            self.evict()
+
+    # ---------- valores pequenos (JSON) ----------
+    def get_json(self, key: str):
+        path = self._path(key, ".json")
+        try:
+            with open(path, "rb") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not self._fresh(entry.get("created_at", 0)):
+            return None
+        self._touch(path)
+        return entry["value"]
+
+    def put_json(self, key: str, value) -> None:
+        data = json.dumps({"created_at": time.time(), "value": value}).encode("utf-8")
+        self._atomic_write(self._path(key, ".json"), lambda f: f.write(data))
+
+    # ---------- manutenção ----------
+    def _entries(self) -> list[tuple[float, int, str]]:
+        out = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st_ = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                out.append((st_.st_mtime, st_.st_size, path))
+        return out
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Remove entradas menos recentemente usadas até caber em `max_bytes`. Retorna quantas removeu."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)  # outro worker pode ter removido antes; leitores com mmap aberto não são afetados
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class CachedBackend(QueryBackend):
+    """Envolve um backend com o DiskCache: chave = SQL normalizado + backend + location.
+
+    `on_hit(sql, bytes_processed)` é chamado a cada hit (ex.: contabilizar a economia no ledger), inclusive
+    quando o resultado veio de outra execução simultânea. Misses passam pelo `flight` (SingleFlight): uma
+    consulta/dry-run por chave em andamento; com `lock_dir`, também entre processos.
+    """
+
+    def __init__(self, inner: QueryBackend, cache: DiskCache, on_hit=None, flight: SingleFlight | None = None):
+        self.inner = inner
+        self.cache = cache
+        self.on_hit = on_hit
+        self.flight = flight or SingleFlight()
+        self.name = inner.name
+        self.dialect = inner.dialect
+        self.location = inner.location
+
+    def query_arrow(self, sql: str) -> tuple[pa.Table, int]:
+        key = self.cache.key(sql, self.name, self.location)
+
+        def compute():
+            table, bytes_processed = self.refresh(sql)
+            return table, {"bytes_processed": bytes_processed}
+
+        (table, meta), outcome = self.flight.do(key, lambda: self.cache.get_table(key), compute, label="query")
+        if outcome != "miss" and self.on_hit is not None:
+            self.on_hit(sql, int(meta.get("bytes_processed", 0)))
+        return table, int(meta.get("bytes_processed", -1))
+
+    def refresh(self, sql: str) -> tuple[pa.Table, int]:
+        """Consulta de novo e substitui a entrada (atômico: quem lê no meio recebe o resultado anterior)."""
+        table, bytes_processed = self.inner.query_arrow(sql)
+        self.cache.put_table(self.cache.key(sql, self.name, self.location), table,
+                             {"bytes_processed": bytes_processed, "backend": self.name})
+        return table, bytes_processed
+
+    def is_cached(self, sql: str) -> bool:
+        return self.cache.get_table(self.cache.key(sql, self.name, self.location)) is not None
+
+    def estimate_bytes(self, sql: str) -> int:
+        key = self.cache.key(sql, self.name, self.location, kind="estimate")
+
+        def compute():
+            value = self.inner.estimate_bytes(sql)
+            self.cache.put_json(key, value)
+            return value
+
+        value, _ = self.flight.do(key, lambda: self.cache.get_json(key), compute, label="estimate")
+        return int(value)
+
+    def ping(self) -> None:
+        self.inner.ping()
+
+    def source_modified(self) -> float | None:
+        return self.inner.source_modified()
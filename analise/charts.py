@@ -0,0 +1,99 @@
+# analise/charts.py
+# Gráficos Altair montados a partir de dados já agregados no servidor (payload independe do nº de repos)
+
+import altair as alt
+import pandas as pd
+
+
+def hist_chart(bins: pd.DataFrame, title: str) -> alt.Chart:
+    """Histograma a partir de (bin_start, bin_end, count)."""
+    return (
+        alt.Chart(bins)
+        .mark_bar()
+        .encode(
+            x=alt.X("bin_start:Q", bin="binned", title=title),
+            x2="bin_end:Q",
+            y=alt.Y("count:Q", title="Contagem"),
+            tooltip=[alt.Tooltip("bin_start:Q", format=".3f"), alt.Tooltip("bin_end:Q", format=".3f"),
+                     alt.Tooltip("count:Q", format=",")],
+        )
+        .properties(height=300)
+    )
+
+
+def box_chart(quartiles: pd.DataFrame, title: str, lower: str = "min", upper: str = "max") -> alt.LayerChart:
+    """Boxplot a partir de quartis por linguagem: bigodes (`lower`–`upper`), caixa (q1–q3) e mediana."""
+    base = alt.Chart(quartiles).encode(y=alt.Y("dominant_language:N", title="Linguagem", sort=None))
+    whisker = base.mark_rule().encode(x=alt.X(f"{lower}:Q", title=title), x2=f"{upper}:Q")
+    box = base.mark_bar(size=14).encode(
+        x="q1:Q", x2="q3:Q",
+        tooltip=["dominant_language"] + [alt.Tooltip(f"{c}:Q", format=".3f") for c in (lower, "q1", "median", "q3", upper)],
+    )
+    median = base.mark_tick(color="white", size=14).encode(x="median:Q")
+    return (whisker + box + median).properties(height=26 * len(quartiles))
+
+
+def density2d_chart(cells: pd.DataFrame, x_title: str, y_title: str) -> alt.Chart:
+    """Scatter agregado: células (x_start, x_end, y_start, y_end, count) coloridas pela contagem (escala log)."""
+    return (
+        alt.Chart(cells)
+        .mark_rect()
+        .encode(
+            x=alt.X("x_start:Q", bin="binned", title=x_title),
+            x2="x_end:Q",
+            y=alt.Y("y_start:Q", bin="binned", title=y_title),
+            y2="y_end:Q",
+            color=alt.Color("count:Q", scale=alt.Scale(type="log", scheme="blues"), title="Repos"),
+            tooltip=[alt.Tooltip("x_start:Q", format=".1f"), alt.Tooltip("y_start:Q", format=".3f"),
+                     alt.Tooltip("y_end:Q", format=".3f"), alt.Tooltip("count:Q", format=",")],
+        )
+        .properties(height=350)
+    )
+
+
+def density_chart(curves: pd.DataFrame, title: str) -> alt.Chart:
+    """Curvas de densidade já estimadas no servidor: (grupo, valor, density)."""
+    return (
+        alt.Chart(curves)
+        .mark_area(opacity=0.4)
+        .encode(
+            x=alt.X("valor:Q", title=title),
+            y=alt.Y("density:Q", title="Densidade"),
+            color="grupo:N",
+            tooltip=["grupo:N", alt.Tooltip("valor:Q", format=".2f"), alt.Tooltip("density:Q", format=".3f")],
+        )
+        .properties(height=300)
+    )
+
+
+def timeseries_chart(daily: pd.DataFrame, y: str, title: str) -> alt.Chart:
+    """Linhas por linguagem a partir de agregados diários (day, language, `y`)."""
+    return (
+        alt.Chart(daily)
+        .mark_line(point=len(daily["day"].unique()) <= 31)
+        .encode(
+            x=alt.X("day:T", title="Dia"),
+            y=alt.Y(f"{y}:Q", title=title),
+            color=alt.Color("language:N", title="Linguagem"),
+            tooltip=[alt.Tooltip("day:T", format="%Y-%m-%d"), "language", alt.Tooltip(f"{y}:Q", format=",")],
+        )
+        .properties(height=320)
+    )
+
+
+def cooccurrence_chart(cells: pd.DataFrame, value: str, title: str) -> alt.Chart:
+    """Heatmap linguagem × linguagem a partir dos pares (lang_a, lang_b, `value`) — só os que coocorrem."""
+    return (
+        alt.Chart(cells)
+        .mark_rect()
+        .encode(
+            x=alt.X("lang_a:N", title=None, sort="ascending"),
+            y=alt.Y("lang_b:N", title=None, sort="ascending"),
+            color=alt.Color(f"{value}:Q", title=title,
+                            scale=alt.Scale(scheme="redblue", domainMid=0, reverse=True) if value in ("pmi", "npmi")
+                            else alt.Scale(scheme="blues")),
+            tooltip=["lang_a", "lang_b", alt.Tooltip("repos:Q", format=","), alt.Tooltip("lift:Q", format=".2f"),
+                     alt.Tooltip("pmi:Q", format=".2f"), alt.Tooltip("weight:Q", format=",.1f")],
+        )
+        .properties(height=420)
+    )
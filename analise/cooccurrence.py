@@ -0,0 +1,228 @@
+# analise/cooccurrence.py
+# Coocorrência de linguagens a partir de uma matriz esparsa repo × linguagem (CSR)
+#
+# Cada linha da fonte já traz todas as linguagens de um repo (campo repetido `language`): os offsets da
+# lista em Arrow são o `indptr` da CSR, os nomes (dicionário → ids) são os `indices` e os bytes, os dados.
+# Montar B (repos × linguagens) é uma passada sobre os RecordBatches, sem UNNEST nem matriz densa.
+# Com P = B binária e S = B normalizada por linha (fração de bytes de cada linguagem no repo):
+#   C = PᵀP   → repos com as linguagens a e b juntas (diagonal = repos com a);
+#   W = SᵀS   → Σ fração_a · fração_b: coocorrência ponderada por bytes (um Makefile de 200 bytes num
+#               repo de 50 MB quase não conta; duas linguagens que dividem o código, sim).
+# C e W são linguagens × linguagens (centenas), guardados esparsos e somados entre buckets.
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import scipy.sparse as sp
+
+from analise import queries
+from analise.backends import QueryBackend
+from analise.buckets import contiguous_ranges, split_by_bucket
+from analise.cache import CachedBackend, DiskCache
+from analise.singleflight import SingleFlight
+
+# estado por bucket (pares em Arrow + vocabulário); mudar o formato de `to_state` → nova versão
+SUMMARY_KIND = "cooccurrence_v1"
+PAIR_METRICS = ("lift", "pmi", "repos", "weight")
+
+
+def _empty_matrix(n: int = 0) -> sp.csr_matrix:
+    return sp.csr_matrix((n, n), dtype=np.float64)
+
+
+def repo_language_matrix(batch, vocab: dict) -> sp.csr_matrix:
+    """B (repos do lote × linguagens) com bytes nos dados; `vocab` (nome → id) cresce com linguagens novas."""
+    lists = batch.column("language")
+    lists = lists.combine_chunks() if isinstance(lists, pa.ChunkedArray) else lists
+    lengths = pc.fill_null(pc.list_value_length(lists), 0).to_numpy(zero_copy_only=False)
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    flat = pc.list_flatten(lists)  # listas nulas não contribuem (comprimento 0 acima)
+    encoded = pc.dictionary_encode(pc.fill_null(flat.field("name"), "(sem nome)"))
+    local_to_global = np.array([vocab.setdefault(name, len(vocab)) for name in encoded.dictionary.to_pylist()],
+                               dtype=np.int64)
+    indices = local_to_global[encoded.indices.to_numpy(zero_copy_only=False)] if len(flat) else np.empty(0, np.int64)
+    data = pc.fill_null(flat.field("bytes"), 0).to_numpy(zero_copy_only=False).astype(np.float64)
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(len(lists), len(vocab)))
+    matrix.sum_duplicates()  # mesma linguagem repetida no array de um repo
+    return matrix
+
+
+def _resize(m: sp.spmatrix, index: np.ndarray, n: int) -> sp.csr_matrix:
+    """Reindexa uma matriz linguagens × linguagens (`index[i]` = novo id de i) num shape n × n."""
+    coo = m.tocoo()
+    return sp.csr_matrix((coo.data, (index[coo.row], index[coo.col])), shape=(n, n))
+
+
+@dataclass
+class CoOccurrence:
+    """Contagens de pares (C) e pesos por bytes (W) acumulados; mergeável entre lotes e buckets."""
+
+    languages: list = field(default_factory=list)
+    counts: sp.csr_matrix = field(default_factory=_empty_matrix)
+    weights: sp.csr_matrix = field(default_factory=_empty_matrix)
+    n_repos: int = 0
+
+    def update(self, batch) -> "CoOccurrence":
+        vocab = {name: i for i, name in enumerate(self.languages)}
+        b = repo_language_matrix(batch, vocab)
+        b = b[np.diff(b.indptr) > 0]  # repos sem linguagem não entram em N
+        if not b.shape[0]:
+            return self
+        presence = b.copy()
+        presence.data[:] = 1.0
+        totals = np.asarray(b.sum(axis=1)).ravel()
+        shares = sp.diags(np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)) @ b
+        part = CoOccurrence(list(vocab), (presence.T @ presence).tocsr(), (shares.T @ shares).tocsr(), b.shape[0])
+        return self.merge(part)
+
+    def merge(self, other: "CoOccurrence") -> "CoOccurrence":
+        vocab = {name: i for i, name in enumerate(self.languages)}
+        index = np.array([vocab.setdefault(name, len(vocab)) for name in other.languages], dtype=np.int64)
+        n = len(vocab)
+        own = np.arange(len(self.languages), dtype=np.int64)
+        self.counts = _resize(self.counts, own, n) + _resize(other.counts, index, n)
+        self.weights = _resize(self.weights, own, n) + _resize(other.weights, index, n)
+        self.languages = list(vocab)
+        self.n_repos += other.n_repos
+        return self
+
+    def to_state(self) -> tuple[pa.Table, dict]:
+        """(pares do triângulo superior em Arrow, vocabulário e N em JSON) — formato gravado no DiskCache."""
+        counts = sp.triu(self.counts).tocoo()
+        weights = sp.triu(self.weights).tocsr()
+        table = pa.table({"a": counts.row.astype(np.int32), "b": counts.col.astype(np.int32),
+                          "count": counts.data.astype(np.int64),
+                          "weight": np.asarray(weights[counts.row, counts.col]).ravel()})
+        return table, {"languages": self.languages, "n_repos": self.n_repos}
+
+    @classmethod
+    def from_state(cls, table: pa.Table, meta: dict) -> "CoOccurrence":
+        n = len(meta["languages"])
+        a, b = table.column("a").to_numpy(), table.column("b").to_numpy()
+        off = a != b  # triângulo superior → matriz simétrica (diagonal uma vez só)
+
+        def symmetric(values):
+            return sp.csr_matrix((np.r_[values, values[off]], (np.r_[a, b[off]], np.r_[b, a[off]])), shape=(n, n))
+
+        return cls(list(meta["languages"]), symmetric(table.column("count").to_numpy().astype(np.float64)),
+                   symmetric(table.column("weight").to_numpy()), int(meta["n_repos"]))
+
+    def language_counts(self) -> pd.Series:
+        """Repos que contêm cada linguagem (diagonal de C), em ordem decrescente."""
+        return pd.Series(self.counts.diagonal(), index=self.languages, name="repos").sort_values(ascending=False)
+
+    def pairs(self, min_repos: int = 1) -> pd.DataFrame:
+        """Um registro por par (a < b) que coocorre em ≥ `min_repos` repos, com suporte, lift, PMI e peso.
+
+        lift = N·C_ab / (C_aa·C_bb) (1 = independência); PMI = log2(lift); NPMI = PMI / −log2(C_ab/N) ∈ [−1, 1].
+        """
+        cols = ["lang_a", "lang_b", "repos", "support", "lift", "pmi", "npmi", "weight"]
+        upper = sp.triu(self.counts, k=1).tocoo()
+        keep = upper.data >= max(min_repos, 1)
+        rows, cols_idx, c_ab = upper.row[keep], upper.col[keep], upper.data[keep]
+        if not len(c_ab):
+            return pd.DataFrame(columns=cols)
+        diag = self.counts.diagonal()
+        n = float(self.n_repos)
+        lift = n * c_ab / (diag[rows] * diag[cols_idx])
+        pmi = np.log2(lift)
+        p_ab = c_ab / n
+        npmi = np.divide(pmi, -np.log2(p_ab), out=np.ones_like(pmi), where=p_ab < 1)
+        names = np.asarray(self.languages, dtype=object)
+        return pd.DataFrame({
+            "lang_a": names[rows], "lang_b": names[cols_idx], "repos": c_ab.astype(np.int64), "support": p_ab,
+            "lift": lift, "pmi": pmi, "npmi": npmi,
+            "weight": np.asarray(self.weights[rows, cols_idx]).ravel(),
+        }, columns=cols)
+
+    def heatmap_cells(self, top: int = 15, min_repos: int = 1) -> pd.DataFrame:
+        """Pares entre as `top` linguagens mais frequentes, nos dois sentidos (a, b) e (b, a), para o heatmap."""
+        keep = set(self.language_counts().head(top).index)
+        pairs = self.pairs(min_repos)
+        pairs = pairs[pairs["lang_a"].isin(keep) & pairs["lang_b"].isin(keep)]
+        flipped = pairs.rename(columns={"lang_a": "lang_b", "lang_b": "lang_a"})
+        return pd.concat([pairs, flipped[pairs.columns]], ignore_index=True)
+
+
+class BucketedCoOccurrence:
+    """Coocorrência de [0, sample_pct) somando o estado de cada bucket de hash, cacheado no DiskCache.
+
+    Como o `BucketedPerRepo.accumulate`: buckets com estado em cache nem são consultados; os que faltam
+    são buscados em intervalos contíguos (lista de linguagens por repo), reduzidos a pares e gravados.
+    Use com o backend "cru" (sem CachedBackend). Intervalos e dry-runs passam pelo `flight`, como no
+    `BucketedPerRepo`.
+    """
+
+    def __init__(self, backend: QueryBackend, cache: DiskCache, flight: SingleFlight | None = None):
+        self.backend = backend
+        self.cache = cache
+        self.flight = flight or SingleFlight()
+        self._estimates = CachedBackend(backend, cache, flight=self.flight)
+
+    def _key(self, bucket: int) -> str:
+        sql = queries.sql_repo_languages_buckets(bucket, bucket + 1, self.backend.dialect)
+        return self.cache.key(sql, self.backend.name, self.backend.location, kind=SUMMARY_KIND)
+
+    def missing(self, sample_pct: int) -> list[int]:
+        return [b for b in range(int(sample_pct)) if self.cache.get_table(self._key(b)) is None]
+
+    def estimate_bytes(self, sample_pct: int) -> int:
+        """Bytes que o próximo `accumulate` processaria: um dry-run por intervalo contíguo faltante."""
+        return sum(max(self._estimates.estimate_bytes(queries.sql_repo_languages_buckets(lo, hi, self.backend.dialect)), 0)
+                   for lo, hi in contiguous_ranges(self.missing(sample_pct)))
+
+    def _fetch_range(self, lo: int, hi: int, refresh: bool = False) -> tuple[dict[int, CoOccurrence], int]:
+        """Estado por bucket de [lo, hi) numa consulta só (coalescida pelo `flight`); (estados, bytes processados aqui)."""
+        sql = queries.sql_repo_languages_buckets(lo, hi, self.backend.dialect)
+
+        def lookup():
+            states = {}
+            for b in range(lo, hi):
+                hit = self.cache.get_table(self._key(b))
+                if hit is None:
+                    return None
+                states[b] = CoOccurrence.from_state(*hit)
+            return states, 0
+
+        def compute():
+            table, b_proc = self.backend.query_arrow(sql)
+            states = {}
+            for b, part in split_by_bucket(table, lo, hi).items():
+                bucket = CoOccurrence()
+                for batch in part.to_batches(max_chunksize=1_000_000):
+                    bucket.update(batch)
+                self.cache.put_table(self._key(b), *bucket.to_state(), evict=False)
+                states[b] = bucket
+            return states, max(b_proc, 0)
+
+        key = self.cache.key(sql, self.backend.name, self.backend.location, kind=f"{SUMMARY_KIND}_range")
+        (states, b_proc), outcome = self.flight.do(key, (lambda: None) if refresh else lookup, compute,
+                                                   label="cooccurrence_range")
+        return states, b_proc if outcome == "miss" else 0
+
+    def accumulate(self, sample_pct: int, info: dict | None = None, refresh: bool = False) -> CoOccurrence:
+        """Com `refresh`, todos os buckets são buscados de novo e substituem o estado em cache."""
+        info = {} if info is None else info
+        out = CoOccurrence()
+        missing = []
+        for b in range(int(sample_pct)):
+            hit = None if refresh else self.cache.get_table(self._key(b))
+            if hit is None:
+                missing.append(b)
+            else:
+                out.merge(CoOccurrence.from_state(*hit))
+        ranges = contiguous_ranges(missing)
+        info.update(cached_buckets=int(sample_pct) - len(missing), fetched_buckets=len(missing),
+                    queries=len(ranges), bytes_processed=0)
+        for lo, hi in ranges:
+            states, b_proc = self._fetch_range(lo, hi, refresh)
+            info["bytes_processed"] += b_proc
+            for bucket in states.values():
+                out.merge(bucket)  # só lê `bucket`: estados compartilhados com quem foi coalescido ficam intactos
+        if ranges:
+            self.cache.evict()
+        return out
@@ -0,0 +1,327 @@
+# analise/events.py
+# Ingestão incremental de eventos no formato do GitHub Archive → Parquet por dia + agregados diários por linguagem
+#
+# Uso (fora do Streamlit):
+#   python -m analise.events generate --hours 72          # fixtures locais em data/events/raw
+#   python -m analise.events ingest                       # processa só os arquivos ainda não ingeridos
+#
+# Layout do store (--store, padrão data/events):
+#   events/day=YYYY-MM-DD/<arquivo>.parquet   eventos normalizados (um Parquet por arquivo de origem e dia)
+#   daily.parquet                             agregados por (dia, linguagem); janelas móveis de 7 dias na leitura
+#   processed.txt                             nomes dos arquivos já processados, um por linha (só cresce)
+#
+# O estado (watermark = hora mais recente vista, contadores e até que byte do processed.txt vale) fica nos
+# metadados do próprio daily.parquet: agregados e estado são trocados juntos num único os.replace. O nome
+# do arquivo é anexado ao processed.txt antes dessa troca, mas só conta depois dela — uma interrupção no
+# meio deixa uma linha além do offset, descartada na próxima gravação —, então nenhum arquivo é contado
+# duas vezes. Pendente = qualquer arquivo ainda não processado, inclusive os que chegam atrasados
+# (hora ≤ watermark): esses entram nos agregados do dia deles e são contados/logados como "late".
+# Reprocessar um arquivo sobrescreve as mesmas partições de eventos (idempotente).
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from analise import queries
+from analise.backends import LocalBackend
+from analise.fixtures import DEFAULT_EVENTS_RAW_DIR, DEFAULT_FIXTURE_PATH, generate_event_files
+
+DEFAULT_EVENTS_DIR = os.path.join("data", "events")
+DAILY_NAME = "daily.parquet"
+PROCESSED_NAME = "processed.txt"
+STATE_KEY = b"analise.events.state"
+CHUNK_LINES = 50_000            # linhas JSON por lote: memória constante, independe do tamanho do arquivo
+ROLLING_DAYS = 7
+UNKNOWN_LANGUAGE = "(desconhecida)"
+
+EVENTS_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("type", pa.string()),
+    ("created_at", pa.timestamp("s", tz="UTC")),
+    ("repo_name", pa.string()),
+    ("actor", pa.string()),
+    ("commits", pa.int32()),
+    ("language", pa.string()),
+])
+# colunas somáveis dos agregados diários: nome → tipo de evento que conta (None = todos)
+DAILY_COUNTS = {
+    "events": None,
+    "pushes": "PushEvent",
+    "pull_requests": "PullRequestEvent",
+    "issues": "IssuesEvent",
+    "stars": "WatchEvent",
+    "forks": "ForkEvent",
+}
+DAILY_METRICS = list(DAILY_COUNTS) + ["commits"]
+
+
+def file_hour(name: str) -> datetime | None:
+    """Hora de um arquivo do GH Archive (`2015-01-01-15.json.gz`); None se o nome não seguir o padrão."""
+    stem = os.path.basename(name).split(".", 1)[0]
+    try:
+        day, hour = stem.rsplit("-", 1)
+        return datetime.strptime(f"{day} {int(hour):02d}", "%Y-%m-%d %H").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+class RepoLanguages:
+    """repo_name → linguagem dominante (vetorizado via pandas.Index)."""
+
+    def __init__(self, repo_names, languages):
+        self._index = pd.Index(np.asarray(repo_names, dtype=object))
+        self._languages = np.append(np.asarray(languages, dtype=object), UNKNOWN_LANGUAGE)
+
+    @classmethod
+    def from_languages_parquet(cls, path: str = DEFAULT_FIXTURE_PATH) -> "RepoLanguages":
+        """Visão por repo (SQL da página, via DuckDB) a partir de um Parquet no formato de `github_repos.languages`."""
+        table, _ = LocalBackend(path).query_arrow(queries.sql_per_repo(100, "duckdb"))
+        return cls(table.column("repo_name").to_numpy(zero_copy_only=False),
+                   table.column("dominant_language").to_numpy(zero_copy_only=False))
+
+    def lookup(self, repo_names) -> np.ndarray:
+        pos = self._index.get_indexer(np.asarray(repo_names, dtype=object))
+        return self._languages[np.where(pos < 0, len(self._languages) - 1, pos)]
+
+
+def iter_event_batches(path: str, repo_languages: RepoLanguages, chunk_lines: int = CHUNK_LINES):
+    """Lê um .json.gz em lotes de `chunk_lines` linhas e devolve RecordBatches no EVENTS_SCHEMA."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        while True:
+            cols = {"id": [], "type": [], "created_at": [], "repo_name": [], "actor": [], "commits": []}
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except json.JSONDecodeError:  # linha truncada: o GH Archive tem algumas
+                    continue
+                cols["id"].append(str(e.get("id")))
+                cols["type"].append(e.get("type"))
+                cols["created_at"].append(e.get("created_at"))
+                cols["repo_name"].append((e.get("repo") or {}).get("name"))
+                cols["actor"].append((e.get("actor") or {}).get("login"))
+                payload = e.get("payload") or {}
+                cols["commits"].append(int(payload.get("size") or len(payload.get("commits") or [])))
+                if len(cols["id"]) >= chunk_lines:
+                    break
+            if not cols["id"]:
+                return
+            created = pd.to_datetime(cols["created_at"], utc=True, format="ISO8601")
+            yield pa.RecordBatch.from_arrays([
+                pa.array(cols["id"], pa.string()),
+                pa.array(cols["type"], pa.string()),
+                pa.array(created, pa.timestamp("s", tz="UTC")),
+                pa.array(cols["repo_name"], pa.string()),
+                pa.array(cols["actor"], pa.string()),
+                pa.array(cols["commits"], pa.int32()),
+                pa.array(repo_languages.lookup(cols["repo_name"]), pa.string()),
+            ], schema=EVENTS_SCHEMA)
+
+
+def daily_partials(batch: pa.RecordBatch) -> pd.DataFrame:
+    """Contagens somáveis de um lote por (dia, linguagem)."""
+    df = batch.select(["type", "created_at", "commits", "language"]).to_pandas()
+    out = pd.DataFrame({"day": df["created_at"].dt.tz_convert("UTC").dt.normalize().dt.tz_localize(None),
+                        "language": df["language"]})
+    for name, kind in DAILY_COUNTS.items():
+        out[name] = 1 if kind is None else (df["type"] == kind).astype(np.int64)
+    out["commits"] = df["commits"].where(df["type"] == "PushEvent", 0).astype(np.int64)
+    return out.groupby(["day", "language"], as_index=False)[DAILY_METRICS].sum()
+
+
+def merge_daily(daily: pd.DataFrame, partial: pd.DataFrame) -> pd.DataFrame:
+    if daily.empty:
+        return partial
+    return (pd.concat([daily[["day", "language"] + DAILY_METRICS], partial], ignore_index=True)
+            .groupby(["day", "language"], as_index=False)[DAILY_METRICS].sum())
+
+
+def add_rolling(daily: pd.DataFrame, days: int = ROLLING_DAYS) -> pd.DataFrame:
+    """Somas móveis de `days` dias corridos por linguagem (dias sem evento contam como zero)."""
+    if daily.empty:
+        return daily.assign(**{f"{m}_{days}d": pd.Series(dtype=np.int64) for m in DAILY_METRICS})
+    wide = daily.pivot_table(index="day", columns="language", values=DAILY_METRICS, aggfunc="sum", fill_value=0)
+    wide = wide.reindex(pd.date_range(wide.index.min(), wide.index.max(), freq="D"), fill_value=0)
+    rolled = wide.rolling(days, min_periods=1).sum().astype(np.int64)
+    rolled.columns = pd.MultiIndex.from_tuples([(f"{m}_{days}d", lang) for m, lang in rolled.columns],
+                                               names=[None, "language"])
+    long = rolled.stack("language", future_stack=True).rename_axis(["day", "language"]).reset_index()
+    long = long[["day", "language"] + [f"{m}_{days}d" for m in DAILY_METRICS]]
+    return daily.merge(long, on=["day", "language"], how="left").sort_values(["day", "language"], ignore_index=True)
+
+
+class EventStore:
+    """Store local de eventos por dia + agregados diários com watermark."""
+
+    def __init__(self, root: str = DEFAULT_EVENTS_DIR):
+        self.root = root
+        self.events_dir = os.path.join(root, "events")
+        self.daily_path = os.path.join(root, DAILY_NAME)
+        self.processed_path = os.path.join(root, PROCESSED_NAME)
+
+    def state(self) -> dict:
+        try:
+            meta = pq.read_schema(self.daily_path).metadata or {}
+        except FileNotFoundError:
+            return {"watermark": None, "files": 0}
+        return json.loads(meta.get(STATE_KEY, b'{"watermark": null, "files": 0}'))
+
+    def processed(self, state: dict | None = None) -> set[str]:
+        """Nomes já ingeridos: as linhas do processed.txt até o offset confirmado no estado."""
+        state = self.state() if state is None else state
+        try:
+            with open(self.processed_path, "rb") as f:
+                return set(f.read(state.get("processed_bytes", 0)).decode("utf-8").splitlines())
+        except FileNotFoundError:
+            return set()
+
+    def watermark(self) -> datetime | None:
+        wm = self.state().get("watermark")
+        return datetime.fromisoformat(wm) if wm else None
+
+    def read_daily(self) -> pd.DataFrame:
+        try:
+            daily = pq.read_table(self.daily_path).to_pandas()
+        except FileNotFoundError:
+            daily = pd.DataFrame({"day": pd.Series(dtype="datetime64[ns]"), "language": pd.Series(dtype=object),
+                                  **{m: pd.Series(dtype=np.int64) for m in DAILY_METRICS}})
+        return add_rolling(daily)  # na leitura: gravar após cada arquivo não recalcula o histórico todo
+
+    def pending(self, raw_dir: str) -> list[str]:
+        """Arquivos do diretório de origem ainda não processados, em ordem cronológica."""
+        done = self.processed()
+        files = [(file_hour(n), n) for n in os.listdir(raw_dir) if n.endswith(".json.gz")]
+        return [os.path.join(raw_dir, n) for h, n in sorted(f for f in files if f[0] is not None) if n not in done]
+
+    def _write_events(self, path: str, batches) -> tuple[pd.DataFrame, int]:
+        """Grava os eventos de um arquivo (um Parquet por dia, lote a lote) e devolve os parciais diários."""
+        stem = os.path.basename(path).split(".", 1)[0]
+        writers: dict[str, tuple[pq.ParquetWriter, str, str]] = {}
+        partials, rows = [], 0
+        try:
+            for batch in batches:
+                rows += batch.num_rows
+                partials.append(daily_partials(batch))
+                days = pc.strftime(batch.column("created_at"), format="%Y-%m-%d")
+                for day in pc.unique(days).to_pylist():
+                    if day not in writers:
+                        part_dir = os.path.join(self.events_dir, f"day={day}")
+                        os.makedirs(part_dir, exist_ok=True)
+                        fd, tmp = tempfile.mkstemp(dir=part_dir, prefix=".tmp-")
+                        os.close(fd)
+                        writers[day] = (pq.ParquetWriter(tmp, EVENTS_SCHEMA), tmp, os.path.join(part_dir, f"{stem}.parquet"))
+                    writers[day][0].write_batch(batch.filter(pc.equal(days, day)))
+        except BaseException:
+            for writer, tmp, _ in writers.values():
+                writer.close()
+                os.remove(tmp)
+            raise
+        for writer, tmp, final in writers.values():
+            writer.close()
+            os.replace(tmp, final)
+        partial = (pd.concat(partials, ignore_index=True).groupby(["day", "language"], as_index=False)[DAILY_METRICS].sum()
+                   if partials else None)
+        return partial, rows
+
+    def _append_processed(self, name: str, offset: int) -> int:
+        """Anexa `name` ao processed.txt a partir de `offset` (descarta linha não confirmada); devolve o novo offset."""
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(self.processed_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, offset)
+            os.lseek(fd, offset, os.SEEK_SET)
+            return offset + os.write(fd, (name + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _commit_daily(self, daily: pd.DataFrame, state: dict) -> None:
+        table = pa.Table.from_pandas(daily, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), STATE_KEY: json.dumps(state).encode()})
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        os.close(fd)
+        pq.write_table(table, tmp)
+        os.replace(tmp, self.daily_path)
+
+    def ingest(self, raw_dir: str, repo_languages: RepoLanguages, chunk_lines: int = CHUNK_LINES,
+               max_files: int | None = None, log=print) -> dict:
+        """Processa os arquivos pendentes (um por vez) e atualiza agregados + estado após cada um.
+
+        Arquivos com hora ≤ watermark (chegaram depois de horas mais novas) são ingeridos normalmente e
+        contados em `late`; nomes fora do padrão do GH Archive são ignorados e contados em `skipped`.
+        """
+        unrecognized = [n for n in os.listdir(raw_dir) if n.endswith(".json.gz") and file_hour(n) is None]
+        for name in unrecognized:
+            log(f"{name}: nome fora do padrão AAAA-MM-DD-H.json.gz — ignorado")
+        files = self.pending(raw_dir)[:max_files]
+        state = self.state()
+        daily = self.read_daily()[["day", "language"] + DAILY_METRICS]
+        summary = {"files": 0, "events": 0, "late": 0, "skipped": len(unrecognized),
+                   "watermark": state.get("watermark")}
+        for path in files:
+            t0 = time.perf_counter()
+            hour = file_hour(path)
+            wm = state.get("watermark")
+            late = wm is not None and hour <= datetime.fromisoformat(wm)
+            partial, rows = self._write_events(path, iter_event_batches(path, repo_languages, chunk_lines))
+            if partial is not None:
+                daily = merge_daily(daily, partial)
+            processed_bytes = self._append_processed(os.path.basename(path), state.get("processed_bytes", 0))
+            state = {"watermark": wm if late else hour.isoformat(), "files": state.get("files", 0) + 1,
+                     "events": state.get("events", 0) + rows, "late": state.get("late", 0) + late,
+                     "processed_bytes": processed_bytes, "updated_at": time.time()}
+            self._commit_daily(daily, state)
+            summary["files"] += 1
+            summary["events"] += rows
+            summary["late"] += late
+            summary["watermark"] = state["watermark"]
+            log(f"{os.path.basename(path)}: {rows:,} eventos em {time.perf_counter() - t0:.2f}s"
+                + (f" (atrasado: hora ≤ watermark {wm})" if late else ""))
+        return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Eventos estilo GitHub Archive: fixtures e ingestão incremental.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    gen = sub.add_parser("generate", help="Gera arquivos horários sintéticos (.json.gz) sobre a fixture de linguagens.")
+    gen.add_argument("--out", default=DEFAULT_EVENTS_RAW_DIR)
+    gen.add_argument("--start", default="2015-01-01")
+    gen.add_argument("--hours", type=int, default=72)
+    gen.add_argument("--events-per-hour", type=int, default=2_000)
+    gen.add_argument("--seed", type=int, default=42)
+    ing = sub.add_parser("ingest", help="Processa os arquivos ainda não ingeridos e atualiza os agregados diários.")
+    ing.add_argument("--raw", default=DEFAULT_EVENTS_RAW_DIR)
+    ing.add_argument("--store", default=os.environ.get("ANALISE_EVENTS_DIR", DEFAULT_EVENTS_DIR))
+    ing.add_argument("--languages", default=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH),
+                     help="Parquet no formato de `github_repos.languages` para mapear repo → linguagem dominante.")
+    ing.add_argument("--chunk-lines", type=int, default=CHUNK_LINES)
+    ing.add_argument("--max-files", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "generate":
+        paths = generate_event_files(args.out, args.start, args.hours, args.events_per_hour, seed=args.seed)
+        print(f"{len(paths)} arquivos em {args.out}")
+        return 0
+    log = lambda msg: print(msg, file=sys.stderr)  # noqa: E731
+    store = EventStore(args.store)
+    if not store.pending(args.raw):
+        print(json.dumps({"files": 0, "events": 0, "late": 0, "watermark": store.state().get("watermark")}))
+        return 0
+    summary = store.ingest(args.raw, RepoLanguages.from_languages_parquet(args.languages), args.chunk_lines,
+                           args.max_files, log=log)
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+# analise/fixtures.py
+# Fixtures Parquet no formato de `github_repos.languages` para o backend local (offline)
+
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_FIXTURE_PATH = os.path.join("data", "fixtures", "languages.parquet")
+DEFAULT_FIXTURE_REPOS = 200_000
+
+# Linguagens e pesos aproximados (popularidade relativa como linguagem de um repo)
+LANGUAGES = [
+    ("JavaScript", 14.0), ("Python", 11.0), ("Java", 9.0), ("HTML", 9.0), ("CSS", 8.0),
+    ("Shell", 7.0), ("C", 5.0), ("C++", 5.0), ("Ruby", 4.0), ("PHP", 4.0),
+    ("TypeScript", 3.0), ("Go", 2.5), ("C#", 2.5), ("Makefile", 2.5), ("Objective-C", 1.5),
+    ("Swift", 1.0), ("Rust", 0.8), ("Kotlin", 0.7), ("Perl", 0.7), ("Scala", 0.5),
+    ("R", 0.5), ("Lua", 0.4), ("Haskell", 0.3), ("Batchfile", 0.6), ("Jupyter Notebook", 0.8),
+    ("Dockerfile", 0.6), ("Vue", 0.4), ("PowerShell", 0.3), ("CMake", 0.5), ("TeX", 0.3),
+]
+
+LANGUAGES_SCHEMA = pa.schema([
+    ("repo_name", pa.string()),
+    ("language", pa.list_(pa.struct([("name", pa.string()), ("bytes", pa.int64())]))),
+])
+
+
+DEFAULT_CHUNK_REPOS = 1_000_000
+
+# Caudas pesadas: uma fração dos repos vem de uma Pareto (monorepos, vendored, mirrors)
+# e uma fração tem muitas linguagens (Zipf), como no `github_repos.languages` real.
+PARETO_FRACTION, PARETO_ALPHA, PARETO_SCALE = 0.03, 1.2, 1e6
+ZIPF_FRACTION, ZIPF_A = 0.05, 1.8
+MAX_REPO_BYTES = 10**13
+
+
+def _lang_tables():
+    names = np.array([n for n, _ in LANGUAGES], dtype=object)
+    weights = np.array([w for _, w in LANGUAGES], dtype=float)
+    return names, weights / weights.sum()
+
+
+def _draw_chunk(rng: np.random.Generator, n: int, weights: np.ndarray):
+    """Sorteia um bloco de n repos: (nº de linguagens, offsets, índice da linguagem, bytes por linguagem)."""
+    n_names = len(weights)
+
+    # nº de linguagens: 1 + geométrica (maioria monolíngue), com uma fração Zipf (cauda longa)
+    k = rng.geometric(0.45, size=n)
+    tail = rng.random(n) < ZIPF_FRACTION
+    k[tail] = rng.zipf(ZIPF_A, size=int(tail.sum())) + 1
+    k = np.minimum(k, n_names)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(k, out=offsets[1:])
+    total = int(offsets[-1])
+
+    # tamanho do repo: log-normal no corpo + Pareto na cauda; cresce com o nº de linguagens
+    repo_scale = rng.lognormal(mean=9.0, sigma=2.0, size=n) * k
+    tail = rng.random(n) < PARETO_FRACTION
+    repo_scale[tail] = (rng.pareto(PARETO_ALPHA, size=int(tail.sum())) + 1) * PARETO_SCALE
+    repo_scale = np.minimum(repo_scale, MAX_REPO_BYTES)
+
+    # bytes por linguagem ~ Dirichlet(1) via exponenciais normalizadas por repo
+    repo_of = np.repeat(np.arange(n), k)
+    shares = rng.exponential(size=total)
+    shares /= np.add.reduceat(shares, offsets[:-1])[repo_of]
+    lang_bytes = np.maximum(1, shares * repo_scale[repo_of]).astype(np.int64)
+
+    # linguagens distintas por repo sem reposição (Gumbel-top-k): ordena log(p)+Gumbel e pega as k primeiras
+    keys = np.log(weights)[None, :] + rng.gumbel(size=(n, n_names))
+    order = np.argsort(-keys, axis=1)
+    lang_idx = order[np.arange(n_names)[None, :] < k[:, None]]
+    return k, offsets, lang_idx, lang_bytes
+
+
+def _chunks(n_repos: int, seed: int, chunk_size: int):
+    # uma sub-seed por bloco: o resultado independe de quantos blocos são gerados/consumidos
+    for c, start in enumerate(range(0, n_repos, chunk_size)):
+        n = min(chunk_size, n_repos - start)
+        yield start, n, np.random.default_rng([seed, c])
+
+
+def iter_languages(n_repos: int, seed: int = 42, chunk_size: int = DEFAULT_CHUNK_REPOS):
+    """Gera a tabela sintética (repo_name, language[]) em blocos Arrow, reprodutível pela seed."""
+    names, weights = _lang_tables()
+    for start, n, rng in _chunks(n_repos, seed, chunk_size):
+        k, offsets, lang_idx, lang_bytes = _draw_chunk(rng, n, weights)
+        structs = pa.StructArray.from_arrays(
+            [pa.array(names[lang_idx], type=pa.string()), pa.array(lang_bytes, type=pa.int64())],
+            names=["name", "bytes"],
+        )
+        language = pa.ListArray.from_arrays(pa.array(offsets.astype(np.int32), type=pa.int32()), structs)
+        repo_name = pa.array([f"user{i % 9973}/repo-{i}" for i in range(start, start + n)], type=pa.string())
+        yield pa.Table.from_arrays([repo_name, language], schema=LANGUAGES_SCHEMA)
+
+
+def generate_languages(n_repos: int, seed: int = 42) -> pa.Table:
+    """Gera uma tabela sintética (repo_name, language[]) reprodutível pela seed."""
+    return pa.concat_tables(iter_languages(n_repos, seed))
+
+
+def iter_per_repo(n_repos: int, seed: int = 42, chunk_size: int = DEFAULT_CHUNK_REPOS):
+    """Mesmos sorteios de `iter_languages`, já reduzidos à visão por repo (sem UNNEST/SQL).
+
+    Serve para benchmarks em 10^7–10^8 repos, onde materializar as listas de structs
+    não caberia em memória. Empate de bytes: vence a primeira linguagem sorteada.
+    """
+    names, weights = _lang_tables()
+    categories = pa.array(names.tolist(), type=pa.string())
+    for _, n, rng in _chunks(n_repos, seed, chunk_size):
+        k, offsets, lang_idx, lang_bytes = _draw_chunk(rng, n, weights)
+        starts = offsets[:-1]
+        repo_of = np.repeat(np.arange(n), k)
+        order = np.lexsort((-lang_bytes, repo_of))  # por repo, bytes desc (estável)
+        dominant = order[starts]
+        yield pa.table({
+            "dominant_language": pa.DictionaryArray.from_arrays(pa.array(lang_idx[dominant], type=pa.int32()), categories),
+            "dominant_bytes": pa.array(lang_bytes[dominant], type=pa.int64()),
+            "total_bytes": pa.array(np.add.reduceat(lang_bytes, starts), type=pa.int64()),
+            "num_languages": pa.array(k, type=pa.int64()),
+        })
+
+
+def ensure_fixture(path: str = DEFAULT_FIXTURE_PATH, n_repos: int = DEFAULT_FIXTURE_REPOS, seed: int = 42) -> str:
+    """Cria o Parquet de fixture se ainda não existir e devolve o caminho."""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        pq.write_table(generate_languages(n_repos, seed), tmp)
+        os.replace(tmp, path)
+    return path
+
+
+# ----- eventos no formato do GitHub Archive (um JSON por linha, um .json.gz por hora) -----
+DEFAULT_EVENTS_RAW_DIR = os.path.join("data", "events", "raw")
+EVENT_TYPES = [
+    ("PushEvent", 0.50), ("CreateEvent", 0.12), ("WatchEvent", 0.10), ("PullRequestEvent", 0.08),
+    ("IssuesEvent", 0.06), ("IssueCommentEvent", 0.08), ("ForkEvent", 0.03), ("DeleteEvent", 0.03),
+]
+
+
+def event_file_name(hour) -> str:
+    """Nome no padrão do GH Archive: 2015-01-01-15.json.gz (hora sem zero à esquerda)."""
+    return f"{hour:%Y-%m-%d}-{hour.hour}.json.gz"
+
+
+def generate_event_files(out_dir: str = DEFAULT_EVENTS_RAW_DIR, start: str = "2015-01-01", hours: int = 72,
+                         events_per_hour: int = 2_000, n_repos: int = DEFAULT_FIXTURE_REPOS, seed: int = 42) -> list[str]:
+    """Grava `hours` arquivos horários de eventos sintéticos sobre os repos da fixture de linguagens.
+
+    A atividade por repo segue uma Zipf (poucos repos concentram os eventos); ~2% dos eventos são de
+    repos fora da fixture (sem linguagem conhecida). Reprodutível pela seed; arquivos existentes são mantidos.
+    """
+    import gzip
+    import json
+    from datetime import datetime, timedelta, timezone
+
+    os.makedirs(out_dir, exist_ok=True)
+    types = np.array([t for t, _ in EVENT_TYPES], dtype=object)
+    type_p = np.array([w for _, w in EVENT_TYPES], dtype=float)
+    t0 = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    paths = []
+    for h in range(hours):
+        hour = t0 + timedelta(hours=h)
+        path = os.path.join(out_dir, event_file_name(hour))
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+        rng = np.random.default_rng([seed, h])
+        n = int(rng.poisson(events_per_hour))
+        repo = (rng.zipf(1.3, size=n) - 1) % n_repos
+        unknown = rng.random(n) < 0.02
+        kind = rng.choice(types, size=n, p=type_p / type_p.sum())
+        second = np.sort(rng.integers(0, 3600, size=n))
+        commits = rng.geometric(0.5, size=n)
+        actor = rng.integers(0, 50_000, size=n)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for i in range(n):
+                name = f"ghost{repo[i]}/unknown" if unknown[i] else f"user{repo[i] % 9973}/repo-{repo[i]}"
+                event = {
+                    "id": f"{h}{i:07d}",
+                    "type": kind[i],
+                    "actor": {"login": f"dev{actor[i]}"},
+                    "repo": {"name": name},
+                    "payload": {"size": int(commits[i])} if kind[i] == "PushEvent" else {},
+                    "public": True,
+                    "created_at": (hour + timedelta(seconds=int(second[i]))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                }
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+    return paths
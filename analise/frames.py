@@ -0,0 +1,62 @@
+# analise/frames.py
+# Conversão Arrow → pandas com dtypes compactos e medição de memória (antes/depois)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# custo aproximado de um str Python por valor em coluna object: ponteiro (8) + cabeçalho do objeto (49)
+_PY_STR_OVERHEAD = 8 + 49
+
+
+def default_pandas_nbytes(table: pa.Table) -> int:
+    """Estimativa do `to_dataframe()` padrão: strings como object, inteiros como int64, floats como float64."""
+    total = 0
+    for field, col in zip(table.schema, table.columns):
+        typ = field.type
+        if pa.types.is_dictionary(typ):
+            col = col.cast(typ.value_type)
+            typ = typ.value_type
+        if pa.types.is_string(typ) or pa.types.is_large_string(typ):
+            chars = pc.sum(pc.utf8_length(col)).as_py() or 0
+            total += len(col) * _PY_STR_OVERHEAD + int(chars)
+        else:
+            total += len(col) * 8
+    return total
+
+
+def compact_per_repo(table: pa.Table, keep_repo_name: bool = False) -> pd.DataFrame:
+    """Visão por repo com dtypes enxutos.
+
+    - `dominant_language` → dictionary/categorical (poucas centenas de valores distintos);
+    - `num_languages` → menor inteiro sem sinal que comporta o máximo;
+    - `repo_name` só é mantido se pedido (não é usado nas análises).
+    """
+    if not keep_repo_name and "repo_name" in table.column_names:
+        table = table.drop_columns(["repo_name"])
+    if "dominant_language" in table.column_names:
+        i = table.column_names.index("dominant_language")
+        col = table.column(i)
+        if not pa.types.is_dictionary(col.type):
+            table = table.set_column(i, "dominant_language", pc.dictionary_encode(col))
+    df = table.to_pandas(split_blocks=True)
+    if "num_languages" in df.columns and len(df):
+        df["num_languages"] = pd.to_numeric(df["num_languages"], downcast="unsigned")
+    return df
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(table: pa.Table, df: pd.DataFrame) -> dict:
+    before = default_pandas_nbytes(table)
+    after = frame_nbytes(df)
+    return {
+        "rows": int(table.num_rows),
+        "arrow_bytes": int(table.nbytes),
+        "pandas_default_bytes": before,
+        "pandas_compact_bytes": after,
+        "reduction": (1 - after / before) if before else np.nan,
+    }
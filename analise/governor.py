@@ -0,0 +1,223 @@
+# analise/governor.py
+# Governança de custo: orçamento de bytes por sessão e por dia + ledger persistente de consultas
+#
+# O ledger é um JSONL só de append (uma linha por evento, gravada com O_APPEND num único write),
+# então vários processos/sessões podem registrar ao mesmo tempo sem lock. Os totais ficam em memória,
+# por (dia, backend, sessão, tipo), e cada consulta aos totais só lê o final do arquivo desde o último
+# offset lido — o custo não cresce com o histórico.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from analise.backends import QueryBackend
+from analise.cache import normalize_sql
+
+DEFAULT_LEDGER_PATH = os.path.join("data", "ledger.jsonl")
+
+
+class BudgetExceeded(RuntimeError):
+    """A consulta estouraria o orçamento de bytes restante (sessão ou dia)."""
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+class ByteLedger:
+    """Registro persistente de bytes processados (consultas) e economizados (hits de cache)."""
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._offset = 0  # bytes do arquivo já somados em `_totals`
+        self._totals: dict[tuple, list[int]] = {}  # (dia, backend, sessão, tipo) → [bytes, eventos]
+
+    def append(self, **entry) -> dict:
+        entry = {"ts": time.time(), **entry}
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return entry
+
+    def _catch_up(self) -> None:
+        """Soma nos totais as linhas completas gravadas (por qualquer processo) desde o último offset."""
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < self._offset:  # arquivo trocado/truncado: recomeça
+                    self._offset, self._totals = 0, {}
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            self._offset, self._totals = 0, {}
+            return
+        end = chunk.rfind(b"\n") + 1  # linha ainda sendo escrita fica para a próxima leitura
+        for line in chunk[:end].splitlines():
+            try:
+                e = json.loads(line)
+            except json.JSONDecodeError:  # linha truncada (processo morto no meio do write)
+                continue
+            key = (_day(e.get("ts", 0)), e.get("backend"), e.get("session"), "hit" if e.get("kind") == "hit" else "query")
+            acc = self._totals.setdefault(key, [0, 0])
+            acc[0] += int(e.get("bytes", 0))
+            acc[1] += 1
+        self._offset += end
+
+    def totals(self, backend: str | None = None, session: str | None = None, day: str | None = None) -> dict:
+        """{"processed": bytes, "saved": bytes, "queries": n, "hits": n} filtrando por backend/sessão/dia."""
+        out = {"processed": 0, "saved": 0, "queries": 0, "hits": 0}
+        with self._lock:
+            self._catch_up()
+            for (e_day, e_backend, e_session, kind), (n_bytes, n) in self._totals.items():
+                if (backend and e_backend != backend) or (session and e_session != session) or (day and e_day != day):
+                    continue
+                if kind == "hit":
+                    out["saved"] += n_bytes
+                    out["hits"] += n
+                else:
+                    out["processed"] += n_bytes
+                    out["queries"] += n
+        return out
+
+
+class Governor:
+    """Orçamentos de bytes (0 = sem limite) por sessão e por dia, por backend.
+
+    `session_resolver` devolve o id da sessão corrente (na página: o `session_id` do Streamlit,
+    disponível também nas threads do JobRunner); fora do Streamlit, "cli".
+    """
+
+    def __init__(self, ledger: ByteLedger, session_budget: int = 0, daily_budget: int = 0,
+                 session_resolver=None):
+        self.ledger = ledger
+        self.session_budget = int(session_budget)
+        self.daily_budget = int(daily_budget)
+        self.session_resolver = session_resolver or (lambda: "cli")
+        self._lock = threading.Lock()
+        self._reserved: dict[tuple[str, str], int] = {}  # bytes estimados em andamento, por (backend, sessão)
+
+    def session(self) -> str:
+        return self.session_resolver() or "cli"
+
+    def spent(self, backend: str, session: str | None = None) -> dict:
+        today = _day(time.time())
+        return {
+            "session": self.ledger.totals(backend, session=session or self.session()),
+            "day": self.ledger.totals(backend, day=today),
+        }
+
+    def remaining(self, backend: str, session: str | None = None, reserved: tuple[int, int] = (0, 0)) -> float:
+        """Menor folga entre sessão e dia (inf se nenhum orçamento estiver definido).
+
+        `reserved` = (em andamento na sessão, em andamento no backend), descontados da folga correspondente.
+        """
+        spent = self.spent(backend, session)
+        left = [float("inf")]
+        if self.session_budget:
+            left.append(self.session_budget - spent["session"]["processed"] - reserved[0])
+        if self.daily_budget:
+            left.append(self.daily_budget - spent["day"]["processed"] - reserved[1])
+        return max(min(left), 0)
+
+    def reserve(self, backend: str, estimate: int, session: str | None = None) -> None:
+        """Checa a folga (descontando consultas em andamento) e reserva `estimate`; levanta BudgetExceeded.
+
+        O que outra sessão tem em andamento só conta contra o orçamento diário, não contra o desta sessão.
+        """
+        session = session or self.session()
+        with self._lock:
+            in_flight = (self._reserved.get((backend, session), 0),
+                         sum(v for (b, _), v in self._reserved.items() if b == backend))
+            left = self.remaining(backend, session, in_flight)
+            if estimate > left:
+                raise BudgetExceeded(f"Consulta estimada em {estimate:,} bytes; restam {max(left, 0):,.0f} no orçamento.")
+            self._reserved[(backend, session)] = in_flight[0] + estimate
+
+    def release(self, backend: str, estimate: int, session: str | None = None) -> None:
+        key = (backend, session or self.session())
+        with self._lock:
+            left = self._reserved.get(key, 0) - estimate
+            if left > 0:
+                self._reserved[key] = left
+            else:
+                self._reserved.pop(key, None)
+
+    def record(self, backend: str, sql: str, bytes_processed: int, estimate: int | None = None,
+               session: str | None = None) -> None:
+        self.ledger.append(kind="query", backend=backend, session=session or self.session(),
+                           sql=hashlib.sha256(normalize_sql(sql).encode()).hexdigest()[:16],
+                           bytes=max(int(bytes_processed), 0), estimate=estimate)
+
+    def record_hit(self, backend: str, sql: str, bytes_saved: int, session: str | None = None) -> None:
+        self.ledger.append(kind="hit", backend=backend, session=session or self.session(),
+                           sql=hashlib.sha256(normalize_sql(sql).encode()).hexdigest()[:16],
+                           bytes=max(int(bytes_saved), 0))
+
+    def largest_fitting(self, options, cost, backend: str, session: str | None = None):
+        """Maior opção (ex.: sample_pct) cujo custo estimado `cost(opção)` cabe na folga; None se nenhuma."""
+        left = self.remaining(backend, session)
+        for opt in sorted(options, reverse=True):
+            if cost(opt) <= left:
+                return opt
+        return None
+
+
+class GovernedBackend(QueryBackend):
+    """Checa o orçamento (dry-run) antes de cada consulta e registra os bytes no ledger.
+
+    Os bytes entram no ledger antes de a reserva ser solta: nunca ficam fora das duas contas ao mesmo tempo.
+    Fica por baixo do CachedBackend: só consultas que realmente vão ao motor passam por aqui.
+    """
+
+    def __init__(self, inner: QueryBackend, governor: Governor):
+        self.inner = inner
+        self.governor = governor
+        self.name = inner.name
+        self.dialect = inner.dialect
+        self.location = inner.location
+
+    def query_arrow(self, sql: str):
+        estimate, session = self.inner.estimate_bytes(sql), self.governor.session()
+        self.governor.reserve(self.name, estimate, session)
+        try:
+            table, bytes_processed = self.inner.query_arrow(sql)
+            self.governor.record(self.name, sql, bytes_processed, estimate, session)
+        finally:
+            self.governor.release(self.name, estimate, session)
+        return table, bytes_processed
+
+    def profile(self, sql: str) -> dict:
+        estimate, session = self.inner.estimate_bytes(sql), self.governor.session()
+        self.governor.reserve(self.name, estimate, session)
+        try:
+            stats = self.inner.profile(sql)
+            self.governor.record(self.name, sql, stats["bytes_processed"], estimate, session)
+        finally:
+            self.governor.release(self.name, estimate, session)
+        return stats
+
+    def execute(self, sql: str) -> int:
+        estimate, session = self.inner.estimate_bytes(sql), self.governor.session()
+        self.governor.reserve(self.name, estimate, session)
+        try:
+            bytes_processed = self.inner.execute(sql)
+            self.governor.record(self.name, sql, bytes_processed, estimate, session)
+        finally:
+            self.governor.release(self.name, estimate, session)
+        return bytes_processed
+
+    def estimate_bytes(self, sql: str) -> int:
+        return self.inner.estimate_bytes(sql)  # dry-run não é cobrado
+
+    def ping(self) -> None:
+        self.inner.ping()
+
+    def source_modified(self) -> float | None:
+        return self.inner.source_modified()
@@ -0,0 +1,62 @@
+# analise/inference.py
+# Inferência a partir de momentos (n, média, variância, covariância): Welch e Pearson com IC de Fisher
+
+import math
+
+import numpy as np
+
+
+def welch_from_moments(ma: float, va: float, na: int, mb: float, vb: float, nb: int, alpha=0.05):
+    """Welch (a − b) a partir de média/variância amostral (ddof=1)/n de cada grupo.
+
+    Retorna (diff, t, p_two, df, ci_low, ci_high) — mesmo contrato de `welch_t_ci`.
+    """
+    from scipy import stats
+    diff = ma - mb
+    if na <= 1 or nb <= 1:
+        return diff, np.nan, np.nan, np.nan, np.nan, np.nan
+    se = math.sqrt(max(va/na + vb/nb, 0))
+    if se == 0:
+        return diff, np.nan, np.nan, np.nan, np.nan, np.nan
+    df = (va/na + vb/nb)**2 / ((va**2)/((na**2)*(na-1)) + (vb**2)/((nb**2)*(nb-1)))
+    t = diff / se
+    p_two = 2 * (1 - stats.t.cdf(abs(t), df))
+    tcrit = stats.t.ppf(1 - alpha/2, df)
+    ci_low, ci_high = diff - tcrit * se, diff + tcrit * se
+    return diff, t, p_two, df, ci_low, ci_high
+
+
+def welch_t_ci(a: np.ndarray, b: np.ndarray, alpha=0.05):
+    a = np.asarray(a, dtype=float); b = np.asarray(b, dtype=float)
+    return welch_from_moments(a.mean(), a.var(ddof=1), len(a), b.mean(), b.var(ddof=1), len(b), alpha=alpha)
+
+
+def pearson_from_moments(n: int, cov_xy: float, var_x: float, var_y: float) -> tuple[float, float]:
+    """r e p-valor bilateral (t com n−2 gl, como `scipy.stats.pearsonr`) a partir de covariância/variâncias."""
+    from scipy import stats
+    if n < 3 or var_x <= 0 or var_y <= 0:
+        return np.nan, np.nan
+    r = float(np.clip(cov_xy / math.sqrt(var_x * var_y), -1.0, 1.0))
+    if abs(r) == 1.0:
+        return r, 0.0
+    t = r * math.sqrt((n - 2) / (1 - r * r))
+    return r, float(2 * stats.t.sf(abs(t), n - 2))
+
+
+def fisher_ci(r: float, n: int, alpha=0.05) -> tuple[float, float]:
+    """IC de r via transformação z de Fisher."""
+    from scipy import stats
+    if n < 4 or not np.isfinite(r):
+        return np.nan, np.nan
+    z = np.arctanh(r); se = 1 / math.sqrt(n - 3)
+    zcrit = stats.norm.ppf(1 - alpha/2)
+    r_low, r_high = np.tanh([z - zcrit*se, z + zcrit*se])
+    return float(r_low), float(r_high)
+
+
+def correlation_magnitude(r: float) -> str:
+    abs_r = abs(r)
+    if abs_r < 0.1: return "muito fraca"
+    elif abs_r < 0.3: return "fraca"
+    elif abs_r < 0.5: return "moderada"
+    else: return "forte"
@@ -0,0 +1,65 @@
+# analise/jobs.py
+# Submissão concorrente de consultas/dry-runs com latência por job (fila + execução)
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class JobRunner:
+    """Pool de threads nomeado: submete tudo de uma vez e deixa cada consumidor esperar só pelo que usa.
+
+    As consultas são I/O-bound (rede/BigQuery ou DuckDB, que libera o GIL), então threads bastam.
+    """
+
+    def __init__(self, max_workers: int = 4, initializer=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analise-job",
+                                        initializer=initializer)
+        self._futures: dict[str, Future] = {}
+        self._timings: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def submit(self, name: str, fn, *args, **kwargs) -> Future:
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            ok = False
+            try:
+                out = fn(*args, **kwargs)
+                ok = True
+                return out
+            finally:
+                with self._lock:
+                    self._timings[name] = {"submitted": submitted, "started": started,
+                                           "finished": time.perf_counter(), "ok": ok}
+
+        fut = self._pool.submit(run)
+        self._futures[name] = fut
+        return fut
+
+    def result(self, name: str, timeout: float | None = None):
+        return self._futures[name].result(timeout=timeout)
+
+    def timings(self) -> pd.DataFrame:
+        """Latência por job (fila, execução, total) e, na última linha, o wall time do lote."""
+        with self._lock:
+            items = dict(self._timings)
+        rows = [
+            {"job": name, "fila_s": t["started"] - t["submitted"], "exec_s": t["finished"] - t["started"],
+             "total_s": t["finished"] - t["submitted"], "ok": t["ok"]}
+            for name, t in items.items()
+        ]
+        df = pd.DataFrame(rows, columns=["job", "fila_s", "exec_s", "total_s", "ok"])
+        if items:
+            wall = max(t["finished"] for t in items.values()) - min(t["submitted"] for t in items.values())
+            df.loc[len(df)] = {"job": "⟶ wall time (concorrente)", "fila_s": np.nan, "exec_s": df["exec_s"].sum(),
+                               "total_s": wall, "ok": True}
+        return df
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
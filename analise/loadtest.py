@@ -0,0 +1,170 @@
+# analise/loadtest.py
+# Teste de carga local do serviço (analise/api.py): vazão, p50/p99 e quantos pedidos foram coalescidos
+#
+# Uso:
+#   python -m analise.loadtest                       # sobe o uvicorn com o backend local (fixture) e mede
+#   python -m analise.loadtest --url http://host:8000 --concurrency 32 --requests 5000
+#
+# Sem --url, o servidor sobe com um DiskCache temporário: a primeira rajada pega o cache frio, e os
+# pedidos idênticos simultâneos aparecem como "coalesced" no X-Cache. Com --revalidate, cada cliente
+# reenvia o ETag recebido (If-None-Match) e mede o caminho 304.
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+
+DEFAULT_PATHS = (
+    "/v1/top-languages?top_n=20",
+    "/v1/top-languages?top_n=10",
+    "/v1/descriptives?sample_pct=10&scale=log10",
+    "/v1/descriptives?sample_pct=10&scale=linear",
+    "/v1/correlation?sample_pct=10",
+    "/v1/welch?sample_pct=10",
+    "/v1/welch?sample_pct=5&alpha=0.01",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(conn: http.client.HTTPConnection, path: str, headers: dict | None = None):
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    return resp.status, dict((k.lower(), v) for k, v in resp.getheaders()), body
+
+
+def start_server(port: int, cache_dir: str, local_data: str | None = None, timeout: float = 30.0):
+    """Sobe `uvicorn analise.api:app` com o backend local e espera o /health responder."""
+    env = {**os.environ, "ANALISE_BACKEND": "local", "ANALISE_CACHE_DIR": cache_dir}
+    if local_data:
+        env["ANALISE_LOCAL_DATA"] = local_data
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "analise.api:app", "--host", "127.0.0.1",
+                             "--port", str(port), "--log-level", "warning", "--no-access-log"], env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn saiu com código {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            if _get(conn, "/health")[0] == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("o servidor não respondeu a tempo")
+
+
+def run(base_url: str, paths, concurrency: int, n_requests: int, revalidate: bool = False) -> dict:
+    """`concurrency` clientes keep-alive dividem `n_requests` pedidos, percorrendo `paths` em rodízio."""
+    parts = urlsplit(base_url)
+    counter = itertools.count()
+    latencies, statuses, sources = [], Counter(), Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+
+    def client(worker: int):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        etags: dict[str, str] = {}
+        local_lat, local_status, local_src = [], Counter(), Counter()
+        start.wait()
+        while (i := next(counter)) < n_requests:
+            path = paths[(i + worker) % len(paths)]
+            headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+            t0 = time.perf_counter()
+            status, resp_headers, _ = _get(conn, path, headers)
+            local_lat.append(time.perf_counter() - t0)
+            local_status[status] += 1
+            local_src[resp_headers.get("x-cache", "304" if status == 304 else "-")] += 1
+            if "etag" in resp_headers:
+                etags[path] = resp_headers["etag"]
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            statuses.update(local_status)
+            sources.update(local_src)
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(lat_ms), "concurrency": concurrency, "elapsed_s": elapsed,
+        "throughput_rps": len(lat_ms) / elapsed if elapsed else float("nan"),
+        "p50_ms": float(np.percentile(lat_ms, 50)), "p90_ms": float(np.percentile(lat_ms, 90)),
+        "p99_ms": float(np.percentile(lat_ms, 99)), "max_ms": float(lat_ms.max()),
+        "status": dict(statuses), "x_cache": dict(sources),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de métricas (analise/api.py).")
+    parser.add_argument("--url", help="Servidor já em execução; sem isso, sobe um uvicorn local (backend local).")
+    parser.add_argument("--local-data", help="Parquet do backend local (padrão: fixture).")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--revalidate", action="store_true", help="Reenvia o ETag (If-None-Match) → mede os 304.")
+    parser.add_argument("--path", action="append", help="Rota a testar (repetível); padrão: um conjunto misto.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args(argv)
+
+    paths = tuple(args.path or DEFAULT_PATHS)
+    proc, tmp = None, None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            tmp = tempfile.TemporaryDirectory(prefix="analise-loadtest-")
+            port = _free_port()
+            proc = start_server(port, tmp.name, args.local_data)
+            base_url = f"http://127.0.0.1:{port}"
+        result = run(base_url, paths, args.concurrency, args.requests, args.revalidate)
+        parts = urlsplit(base_url)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        health = json.loads(_get(conn, "/health")[2])
+        result["server"], result["single_flight"] = health["stats"], health.get("single_flight", {})
+        conn.close()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if tmp is not None:
+            tmp.cleanup()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['requests']:,} pedidos · {result['concurrency']} clientes · {result['elapsed_s']:.2f}s")
+        print(f"vazão: {result['throughput_rps']:,.0f} req/s")
+        print(f"latência: p50 {result['p50_ms']:.2f} ms · p90 {result['p90_ms']:.2f} ms · "
+              f"p99 {result['p99_ms']:.2f} ms · máx {result['max_ms']:.2f} ms")
+        print(f"status: {result['status']} · X-Cache: {result['x_cache']}")
+        print(f"servidor: {result['server']}")
+        print(f"single-flight (consultas ao backend): {result['single_flight']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+# analise/materialize.py
+# Materialização offline da visão por repo: dataset Parquet particionado por bucket de hash + manifesto
+#
+# Uso (fora do Streamlit):
+#   python -m analise.materialize --backend bigquery --out data/per_repo
+#   python -m analise.materialize --backend local --out data/per_repo --force
+#
+# Refresh incremental: se a tabela de origem não mudou (metadado `modified`), nada é consultado;
+# se mudou, um checksum por bucket (XOR dos hashes das linhas) decide quais buckets reprocessar.
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from analise import queries
+from analise.backends import QueryBackend, make_backend
+from analise.buckets import N_BUCKETS, contiguous_ranges, split_by_bucket
+from analise.cache import normalize_sql
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.governor import DEFAULT_LEDGER_PATH, ByteLedger, GovernedBackend, Governor
+from analise.sampling import DEFAULT_LOCAL_BUCKETED_DIR
+
+DEFAULT_MATERIALIZED_DIR = os.path.join("data", "per_repo")
+MANIFEST_NAME = "_manifest.json"  # prefixo "_" → ignorado pelo pyarrow.dataset
+MANIFEST_VERSION = 1
+ROW_GROUP_SIZE = 128 * 1024
+PER_REPO_COLUMNS = ["dominant_language", "dominant_bytes", "total_bytes", "num_languages"]
+
+
+def sql_fingerprint(dialect: str) -> str:
+    """Hash do SQL por bucket: se a lógica da visão por repo mudar, todos os buckets são refeitos."""
+    return hashlib.sha256(normalize_sql(queries.sql_per_repo_buckets(0, 1, dialect)).encode()).hexdigest()[:16]
+
+
+def read_manifest(root: str) -> dict | None:
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_manifest(root: str, manifest: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(root, MANIFEST_NAME))
+
+
+def _write_bucket(root: str, bucket: int, table: pa.Table) -> str:
+    """Grava um bucket como um único Parquet (troca atômica); ordenado por linguagem → estatísticas úteis por row group."""
+    part_dir = os.path.join(root, f"bucket={bucket}")
+    os.makedirs(part_dir, exist_ok=True)
+    table = table.drop_columns([c for c in ("bucket",) if c in table.column_names])
+    table = table.sort_by([("dominant_language", "ascending"), ("total_bytes", "descending")])
+    path = os.path.join(part_dir, "part-0.parquet")
+    tmp = os.path.join(part_dir, f".tmp-{os.getpid()}.parquet")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, write_statistics=True, compression="zstd")
+    os.replace(tmp, path)
+    return os.path.relpath(path, root)
+
+
+def _split_ranges(ranges: list[tuple[int, int]], max_len: int) -> list[tuple[int, int]]:
+    out = []
+    for lo, hi in ranges:
+        for start in range(lo, hi, max_len):
+            out.append((start, min(hi, start + max_len)))
+    return out
+
+
+def materialize(backend: QueryBackend, root: str = DEFAULT_MATERIALIZED_DIR, buckets_per_query: int = N_BUCKETS,
+                force: bool = False, log=print) -> dict:
+    """Executa a visão por repo para os 100 buckets e grava/atualiza o dataset. Retorna um resumo."""
+    os.makedirs(root, exist_ok=True)
+    manifest = read_manifest(root) or {}
+    fingerprint = sql_fingerprint(backend.dialect)
+    reusable = (not force and manifest.get("version") == MANIFEST_VERSION
+                and manifest.get("backend") == backend.name and manifest.get("sql_fingerprint") == fingerprint)
+    old = manifest.get("buckets", {}) if reusable else {}
+    summary = {"refreshed": [], "bytes_processed": 0, "skipped": False}
+
+    modified = backend.source_modified()
+    if reusable and modified is not None and manifest.get("source_modified") == modified and len(old) == N_BUCKETS:
+        log("Fonte inalterada desde a última materialização; nada a fazer.")
+        summary["skipped"] = True
+        return summary
+
+    checks, b_proc = backend.query_arrow(queries.sql_bucket_checksums(backend.dialect))
+    summary["bytes_processed"] += max(b_proc, 0)
+    source = {int(b): (int(n), str(c)) for b, n, c in zip(checks.column("bucket").to_pylist(),
+                                                         checks.column("n_rows").to_pylist(),
+                                                         checks.column("checksum").to_pylist())}
+    stale = [b for b in range(N_BUCKETS)
+             if str(b) not in old or (old[str(b)]["n_rows"], old[str(b)]["checksum"]) != source.get(b, (0, "None"))]
+    log(f"{len(stale)} de {N_BUCKETS} buckets a (re)processar.")
+
+    manifest = {
+        "version": MANIFEST_VERSION, "backend": backend.name, "dialect": backend.dialect,
+        "sql_fingerprint": fingerprint, "columns": PER_REPO_COLUMNS + ["repo_name"],
+        "buckets": dict(old), "source_modified": manifest.get("source_modified") if reusable else None,
+    }
+    for lo, hi in _split_ranges(contiguous_ranges(stale), max(1, buckets_per_query)):
+        t0 = time.perf_counter()
+        table, b_proc = backend.query_arrow(queries.sql_per_repo_buckets(lo, hi, backend.dialect))
+        summary["bytes_processed"] += max(b_proc, 0)
+        for b, part in split_by_bucket(table, lo, hi).items():
+            n_rows, checksum = source.get(b, (0, "None"))
+            manifest["buckets"][str(b)] = {
+                "file": _write_bucket(root, b, part), "rows": part.num_rows,
+                "n_rows": n_rows, "checksum": checksum, "written_at": time.time(),
+            }
+            summary["refreshed"].append(b)
+        manifest["updated_at"] = time.time()
+        _write_manifest(root, manifest)  # a cada intervalo: uma interrupção não perde o que já foi gravado
+        log(f"buckets [{lo}, {hi}): {table.num_rows:,} repos em {time.perf_counter() - t0:.1f}s")
+
+    manifest["source_modified"] = modified
+    manifest["updated_at"] = time.time()
+    _write_manifest(root, manifest)
+    return summary
+
+
+class MaterializedPerRepo:
+    """Leitura do dataset materializado com poda de partição (bucket < sample_pct) e projeção de colunas."""
+
+    def __init__(self, root: str = DEFAULT_MATERIALIZED_DIR):
+        self.root = root
+        self.manifest = read_manifest(root)
+
+    def available(self, backend_name: str | None = None) -> bool:
+        m = self.manifest
+        return bool(m) and len(m.get("buckets", {})) == N_BUCKETS and backend_name in (None, m.get("backend"))
+
+    @property
+    def version(self) -> float | None:
+        return (self.manifest or {}).get("updated_at")
+
+    def _scanner(self, sample_pct: int, columns: list[str] | None = None, **kwargs) -> ds.Scanner:
+        dataset = ds.dataset(self.root, format="parquet", partitioning="hive")
+        return dataset.scanner(columns=columns or PER_REPO_COLUMNS,
+                               filter=ds.field("bucket") < int(sample_pct), **kwargs)
+
+    def load(self, sample_pct: int, columns: list[str] | None = None) -> pa.Table:
+        return self._scanner(sample_pct, columns).to_table()
+
+    def iter_batches(self, sample_pct: int, columns: list[str] | None = None, batch_size: int = ROW_GROUP_SIZE):
+        yield from self._scanner(sample_pct, columns, batch_size=batch_size).to_batches()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Materializa a visão por repo em Parquet particionado por bucket.")
+    parser.add_argument("--backend", choices=["bigquery", "local"], default=os.environ.get("ANALISE_BACKEND", "bigquery"))
+    parser.add_argument("--local-data", default=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH))
+    parser.add_argument("--location", default="US")
+    parser.add_argument("--bucketed", help="Cópia particionada por bucket (tabela no BigQuery / diretório no local); "
+                                           "padrão: ANALISE_BUCKETED_TABLE / ANALISE_LOCAL_BUCKETED.")
+    parser.add_argument("--out", default=os.environ.get("ANALISE_MATERIALIZED_DIR", DEFAULT_MATERIALIZED_DIR))
+    parser.add_argument("--buckets-per-query", type=int, default=N_BUCKETS,
+                        help="Buckets por consulta (menos = menos memória). Com a cópia particionada (--bucketed), cada "
+                             "consulta lê só os seus buckets; sem ela, cada uma faz scan completo da tabela.")
+    parser.add_argument("--force", action="store_true", help="Reprocessa todos os buckets.")
+    parser.add_argument("--daily-budget-gb", type=float, default=float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0")),
+                        help="Orçamento diário de bytes no BigQuery (0 = sem limite); compartilha o ledger da página.")
+    args = parser.parse_args(argv)
+    if args.bucketed is None:
+        args.bucketed = (os.environ.get("ANALISE_BUCKETED_TABLE") if args.backend == "bigquery"
+                         else os.environ.get("ANALISE_LOCAL_BUCKETED", DEFAULT_LOCAL_BUCKETED_DIR))
+
+    backend = make_backend(args.backend, local_path=args.local_data, location=args.location, bucketed=args.bucketed)
+    if args.backend == "bigquery":
+        governor = Governor(ByteLedger(os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)),
+                            daily_budget=int(args.daily_budget_gb * 1024**3), session_resolver=lambda: "materialize")
+        backend = GovernedBackend(backend, governor)
+    summary = materialize(backend, args.out, buckets_per_query=args.buckets_per_query, force=args.force)
+    print(json.dumps({"refreshed_buckets": len(summary["refreshed"]), "bytes_processed": summary["bytes_processed"],
+                      "skipped": summary["skipped"]}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
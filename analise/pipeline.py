@@ -0,0 +1,193 @@
+# analise/pipeline.py
+# Etapas da análise memoizadas pela impressão digital (fingerprint) das entradas — sem Streamlit
+#
+# Cada etapa (transformação, descritivas, distribuições, correlação, Welch, relatório) guarda o
+# resultado sob hash(nome da etapa, fingerprint dos argumentos). DataFrames produzidos levam o próprio
+# fingerprint em `df.attrs`, derivado do das entradas: a etapa seguinte não precisa re-hashear os dados.
+# Num rerun, só as etapas cujas entradas mudaram recalculam (ex.: trocar a escala refaz as descritivas,
+# mas não o log10, a correlação nem o Welch).
+#
+# O MEMO é global no processo (compartilhado pelas sessões do Streamlit) e limitado em bytes, não só em
+# entradas: a saída do `transform` é a visão por repo inteira, e 32 delas (uma por amostra/versão dos
+# dados) anulariam a economia de memória dos dtypes compactos. Frames maiores que o limite não são
+# guardados — as etapas seguintes continuam memoizadas, porque a chave delas não depende do frame estar aqui.
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from analise import analysis
+from analise.report import build_report_md
+
+FINGERPRINT_ATTR = "fingerprint"
+DEFAULT_MAXSIZE = 32
+DEFAULT_MAX_BYTES = 256 * 1024**2
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Hash do conteúdo (valores + nomes/dtypes das colunas); O(n), então é feito uma vez no fetch."""
+    h = hashlib.sha256()
+    h.update(repr([(c, str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:24]
+
+
+def with_fingerprint(df: pd.DataFrame, fp: str | None = None) -> pd.DataFrame:
+    df.attrs[FINGERPRINT_ATTR] = fp or frame_fingerprint(df)
+    return df
+
+
+def fingerprint(obj) -> str:
+    """Fingerprint de um argumento de etapa: usa o de `attrs` quando houver, senão hasheia o conteúdo."""
+    if isinstance(obj, pd.DataFrame):
+        fp = obj.attrs.get(FINGERPRINT_ATTR)
+        return fp if fp is not None else with_fingerprint(obj).attrs[FINGERPRINT_ATTR]
+    if isinstance(obj, np.ndarray):
+        return hashlib.sha256(obj.tobytes() + str(obj.dtype).encode()).hexdigest()[:24]
+    if isinstance(obj, dict):
+        return hashlib.sha256(repr(sorted((k, fingerprint(v)) for k, v in obj.items())).encode()).hexdigest()[:24]
+    if isinstance(obj, (list, tuple)):
+        return hashlib.sha256(repr([fingerprint(v) for v in obj]).encode()).hexdigest()[:24]
+    return repr(obj)
+
+
+def _nbytes(value) -> int:
+    """Tamanho aproximado de um resultado de etapa (DataFrames contam o conteúdo, inclusive strings)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class StageMemo:
+    """LRU de resultados por (etapa, fingerprint das entradas), limitado em entradas e em bytes, + hit/miss por etapa.
+
+    `runs` guarda, por etapa, se a última chamada recalculou ("miss") ou reaproveitou ("hit") — por
+    thread, já que cada sessão do Streamlit roda o script na sua; `reset_runs()` no início de cada rerun
+    permite mostrar o que foi refeito.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data: OrderedDict = OrderedDict()  # chave → (valor, bytes)
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+        self._local = threading.local()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return True, self._data[key][0]
+        return False, None
+
+    def put(self, key, value) -> None:
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                return  # sozinho já estoura o limite: não vale despejar tudo o mais por ele
+            self._data[key] = (value, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or self.nbytes > self.max_bytes:
+                self.nbytes -= self._data.popitem(last=False)[1][1]
+
+    @property
+    def runs(self) -> dict[str, str]:
+        if not hasattr(self._local, "runs"):
+            self._local.runs = {}
+        return self._local.runs
+
+    def count(self, stage: str, hit: bool) -> None:
+        with self._lock:
+            st = self.stats.setdefault(stage, {"hits": 0, "misses": 0})
+            st["hits" if hit else "misses"] += 1
+        self.runs[stage] = "hit" if hit else "miss"
+
+    def reset_runs(self) -> None:
+        self._local.runs = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+
+MEMO = StageMemo()
+
+
+def stage(name: str):
+    """Memoiza a função em MEMO pela fingerprint dos argumentos; DataFrames de saída herdam a chave."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = hashlib.sha256(
+                repr((name, [fingerprint(a) for a in args], sorted((k, fingerprint(v)) for k, v in kwargs.items())))
+                .encode()).hexdigest()[:24]
+            hit, value = MEMO.get(key)
+            MEMO.count(name, hit)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            if isinstance(value, pd.DataFrame):
+                with_fingerprint(value, key)
+            MEMO.put(key, value)
+            return value
+        return wrapper
+    return deco
+
+
+@stage("transform")
+def transform(df: pd.DataFrame) -> pd.DataFrame:
+    return analysis.add_log10(df)
+
+
+@stage("descriptives")
+def descriptives(df: pd.DataFrame, metric: str, top: int = 20) -> pd.DataFrame:
+    return analysis.describe(df, metric, top=top)
+
+
+@stage("histogram")
+def histogram(df: pd.DataFrame, metric: str, maxbins: int = 50) -> pd.DataFrame:
+    return analysis.hist_bins(df, metric, maxbins=maxbins)
+
+
+@stage("boxplot")
+def boxplot(df: pd.DataFrame, metric: str, top: int = 10) -> pd.DataFrame:
+    return analysis.box_quartiles(df, metric, top=top)
+
+
+@stage("scatter")
+def scatter(df: pd.DataFrame) -> pd.DataFrame:
+    return analysis.scatter_bins(df)
+
+
+@stage("correlation")
+def correlation(df: pd.DataFrame) -> tuple:
+    return analysis.correlation(df)
+
+
+@stage("welch")
+def welch(df: pd.DataFrame, alpha: float = 0.05) -> tuple:
+    """(n_mono, n_multi, resultado de `analysis.welch` ou None se algum grupo tiver ≤ 5 observações)."""
+    mono, multi = analysis.mono_multi(df)
+    result = analysis.welch(mono, multi, alpha=alpha) if len(mono) > 5 and len(multi) > 5 else None
+    return len(mono), len(multi), result
+
+
+@stage("report")
+def report(ctx: dict, calc_corr: bool, calc_test: bool) -> str:
+    return build_report_md(ctx, calc_corr=calc_corr, calc_test=calc_test)
@@ -0,0 +1,83 @@
+# analise/pushdown.py
+# Modo agregado: reconstrói as tabelas/estatísticas da página a partir do resultado de
+# `queries.sql_per_repo_stats` / `queries.sql_per_repo_hist` (alguns KB em vez de milhões de linhas)
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from analise.accumulators import CoMoments, GroupedMoments, Moments, PerRepoAccumulator
+
+
+def split_stats(stats_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+    """Separa os GROUPING SETS: (por linguagem, por grupo mono/multi, total)."""
+    g_lang = stats_df["g_lang"].astype(int)
+    g_grupo = stats_df["g_grupo"].astype(int)
+    by_lang = stats_df[(g_lang == 0) & (g_grupo == 1)]
+    by_group = stats_df[(g_lang == 1) & (g_grupo == 0)].set_index("grupo")
+    total = stats_df[(g_lang == 1) & (g_grupo == 1)]
+    return by_lang, by_group, (total.iloc[0] if len(total) else pd.Series(dtype=float))
+
+
+def _quartile(q, i: int) -> float:
+    return float(q[i]) if q is not None and len(q) > i and q[i] is not None else np.nan
+
+
+def _moments(row, metric: str) -> Moments:
+    return Moments.from_stats(row["n"], row[f"mean__{metric}"], row[f"var__{metric}"])
+
+
+def accumulator_from_stats(stats_df: pd.DataFrame) -> PerRepoAccumulator:
+    """Converte os momentos devolvidos pelo SQL em acumuladores mergeáveis (mesma API do modo streaming)."""
+    by_lang, by_group, total = split_stats(stats_df)
+    acc = PerRepoAccumulator()
+    for metric in acc.by_language:
+        acc.by_language[metric] = GroupedMoments({
+            lang: _moments(row, metric) for lang, (_, row) in zip(by_lang["dominant_language"], by_lang.iterrows())
+        })
+    if not total.empty:
+        acc.corr = CoMoments.from_stats(
+            total["n"], total["mean__num_languages"], total["mean__log10_total_bytes"],
+            total["var__num_languages"], total["var__log10_total_bytes"],
+            total["cov__num_languages__log10_total_bytes"],
+        )
+    for grupo in ("mono", "multi"):
+        if grupo in by_group.index:
+            setattr(acc, grupo, _moments(by_group.loc[grupo], "log10_total_bytes"))
+    return acc
+
+
+def medians_from_stats(stats_df: pd.DataFrame, metric: str) -> dict:
+    by_lang, _, _ = split_stats(stats_df)
+    return {lang: _quartile(q, 2) for lang, q in zip(by_lang["dominant_language"], by_lang[f"q__{metric}"])}
+
+
+def describe_from_stats(stats_df: pd.DataFrame, metric: str) -> pd.DataFrame:
+    """Equivalente a `groupby(dominant_language)[metric].agg([count, mean, median, std])`."""
+    desc = accumulator_from_stats(stats_df).describe(metric)
+    desc["median"] = desc["dominant_language"].map(medians_from_stats(stats_df, metric)).astype(float)
+    return desc
+
+
+def quartiles_from_stats(stats_df: pd.DataFrame, metric: str, top: int = 10) -> pd.DataFrame:
+    """[mín, q1, mediana, q3, máx] por linguagem, para as `top` linguagens com mais repos."""
+    by_lang, _, _ = split_stats(stats_df)
+    by_lang = by_lang.sort_values("n", ascending=False).head(top)
+    rows = []
+    for lang, q in zip(by_lang["dominant_language"], by_lang[f"q__{metric}"]):
+        rows.append([lang] + [_quartile(q, i) for i in range(5)])
+    return pd.DataFrame(rows, columns=["dominant_language", "min", "q1", "median", "q3", "max"])
+
+
+def hist_bins(hist_df: pd.DataFrame, metric: str, maxbins: int = 50) -> pd.DataFrame:
+    """Faixas do histograma de uma métrica → (bin_start, bin_end, count), incluindo faixas vazias."""
+    h = hist_df[hist_df["metric"] == metric]
+    if h.empty:
+        return pd.DataFrame(columns=["bin_start", "bin_end", "count"])
+    lo, hi = float(h["lo"].iloc[0]), float(h["hi"].iloc[0])
+    nbins = 1 if math.isclose(lo, hi) else maxbins
+    counts = np.zeros(nbins, dtype=np.int64)
+    counts[h["bin"].astype(int).to_numpy()] = h["n"].astype("int64").to_numpy()
+    edges = np.linspace(lo, hi if hi > lo else lo + 1, nbins + 1)
+    return pd.DataFrame({"bin_start": edges[:-1], "bin_end": edges[1:], "count": counts})
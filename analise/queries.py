@@ -0,0 +1,310 @@
+# analise/queries.py
+# SQL das consultas da página, parametrizado por dialeto (BigQuery em produção, DuckDB offline)
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import pyarrow as pa
+
+LANGUAGES_TABLE = "bigquery-public-data.github_repos.languages"
+
+# Trechos que mudam entre dialetos; o resto do SQL é idêntico nos dois motores.
+# Obs.: no DuckDB o bucket usa hash() em vez de FARM_FINGERPRINT, então a amostra local
+# é estável, mas não é o mesmo conjunto de repositórios da amostra no BigQuery.
+DIALECTS = {
+    "bigquery": {
+        "table": f"`{LANGUAGES_TABLE}`",
+        "lang_rows": f"`{LANGUAGES_TABLE}`,\nUNNEST(language) AS lang",
+        "bucket": "MOD(ABS(FARM_FINGERPRINT(repo_name)), 100)",
+        "float": "FLOAT64",
+        "int": "INT64",
+        # [mín, q1, mediana, q3, máx] — aproximado no BigQuery (não há quantil exato como agregação)
+        "quartiles": "APPROX_QUANTILES({x}, 4)",
+        "row_hash": "FARM_FINGERPRINT(TO_JSON_STRING(t))",
+        # agregações dentro do array de cada linha (subconsultas correlacionadas sobre UNNEST da própria
+        # linha: rodam no mesmo worker, sem repartição)
+        "lang_count": "ARRAY_LENGTH(language)",
+        "lang_total": "(SELECT SUM(l.bytes) FROM UNNEST(language) AS l)",
+        "lang_top": "(SELECT AS STRUCT l.name, l.bytes FROM UNNEST(language) AS l ORDER BY l.bytes DESC LIMIT 1)",
+    },
+    "duckdb": {
+        "table": "languages",
+        "lang_rows": "(SELECT repo_name, UNNEST(language) AS lang FROM languages) AS lang_rows",
+        "bucket": "CAST(hash(repo_name) % 100 AS INTEGER)",
+        "float": "DOUBLE",
+        "int": "BIGINT",
+        "quartiles": "quantile_cont({x}, [0, 0.25, 0.5, 0.75, 1])",
+        "row_hash": "hash(repo_name, language)",
+        # funções de lista: operam no valor da linha, sem subconsulta (que o DuckDB descorrelacionaria num join)
+        "lang_count": "len(language)",
+        "lang_total": "list_sum(list_transform(language, l -> l.bytes))",
+        "lang_top": "list_max(list_transform(language, l -> {'bytes': l.bytes, 'name': l.name}))",
+    },
+}
+
+
+def _dialect(name: str) -> dict:
+    if name not in DIALECTS:
+        raise ValueError(f"Dialeto SQL desconhecido: {name!r} (use {sorted(DIALECTS)})")
+    return DIALECTS[name]
+
+
+def engine(dialect: str) -> str:
+    """Motor por trás do dialeto ("bigquery"/"duckdb"), também para as variantes de `bucketed_dialect`."""
+    return _dialect(dialect).get("engine", dialect)
+
+
+# ===============================
+# CÓPIA PARTICIONADA POR BUCKET
+# ===============================
+# O filtro por hash reduz as linhas devolvidas, mas o scan continua sendo a tabela inteira (1% custa
+# o mesmo que 100%). Numa cópia com a coluna `bucket` materializada e particionada por ela, `bucket < N`
+# poda partições: o motor lê (e o dry-run estima/cobra) só ~N% da tabela. Os buckets são os mesmos do
+# filtro por hash, então a amostra — e o que já está em cache por bucket — não muda de composição.
+BUCKETED_LOCAL_VIEW = "languages_by_bucket"
+
+
+def bucketed_dialect(base: str, table: str) -> str:
+    """Registra a variante de `base` que lê a cópia particionada `table` e devolve o nome dela."""
+    name = f"{base}@{table}"
+    if name not in DIALECTS:
+        d = _dialect(base)
+        source = f"`{table}`" if base == "bigquery" else table
+        lang_rows = (f"{source},\nUNNEST(language) AS lang" if base == "bigquery" else
+                     f"(SELECT repo_name, bucket, UNNEST(language) AS lang FROM {source}) AS lang_rows")
+        DIALECTS[name] = {**d, "engine": base, "table": source, "lang_rows": lang_rows, "bucket": "bucket",
+                          "carry_bucket": ",\n    bucket"}  # plano "window": a coluna atravessa o UNNEST
+    return name
+
+
+def sql_create_bucketed(dest: str, dialect: str = "bigquery") -> str:
+    """DDL da cópia: no BigQuery, tabela particionada por intervalo inteiro (uma partição por bucket);
+    no DuckDB, Parquet particionado no estilo Hive (`dest/bucket=N/`). Custa um scan completo, uma vez."""
+    d = _dialect(dialect)
+    select = f"SELECT repo_name, language, {d['bucket']} AS bucket FROM {d['table']}"
+    if engine(dialect) == "bigquery":
+        return f"""
+CREATE OR REPLACE TABLE `{dest}`
+PARTITION BY RANGE_BUCKET(bucket, GENERATE_ARRAY(0, 100, 1))
+CLUSTER BY repo_name
+AS
+{select}
+"""
+    return f"""
+COPY ({select}) TO '{dest.replace("'", "''")}' (FORMAT PARQUET, PARTITION_BY (bucket), OVERWRITE_OR_IGNORE)
+"""
+
+
+def sql_top_langs(top_n: int | None, dialect: str = "bigquery") -> str:
+    """Total de bytes por linguagem, em ordem decrescente; `top_n=None` traz todas (superconjunto de `top_langs`)."""
+    d = _dialect(dialect)
+    limit = f"\nLIMIT {int(top_n)}" if top_n is not None else ""
+    return f"""
+SELECT
+  lang.name AS language_name,
+  SUM(lang.bytes) AS total_bytes
+FROM {d['lang_rows']}
+GROUP BY language_name
+ORDER BY total_bytes DESC{limit}
+"""
+
+
+# ===============================
+# PARÂMETROS APLICADOS NO CLIENTE
+# ===============================
+# Parâmetros que só recortam o resultado (LIMIT, filtros sobre poucas linhas) não precisam ir para o SQL:
+# a consulta busca o superconjunto uma vez e o recorte é local. Assim o texto do SQL — e portanto a chave
+# no DiskCache, no st.cache_data e no ledger — é o mesmo para qualquer valor desses parâmetros.
+@dataclass(frozen=True)
+class QuerySpec:
+    """SQL independente de `client_params` + recorte local (`post(resultado, **client_params)`)."""
+
+    sql: str
+    client_params: tuple = ()  # ((nome, valor), ...): hashable, entra em chaves de cache de quem precisar
+    post: Callable | None = None
+
+    def apply(self, rows):
+        """Aplica os parâmetros do cliente ao resultado (DataFrame ou tabela Arrow) do `sql`."""
+        return self.post(rows, **dict(self.client_params)) if self.post is not None else rows
+
+
+def _head(rows, top_n: int):
+    if isinstance(rows, pa.Table):
+        return rows.slice(0, top_n)
+    return rows.head(top_n).reset_index(drop=True)
+
+
+def top_langs(top_n: int, dialect: str = "bigquery") -> QuerySpec:
+    """Top-N linguagens por bytes: todas as linguagens numa consulta só, cortadas em `top_n` no cliente."""
+    return QuerySpec(sql_top_langs(None, dialect), (("top_n", int(top_n)),), _head)
+
+
+# Visão por repo — dois planos com o mesmo resultado:
+# - "array": cada linha da fonte já traz todas as linguagens do repo, então total, contagem e linguagem
+#   dominante saem de agregações dentro do próprio array (sem funções de janela nem joins: um scan, sem
+#   shuffle). Repos com array vazio ficam de fora, como no UNNEST do plano "window". Empates de bytes
+#   na dominante são arbitrários nos dois planos (no DuckDB, "array" desempata pelo maior nome).
+# - "window": UNNEST + SUM/COUNT/ROW_NUMBER() OVER (PARTITION BY repo_name) — o plano original; reparte
+#   as linhas por repo_name (shuffle completo no BigQuery). Também consolidaria um repo repetido em
+#   várias linhas, o que não acontece em `github_repos.languages` (uma linha por repo).
+PER_REPO_MODES = ("array", "window")
+
+
+def sql_per_repo(sample_pct: int, dialect: str = "bigquery", mode: str = "array") -> str:
+    return sql_per_repo_buckets(0, sample_pct, dialect, with_bucket=False, mode=mode)
+
+
+def sql_per_repo_buckets(lo: int, hi: int, dialect: str = "bigquery", with_bucket: bool = True,
+                         mode: str = "array") -> str:
+    """Visão por repo restrita aos buckets de hash [lo, hi) — base do fetch incremental por bucket."""
+    d = _dialect(dialect)
+    if mode not in PER_REPO_MODES:
+        raise ValueError(f"Modo da visão por repo desconhecido: {mode!r} (use {list(PER_REPO_MODES)})")
+    where = f"{d['bucket']} < {int(hi)}" if int(lo) <= 0 else f"{d['bucket']} BETWEEN {int(lo)} AND {int(hi) - 1}"
+    bucket_in = f",\n    {d['bucket']} AS bucket" if with_bucket else ""
+    bucket_out = ",\n  bucket" if with_bucket else ""
+    if mode == "array":
+        return f"""
+WITH per_row AS (
+  SELECT
+    repo_name,
+    {d['lang_top']} AS top_lang,
+    {d['lang_total']} AS total_bytes,
+    {d['lang_count']} AS num_languages{bucket_in}
+  FROM {d['table']}
+  WHERE {where}
+)
+SELECT
+  repo_name,
+  top_lang.name AS dominant_language,
+  top_lang.bytes AS dominant_bytes,
+  total_bytes,
+  num_languages{bucket_out}
+FROM per_row
+WHERE num_languages > 0
+"""
+    return f"""
+WITH lang_bytes AS (
+  SELECT
+    repo_name,
+    lang.name AS language_name,
+    lang.bytes AS bytes{d.get('carry_bucket', '')}
+  FROM {d['lang_rows']}
+),
+per_repo AS (
+  SELECT
+    repo_name,
+    language_name,
+    bytes,
+    SUM(bytes) OVER (PARTITION BY repo_name) AS total_bytes,
+    COUNT(*) OVER (PARTITION BY repo_name) AS num_languages,
+    ROW_NUMBER() OVER (PARTITION BY repo_name ORDER BY bytes DESC) AS rn{bucket_in}
+  FROM lang_bytes
+  WHERE {where}
+)
+SELECT
+  repo_name,
+  language_name AS dominant_language,
+  bytes AS dominant_bytes,
+  total_bytes,
+  num_languages{bucket_out}
+FROM per_repo
+WHERE rn = 1
+"""
+
+
+def sql_repo_languages_buckets(lo: int, hi: int, dialect: str = "bigquery") -> str:
+    """Lista de linguagens de cada repo (sem UNNEST, uma linha por repo) nos buckets [lo, hi) — base da coocorrência."""
+    d = _dialect(dialect)
+    where = f"{d['bucket']} < {int(hi)}" if int(lo) <= 0 else f"{d['bucket']} BETWEEN {int(lo)} AND {int(hi) - 1}"
+    return f"""
+SELECT
+  language,
+  {d['bucket']} AS bucket
+FROM {d['table']}
+WHERE {where}
+"""
+
+
+def sql_bucket_checksums(dialect: str = "bigquery") -> str:
+    """Checksum (XOR de hashes das linhas da fonte) e contagem por bucket: detecta buckets alterados."""
+    d = _dialect(dialect)
+    return f"""
+SELECT
+  {d['bucket']} AS bucket,
+  COUNT(*) AS n_rows,
+  BIT_XOR({d['row_hash']}) AS checksum
+FROM {d['table']} AS t
+GROUP BY bucket
+"""
+
+
+# ===============================
+# PUSHDOWN DE AGREGADOS
+# ===============================
+# Em vez de trazer uma linha por repo, o motor devolve só as estatísticas suficientes:
+# momentos centrados (n, média, variância, covariância — numericamente estáveis, ao contrário de
+# somas de quadrados cruas em bytes lineares) e quartis, por linguagem dominante, por grupo
+# mono/multi e global (GROUPING SETS), além das contagens do histograma.
+METRICS = {
+    "log10_total_bytes": "LOG10(total_bytes + 1)",
+    "total_bytes": "CAST(total_bytes AS {float})",
+}
+
+
+def sql_per_repo_stats(sample_pct: int, dialect: str = "bigquery") -> str:
+    d = _dialect(dialect)
+    metric_cols = ",\n    ".join(f"{expr.format(**d)} AS {name}" for name, expr in METRICS.items())
+    metric_aggs = ",\n  ".join(
+        f"AVG({name}) AS mean__{name},\n  VAR_SAMP({name}) AS var__{name},\n  "
+        f"{d['quartiles'].format(x=name)} AS q__{name}"
+        for name in METRICS
+    )
+    return f"""
+WITH v AS (
+  SELECT
+    dominant_language,
+    CASE WHEN num_languages >= 2 THEN 'multi' ELSE 'mono' END AS grupo,
+    CAST(num_languages AS {d['float']}) AS num_languages,
+    {metric_cols}
+  FROM ({sql_per_repo(sample_pct, dialect)}) AS per_repo_view
+)
+SELECT
+  dominant_language,
+  grupo,
+  GROUPING(dominant_language) AS g_lang,
+  GROUPING(grupo) AS g_grupo,
+  COUNT(*) AS n,
+  AVG(num_languages) AS mean__num_languages,
+  VAR_SAMP(num_languages) AS var__num_languages,
+  COVAR_SAMP(num_languages, log10_total_bytes) AS cov__num_languages__log10_total_bytes,
+  {metric_aggs}
+FROM v
+GROUP BY GROUPING SETS ((dominant_language), (grupo), ())
+"""
+
+
+def sql_per_repo_hist(sample_pct: int, dialect: str = "bigquery", maxbins: int = 50) -> str:
+    """Contagens de histograma (largura fixa, `maxbins` faixas entre mín e máx) para cada métrica."""
+    d = _dialect(dialect)
+    metric_cols = ",\n    ".join(f"{expr.format(**d)} AS {name}" for name, expr in METRICS.items())
+    parts = []
+    for name in METRICS:
+        parts.append(f"""
+SELECT
+  '{name}' AS metric,
+  LEAST(CAST(FLOOR(COALESCE(({name} - lo) / NULLIF(hi - lo, 0), 0) * {int(maxbins)}) AS {d['int']}), {int(maxbins) - 1}) AS bin,
+  MIN(lo) AS lo,
+  MIN(hi) AS hi,
+  COUNT(*) AS n
+FROM v CROSS JOIN (SELECT MIN({name}) AS lo, MAX({name}) AS hi FROM v) AS bounds
+GROUP BY bin""")
+    union_all = "\nUNION ALL".join(parts)
+    return f"""
+WITH v AS (
+  SELECT
+    {metric_cols}
+  FROM ({sql_per_repo(sample_pct, dialect)}) AS per_repo_view
+)
+{union_all}
+"""
@@ -0,0 +1,148 @@
+# analise/refresh.py
+# Stale-while-revalidate: versões por conjunto de dados, recálculo em segundo plano e troca atômica
+#
+# Cada conjunto de dados da página ("local:top_langs", "bigquery:per_repo:10:linhas", ...) tem uma versão
+# publicada num JSON pequeno, compartilhado entre workers. A versão entra na chave do st.cache_data (como o
+# `materialized_version`), então atualizar não limpa nada:
+#   1. `Revalidator.submit` recalcula em segundo plano só aquele conjunto, regravando as entradas do DiskCache
+#      (rename atômico: quem lê no meio vê o arquivo antigo ou o novo) e pré-aquecendo a versão seguinte;
+#   2. enquanto isso, todas as sessões continuam recebendo a versão publicada (o último resultado bom);
+#   3. no fim, `DataVersions.publish` incrementa a versão — o próximo rerun de cada sessão já lê a nova.
+# Se o recálculo falhar, a versão não muda e o erro fica registrado para a página mostrar.
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+DEFAULT_VERSIONS_PATH = os.path.join("data", "versions.json")
+# recálculo marcado como em andamento há mais que isso (worker morto no meio) pode ser reiniciado
+STALE_REFRESH_S = 15 * 60
+
+
+class DataVersions:
+    """Versão publicada, idade e estado do recálculo de cada conjunto de dados, num JSON com lock de arquivo."""
+
+    def __init__(self, path: str = DEFAULT_VERSIONS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # read-modify-write entre processos
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, data: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)  # leitores sem lock veem o JSON antigo ou o novo, nunca um pela metade
+
+    def _update(self, dataset: str, **changes) -> dict:
+        with self._locked():
+            data = self._read()
+            entry = {**self._default(), **data.get(dataset, {}), **changes}
+            data[dataset] = entry
+            self._write(data)
+            return entry
+
+    @staticmethod
+    def _default() -> dict:
+        return {"version": 0, "updated_at": None, "refreshing_since": None, "error": None}
+
+    def get(self, dataset: str) -> dict:
+        return {**self._default(), **self._read().get(dataset, {})}
+
+    def all(self) -> dict[str, dict]:
+        return {name: {**self._default(), **entry} for name, entry in self._read().items()}
+
+    def observe(self, dataset: str) -> dict:
+        """Devolve o estado do conjunto; na primeira vez que é servido, registra esse instante como a idade."""
+        entry = self.get(dataset)
+        if entry["updated_at"] is None:
+            with self._locked():
+                data = self._read()
+                if data.get(dataset, {}).get("updated_at") is None:  # outro worker pode ter registrado antes
+                    data[dataset] = entry = {**entry, "updated_at": time.time()}
+                    self._write(data)
+                else:
+                    entry = {**self._default(), **data[dataset]}
+        return entry
+
+    def begin(self, dataset: str) -> bool:
+        """Marca o recálculo como em andamento; False se outro (thread ou worker) já estiver recalculando."""
+        with self._locked():
+            data = self._read()
+            entry = {**self._default(), **data.get(dataset, {})}
+            since = entry["refreshing_since"]
+            if since is not None and time.time() - since < STALE_REFRESH_S:
+                return False
+            data[dataset] = {**entry, "refreshing_since": time.time()}
+            self._write(data)
+            return True
+
+    def publish(self, dataset: str) -> dict:
+        """Troca atômica: a versão seguinte passa a ser a servida."""
+        with self._locked():
+            data = self._read()
+            entry = {**self._default(), **data.get(dataset, {})}
+            data[dataset] = entry = {**entry, "version": entry["version"] + 1, "updated_at": time.time(),
+                                     "refreshing_since": None, "error": None}
+            self._write(data)
+            return entry
+
+    def fail(self, dataset: str, error: str) -> dict:
+        return self._update(dataset, refreshing_since=None, error=error)
+
+
+class Revalidator:
+    """Executa recálculos em threads próprias (não presas a uma sessão), no máximo um por conjunto de dados.
+
+    `refresh(next_version)` deve regravar a fonte (DiskCache) e, se quiser, pré-aquecer a chave de `next_version`.
+    """
+
+    def __init__(self, versions: DataVersions, max_workers: int = 2, initializer=None):
+        self.versions = versions
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analise-refresh",
+                                        initializer=initializer)
+        self._running: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, dataset: str, refresh) -> bool:
+        """Agenda o recálculo; False se ele já estiver em andamento (aqui ou em outro worker)."""
+        with self._lock:
+            fut = self._running.get(dataset)
+            if fut is not None and not fut.done():
+                return False
+            if not self.versions.begin(dataset):
+                return False
+
+            def run():
+                try:
+                    refresh(self.versions.get(dataset)["version"] + 1)
+                except Exception as e:
+                    self.versions.fail(dataset, f"{type(e).__name__}: {e}")
+                    raise
+                return self.versions.publish(dataset)
+
+            self._running[dataset] = self._pool.submit(run)
+            return True
+
+    def running(self) -> list[str]:
+        with self._lock:
+            return [name for name, fut in self._running.items() if not fut.done()]
@@ -0,0 +1,173 @@
+# analise/report.py
+# Formatação e relatório textual (Markdown) — puros, usados pela página, CLI e benchmarks
+
+import math
+
+import numpy as np
+
+from analise.inference import correlation_magnitude
+
+
+def fmt_num(x, fmt="{:.3f}", fallback="—"):
+    try:
+        if x is None:
+            return fallback
+        if isinstance(x, (float, int, np.floating)) and (math.isnan(x) or math.isinf(x)):
+            return fallback
+        return fmt.format(x)
+    except Exception:
+        return fallback
+
+
+def fmt_pct(x, fallback="—"):
+    try:
+        if x is None or math.isnan(x):
+            return fallback
+        return f"{x:.1f}%"
+    except Exception:
+        return fallback
+
+
+def human_bytes(n: int) -> str:
+    if n is None or n < 0:
+        return "?"
+    units = ["B", "KB", "MB", "GB", "TB"]
+    i, x = 0, float(n)
+    while x >= 1024 and i < len(units) - 1:
+        x /= 1024
+        i += 1
+    return f"{x:,.2f} {units[i]}"
+
+
+def human_age(seconds: float | None) -> str:
+    if seconds is None or seconds < 0:
+        return "?"
+    for unit, size in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.0f} {unit}"
+    return f"{seconds:.0f} s"
+
+
+def to_jsonable(x):
+    """Converte saídas das etapas (DataFrames, escalares numpy, NaN) em tipos JSON (NaN/inf → null)."""
+    import pandas as pd
+    if isinstance(x, dict):
+        return {str(k): to_jsonable(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [to_jsonable(v) for v in x]
+    if isinstance(x, pd.DataFrame):
+        return to_jsonable(x.astype(object).to_dict(orient="records"))
+    if isinstance(x, np.generic):
+        x = x.item()
+    if isinstance(x, float) and (math.isnan(x) or math.isinf(x)):
+        return None
+    return x
+
+
+def report_context(top_n: int, shares: tuple, corr: tuple | None, test: tuple | None,
+                   boot: dict | None = None) -> dict:
+    """Contexto do relatório a partir das saídas das etapas (`analysis.top_shares`, `correlation`, `welch`)."""
+    top1_name, top1_share, top3_share = shares
+    ctx = {"top_n": top_n, "top1_name": top1_name, "top1_share": top1_share, "top3_share": top3_share,
+           "corr_success": False, "test_success": False}
+    if corr is not None and corr[4] >= 4:
+        r, p, r_low, r_high, _ = corr
+        ctx.update(corr_success=True, r=r, p=p, r_low=r_low, r_high=r_high, mag=correlation_magnitude(r))
+    if test is not None and not math.isnan(test[0]):
+        diff, tval, p_two, dfw, lci, uci = test
+        ctx.update(test_success=True, diff=diff, tval=tval, dfw=dfw, lci=lci, uci=uci,
+                   p_one=(p_two / 2) if diff > 0 else 1 - (p_two / 2),
+                   fator=10 ** diff, fator_l=10 ** lci, fator_u=10 ** uci)
+    if boot:
+        ctx.update(boot_lci=boot["lci"], boot_uci=boot["uci"], p_perm=boot["p_perm"])
+    return ctx
+
+
+def build_report_md(ctx: dict, *, calc_corr: bool, calc_test: bool) -> str:
+    # Top linguagens (sempre aparece)
+    top_lang_txt = (
+        f"- **Linguagem líder:** **{ctx.get('top1_name') or '—'}** · **Participação:** {fmt_pct(ctx.get('top1_share'))}\n"
+        f"- **Top 3 linguagens (soma):** {fmt_pct(ctx.get('top3_share'))}"
+    )
+
+    # Correlação
+    if calc_corr and ctx.get("corr_success"):
+        corr_txt = (
+            f"- **Correlação (r):** {fmt_num(ctx.get('r'))} ({ctx.get('mag', '—')})\n"
+            f"- **IC 95% de r:** [{fmt_num(ctx.get('r_low'))}; {fmt_num(ctx.get('r_high'))}]\n"
+            f"- **p-valor:** {fmt_num(ctx.get('p'), '{:.3g}')}\n"
+            f"- **Leitura:** mais linguagens → tendência a repositórios maiores (em log10)."
+        )
+    else:
+        corr_txt = "- **Correlação:** não calculada neste run (opção desmarcada ou amostra insuficiente)."
+
+    # Teste de hipótese
+    boot_txt = ""
+    if fmt_num(ctx.get("p_perm")) != "—":
+        boot_txt = (
+            f"- **Não paramétrico:** IC 95% bootstrap (Δ) [{fmt_num(ctx.get('boot_lci'))}; {fmt_num(ctx.get('boot_uci'))}]"
+            f"  |  **p (permutação):** {fmt_num(ctx.get('p_perm'), '{:.3g}')}\n"
+        )
+    if calc_test and ctx.get("test_success"):
+        test_txt = (
+            f"- **Δ média (log10):** {fmt_num(ctx.get('diff'))}  |  **t:** {fmt_num(ctx.get('tval'), '{:.2f}')}  |  **df≈** {fmt_num(ctx.get('dfw'), '{:.0f}')}\n"
+            f"- **IC 95% (Δ):** [{fmt_num(ctx.get('lci'))}; {fmt_num(ctx.get('uci'))}]  |  **p (one-sided):** {fmt_num(ctx.get('p_one'), '{:.3g}')}\n"
+            f"- **Fator multiplicativo (bytes):** ×{fmt_num(ctx.get('fator'), '{:.2f}')} "
+            f"(IC95% ×{fmt_num(ctx.get('fator_l'), '{:.2f}')}–×{fmt_num(ctx.get('fator_u'), '{:.2f}')} )\n"
+            f"{boot_txt}"
+            f"- **Conclusão:** repositórios **multilíngues** tendem a ser **maiores** que **monolíngues**."
+        )
+    else:
+        test_txt = "- **Teste (Welch):** não executado neste run (opção desmarcada ou amostra insuficiente)."
+
+    md_sections = [
+f"""## 1) Contexto e ideia
+
+Projeto no estilo entrevista de **engenharia de dados / back-end**: dados públicos em larga escala → **evidências quantitativas**
+e **insights acionáveis** com custo controlado. Foco em **raciocínio de produção**: modelagem por repositório,
+queries transparentes, amostragem estável e inferência com IC/teste.""",
+
+"""## 2) Base de dados
+
+- **Fonte:** `bigquery-public-data.github_repos.languages`
+- **Unidade após UNNEST:** (repositório, linguagem, bytes)
+- **Visão por repositório:** linguagem dominante · total de bytes · número de linguagens""",
+
+f"""## 3) Perguntas
+
+- Quais linguagens acumulam mais **volume de código** (Top-{ctx.get('top_n')})?
+- Repositórios **multilíngues** (≥2 linguagens) tendem a ser **maiores** do que monolíngues?
+- Qual a **relação** entre **nº de linguagens** e **tamanho** do repositório?""",
+
+f"""## 4) Resultados descritivos
+
+**Top-{ctx.get('top_n')} por volume**
+{top_lang_txt}
+
+**Distribuições e medidas**
+- `total_bytes` tem **assimetria à direita** (cauda pesada); análise em **log10** melhora a robustez.
+- Medianas/boxplots por **linguagem dominante** mostram diferenças com variabilidade intra-grupo.""",
+
+f"""## 5) Correlação (nº linguagens × tamanho em log10)
+
+{corr_txt}""",
+
+f"""## 6) Teste de hipótese (Welch — multilíngues > monolíngues)
+
+{test_txt}""",
+
+"""## 7) Conclusões
+
+- **Concentração:** poucas linguagens carregam a maior parte do volume de código.
+- **Cauda pesada:** trabalhar em **log10** é apropriado.
+- **Relação positiva:** mais linguagens costuma vir com repositórios **maiores** (efeito fraco–moderado).
+- **Inferência:** evidência de **multilíngues > monolíngues** em média (com leitura em **razões de tamanho**).""",
+
+"""## 8) Limitações e próximos passos
+
+- **Bytes ≠ qualidade/popularidade**; possíveis vieses (monorepos, mirrors).
+- **Sem causalidade:** análise é descritiva/inferencial, não causal.
+- **Extensões:** segmentar por ecossistema, adicionar séries temporais (GitHub Archive), expor métricas via API."""
+    ]
+
+    return "\n\n".join(md_sections).strip()
@@ -0,0 +1,171 @@
+# analise/resampling.py
+# Bootstrap e teste de permutação vetorizados (matrizes de índices em lote) num pool de processos
+#
+# Reprodutibilidade: as reamostragens são divididas em blocos de tamanho fixo (CHUNK), cada um com
+# sua SeedSequence derivada de (seed, grupo, bloco). O resultado não depende do nº de processos.
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_SEED = 42
+CHUNK = 500                    # reamostragens por tarefa enviada ao pool
+MAX_BATCH_ELEMENTS = 1 << 17   # elementos por matriz de índices (~512 KB em int32: fica no cache)
+# custo de bootstrap de Δ + permutação por processo, medido num núcleo: ~46 s para 10.000 reamostragens
+# de 330 mil repos (amostra de 10%). O gerador de índices aleatórios é o piso; o resto divide entre processos.
+NS_PER_RESAMPLE_ROW = 15
+
+
+def make_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Pool de processos com `spawn` (seguro sob o Streamlit, que roda threads)."""
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=get_context("spawn"))
+
+
+def max_resamples(n_rows: int, workers: int, budget_s: float) -> int:
+    """Maior nº de reamostragens (bootstrap de Δ + permutação) que cabe em `budget_s` com `workers` processos."""
+    return int(budget_s * 1e9 * max(workers, 1) / (NS_PER_RESAMPLE_ROW * max(n_rows, 1)))
+
+
+def _index_dtype(n: int):
+    return np.int32 if n < 2**31 else np.int64
+
+
+def _rows_per_batch(n: int) -> int:
+    return max(1, MAX_BATCH_ELEMENTS // max(n, 1))
+
+
+def _median_chunk(sorted_values: np.ndarray, size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """Medianas de `size` reamostragens bootstrap, sem sortear as m observações de cada uma.
+
+    Com os valores ordenados, a mediana da reamostra é o valor na posição da(s) estatística(s) de
+    ordem central dos m índices sorteados. Índice sorteado = floor(m·U), U ~ U(0,1), e a k-ésima
+    estatística de ordem de m uniformes é Beta(k, m−k+1); a seguinte é U_(k) + (1−U_(k))·Beta(1, m−k).
+    Mesma distribuição do bootstrap por matriz de índices, em O(1) por reamostragem.
+    """
+    rng = np.random.default_rng(seed)
+    m = len(sorted_values)
+    k = m // 2 + (m % 2)  # posição (1-based) da mediana, ou da menor das duas centrais
+    u = rng.beta(k, m - k + 1, size=size)
+    lo = np.minimum((u * m).astype(np.int64), m - 1)
+    if m % 2:
+        return sorted_values[lo]
+    u_next = u + (1 - u) * rng.beta(1, m - k, size=size)
+    hi = np.minimum((u_next * m).astype(np.int64), m - 1)
+    return (sorted_values[lo] + sorted_values[hi]) / 2
+
+
+def _mean_diff_chunk(a: np.ndarray, b: np.ndarray, size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """mean(a*) − mean(b*) para `size` reamostragens independentes de cada grupo (matrizes de índices)."""
+    rng = np.random.default_rng(seed)
+    a32, b32 = a.astype(np.float32), b.astype(np.float32)  # metade da banda no gather; soma em float64
+    out = np.empty(size)
+    step = _rows_per_batch(max(len(a), len(b)))
+    for s in range(0, size, step):
+        n = min(step, size - s)
+        ia = rng.integers(0, len(a), size=(n, len(a)), dtype=_index_dtype(len(a)))
+        ib = rng.integers(0, len(b), size=(n, len(b)), dtype=_index_dtype(len(b)))
+        out[s:s + n] = np.take(a32, ia).mean(axis=1, dtype=np.float64) - np.take(b32, ib).mean(axis=1, dtype=np.float64)
+    return out
+
+
+def welch_t(sum_a, sq_a, n_a, sum_b, sq_b, n_b):
+    """t de Welch a partir de somas e somas de quadrados (vetorizado)."""
+    mean_a, mean_b = sum_a / n_a, sum_b / n_b
+    var_a = (sq_a - n_a * mean_a**2) / (n_a - 1)
+    var_b = (sq_b - n_b * mean_b**2) / (n_b - 1)
+    return (mean_a - mean_b) / np.sqrt(var_a / n_a + var_b / n_b)
+
+
+def _perm_t_chunk(pooled: np.ndarray, n_a: int, size: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """t de Welch com rótulos permutados: em cada linha, as `n_a` menores chaves aleatórias formam o grupo A.
+
+    Somas e somas de quadrados do grupo A saem de um produto máscara @ [x, x²] (BLAS), sem gather.
+    Chaves uint32 (geração e partição mais baratas que float64); a linha rara com empate no corte,
+    que mudaria o tamanho do grupo A, é refeita por posição (argpartition) — o grupo tem sempre `n_a`.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pooled)
+    pooled = pooled - pooled.mean()  # t é invariante a translação; centrar evita cancelamento em float32
+    cols = np.column_stack([pooled, pooled**2]).astype(np.float32)
+    total, total_sq = pooled.sum(), (pooled**2).sum()
+    out = np.empty(size)
+    step = _rows_per_batch(n)
+    for s in range(0, size, step):
+        b = min(step, size - s)
+        keys = rng.integers(0, 2**32, size=(b, n), dtype=np.uint32)
+        cut = np.partition(keys, n_a - 1, axis=1)[:, n_a - 1:n_a]
+        mask = keys <= cut
+        for row in np.flatnonzero(np.count_nonzero(mask, axis=1) != n_a):
+            mask[row] = False
+            mask[row, np.argpartition(keys[row], n_a - 1)[:n_a]] = True
+        sums = mask.astype(np.float32) @ cols
+        sum_a, sq_a = sums[:, 0].astype(float), sums[:, 1].astype(float)
+        out[s:s + b] = welch_t(sum_a, sq_a, n_a, total - sum_a, total_sq - sq_a, n - n_a)
+    return out
+
+
+def _run_chunks(fn, args: tuple, n_resamples: int, seed: np.random.SeedSequence, executor: Executor | None) -> list:
+    """Divide em blocos de CHUNK reamostragens; devolve futures (ou resultados, sem executor) na ordem."""
+    sizes = [min(CHUNK, n_resamples - s) for s in range(0, n_resamples, CHUNK)]
+    seeds = seed.spawn(len(sizes))
+    if executor is None:
+        return [fn(*args, size, ss) for size, ss in zip(sizes, seeds)]
+    return [executor.submit(fn, *args, size, ss) for size, ss in zip(sizes, seeds)]
+
+
+def _gather(parts: list) -> np.ndarray:
+    return np.concatenate([p.result() if hasattr(p, "result") else p for p in parts])
+
+
+def _percentile_ci(dist: np.ndarray, alpha: float) -> tuple[float, float]:
+    lo, hi = np.quantile(dist, [alpha / 2, 1 - alpha / 2])
+    return float(lo), float(hi)
+
+
+def bootstrap_medians(df: pd.DataFrame, metric: str, languages, n_resamples: int = DEFAULT_RESAMPLES,
+                      seed: int = DEFAULT_SEED, alpha: float = 0.05, executor: Executor | None = None) -> pd.DataFrame:
+    """IC percentil (bootstrap) da mediana de `metric` por linguagem dominante.
+
+    Colunas: dominant_language, median_ci_low, median_ci_high.
+    """
+    codes, uniques = pd.factorize(df["dominant_language"])
+    values = df[metric].to_numpy(dtype=float)
+    pending = []
+    for g, lang in enumerate(languages):
+        hit = np.flatnonzero(uniques == lang)
+        v = np.sort(values[codes == hit[0]]) if len(hit) else np.empty(0)
+        v = v[np.isfinite(v)]
+        if len(v) < 2:
+            pending.append((lang, None))
+            continue
+        pending.append((lang, _run_chunks(_median_chunk, (v,), n_resamples,
+                                          np.random.SeedSequence([seed, g]), executor)))
+    rows = []
+    for lang, parts in pending:
+        low, high = _percentile_ci(_gather(parts), alpha) if parts is not None else (np.nan, np.nan)
+        rows.append((lang, low, high))
+    return pd.DataFrame(rows, columns=["dominant_language", "median_ci_low", "median_ci_high"])
+
+
+def bootstrap_mean_diff(a: np.ndarray, b: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                        seed: int = DEFAULT_SEED, alpha: float = 0.05,
+                        executor: Executor | None = None) -> tuple[float, float]:
+    """IC percentil (bootstrap) de mean(a) − mean(b)."""
+    parts = _run_chunks(_mean_diff_chunk, (np.asarray(a, float), np.asarray(b, float)), n_resamples,
+                        np.random.SeedSequence([seed, 1]), executor)
+    return _percentile_ci(_gather(parts), alpha)
+
+
+def permutation_welch(a: np.ndarray, b: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                      seed: int = DEFAULT_SEED, executor: Executor | None = None) -> tuple[float, float]:
+    """p-valor por permutação (unilateral, H1: mean(a) > mean(b)) do t de Welch → (t observado, p)."""
+    a, b = np.asarray(a, float), np.asarray(b, float)
+    t_obs = float(welch_t(a.sum(), (a**2).sum(), len(a), b.sum(), (b**2).sum(), len(b)))
+    parts = _run_chunks(_perm_t_chunk, (np.concatenate([a, b]), len(a)), n_resamples,
+                        np.random.SeedSequence([seed, 2]), executor)
+    t_perm = _gather(parts)
+    return t_obs, float((1 + np.count_nonzero(t_perm >= t_obs)) / (1 + len(t_perm)))
@@ -0,0 +1,99 @@
+# analise/sampling.py
+# Amostragem que reduz o scan: cópia da tabela particionada pelo bucket de hash
+#
+# Uso (fora do Streamlit):
+#   python -m analise.sampling create --backend bigquery --dest meu-projeto.github.languages_by_bucket
+#   python -m analise.sampling create --backend local                 # → data/languages_by_bucket/
+#   python -m analise.sampling estimate --backend local --sample-pct 1 10 100
+#
+# Depois de criada, a página/CLIs usam a cópia com ANALISE_BUCKETED_TABLE (BigQuery) ou
+# ANALISE_LOCAL_BUCKETED (local; padrão data/languages_by_bucket, usado se existir).
+#
+# Por que não TABLESAMPLE SYSTEM (n PERCENT)? Também reduz o scan, mas sorteia blocos de armazenamento:
+# - a amostra muda a cada execução — não é estável, não serve de chave de cache nem cresce de 5% para
+#   10% reaproveitando os buckets já buscados;
+# - é amostragem por conglomerado: repos do mesmo bloco tendem a ser parecidos (ordem de carga), então
+#   a variância dos estimadores é maior do que numa amostra aleatória simples do mesmo tamanho, e os
+#   ICs da página (que assumem observações independentes) ficam otimistas;
+# - em tabelas pequenas ou com poucos blocos, o percentual efetivo oscila bastante em torno do pedido.
+# A cópia custa um scan completo uma vez (e o armazenamento); daí em diante, 1% lê ~1% da tabela, com
+# exatamente os mesmos repos do filtro por FARM_FINGERPRINT. No BigQuery, a poda por partição já aparece
+# no dry-run (`bq_estimate_bytes`); cada consulta ainda é cobrada no mínimo 10 MB por tabela lida.
+
+import argparse
+import os
+import shutil
+import sys
+
+from analise import queries
+from analise.backends import make_backend
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.governor import DEFAULT_LEDGER_PATH, ByteLedger, GovernedBackend, Governor
+from analise.report import human_bytes
+
+DEFAULT_LOCAL_BUCKETED_DIR = os.path.join("data", "languages_by_bucket")
+
+
+def create_bucketed_copy(backend, dest: str) -> int:
+    """Cria (ou recria) a cópia particionada por bucket a partir da tabela original. Retorna os bytes processados."""
+    if queries.engine(backend.dialect) == "duckdb" and os.path.isdir(dest):
+        shutil.rmtree(dest)  # o COPY só acrescenta arquivos: partições antigas ficariam duplicadas
+    return backend.execute(queries.sql_create_bucketed(dest, queries.engine(backend.dialect)))
+
+
+def compare_estimates(backend, sample_pcts) -> list[dict]:
+    """Dry-run da visão por repo: filtro por hash na tabela original × poda de partições na cópia."""
+    base = queries.engine(backend.dialect)
+    rows = []
+    for pct in sample_pcts:
+        hashed = backend.estimate_bytes(queries.sql_per_repo(pct, base))
+        bucketed = backend.estimate_bytes(queries.sql_per_repo(pct, backend.dialect))
+        rows.append({"sample_pct": pct, "hash_bytes": hashed, "bucketed_bytes": bucketed,
+                     "ratio": bucketed / hashed if hashed else float("nan")})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cópia da tabela de linguagens particionada por bucket de hash.")
+    parser.add_argument("command", choices=["create", "estimate"])
+    parser.add_argument("--backend", choices=["bigquery", "local"], default=os.environ.get("ANALISE_BACKEND", "bigquery"))
+    parser.add_argument("--local-data", default=os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH))
+    parser.add_argument("--location", default="US")
+    parser.add_argument("--dest", help="Tabela destino (projeto.dataset.tabela, mesma região do dataset público) "
+                                       "ou diretório no local. Padrão: ANALISE_BUCKETED_TABLE / ANALISE_LOCAL_BUCKETED.")
+    parser.add_argument("--sample-pct", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--daily-budget-gb", type=float, default=float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0")),
+                        help="Orçamento diário de bytes no BigQuery (0 = sem limite); compartilha o ledger da página.")
+    args = parser.parse_args(argv)
+
+    dest = args.dest or (os.environ.get("ANALISE_LOCAL_BUCKETED", DEFAULT_LOCAL_BUCKETED_DIR) if args.backend == "local"
+                         else os.environ.get("ANALISE_BUCKETED_TABLE"))
+    if not dest:
+        parser.error("informe --dest (ou ANALISE_BUCKETED_TABLE) com a tabela de destino no BigQuery")
+
+    if args.command == "create":
+        backend = make_backend(args.backend, local_path=args.local_data, location=args.location)
+    else:
+        backend = make_backend(args.backend, local_path=args.local_data, location=args.location, bucketed=dest)
+        if queries.engine(backend.dialect) == backend.dialect:
+            print(f"Cópia particionada não encontrada em {dest}: rode `python -m analise.sampling create` antes.",
+                  file=sys.stderr)
+            return 1
+    if args.backend == "bigquery":
+        governor = Governor(ByteLedger(os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)),
+                            daily_budget=int(args.daily_budget_gb * 1024**3), session_resolver=lambda: "sampling")
+        backend = GovernedBackend(backend, governor)
+
+    if args.command == "create":
+        processed = create_bucketed_copy(backend, dest)
+        print(f"Cópia particionada por bucket criada em {dest} ({human_bytes(processed)} processados).")
+        return 0
+    print(f"{'amostra':>7} {'filtro por hash':>16} {'partições':>12} {'razão':>7}")
+    for row in compare_estimates(backend, args.sample_pct):
+        print(f"{row['sample_pct']:>6}% {human_bytes(row['hash_bytes']):>16} {human_bytes(row['bucketed_bytes']):>12} "
+              f"{row['ratio']:>7.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
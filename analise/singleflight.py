@@ -0,0 +1,88 @@
+# analise/singleflight.py
+# Single-flight: uma execução por chave, servindo todos que pedirem a mesma coisa ao mesmo tempo
+#
+# Depois de um deploy ou de o cache expirar, várias sessões (threads do mesmo worker) e vários workers
+# (processos) abrem a página juntos e pediriam o mesmo job ao BigQuery. Aqui:
+# - entre threads: o primeiro a chegar ("líder") executa; os demais esperam o mesmo Future;
+# - entre processos: o líder segura um flock num arquivo de lock da chave; quem chega de outro processo
+#   bloqueia nele e, ao entrar, relê o cache (já preenchido pelo líder) em vez de consultar de novo.
+#   Se o líder morrer, o sistema operacional solta o lock e o próximo executa.
+# Os arquivos de lock são listrados pelo prefixo da chave (no máximo 4096) e nunca são apagados: remover
+# um lock em uso quebraria a exclusão. Ficam fora do diretório do DiskCache, cuja limpeza removeria arquivos.
+
+import fcntl
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+
+OUTCOMES = ("hit", "miss", "coalesced")
+DEFAULT_LOCKS_DIR = os.path.join("data", "locks")
+
+
+class SingleFlight:
+    """`do(key, lookup, compute)`: cache → execução única por chave (threads e, com `lock_dir`, processos).
+
+    Contagens por rótulo: hit (estava no cache), miss (executou), coalesced (esperou outra execução).
+    """
+
+    def __init__(self, lock_dir: str | None = None):
+        self.lock_dir = lock_dir
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(OUTCOMES, 0))
+
+    def _count(self, label: str, outcome: str) -> None:
+        with self._lock:
+            self._stats[label][outcome] += 1
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {label: dict(counts) for label, counts in self._stats.items()}
+
+    @contextmanager
+    def _process_lock(self, key: str):
+        with open(os.path.join(self.lock_dir, f"{key[:3]}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def do(self, key: str, lookup, compute, label: str = "query"):
+        """Retorna (valor, "hit" | "miss" | "coalesced").
+
+        `lookup()` lê o cache (None = ausente); `compute()` executa e deve gravar onde `lookup` lê,
+        para que outros processos o encontrem.
+        """
+        value = lookup()
+        if value is not None:
+            self._count(label, "hit")
+            return value, "hit"
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            value = fut.result()  # erro do líder também chega aqui: quem esperava não repete a consulta
+            self._count(label, "coalesced")
+            return value, "coalesced"
+        try:
+            with self._process_lock(key) if self.lock_dir else nullcontext():
+                value = lookup()  # outro processo (ou uma thread que acabou antes) pode ter preenchido
+                outcome = "coalesced" if value is not None else "miss"
+                if value is None:
+                    value = compute()
+            fut.set_result(value)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self._count(label, outcome)
+        return value, outcome
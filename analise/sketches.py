@@ -0,0 +1,137 @@
+# analise/sketches.py
+# Sketches de quantis mergeáveis (t-digest) para medianas/quartis por linguagem em memória limitada
+#
+# Variante "merging digest" vetorizada: a cada update/merge, os centróides (e os valores novos)
+# são ordenados e reagrupados de uma vez pela função de escala k1(q) = δ/(2π)·asin(2q − 1);
+# cada centróide cobre no máximo 1 unidade de k. Como dk/dq = δ/(2π·√(q(1−q))), um centróide
+# abrange no máximo Δq = 2π·√(q(1−q))/δ do posto; com interpolação entre centros, o erro de posto
+# de um quantil q fica em ~π·√(q(1−q))/δ (mediana, δ = 1000: ≤ 0,16% do posto; caudas bem menos).
+# O digest guarda ≤ ~δ/2 centróides, independentemente de quantos valores recebeu.
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DELTA = 1000.0
+
+
+def _empty() -> np.ndarray:
+    return np.empty(0, dtype=float)
+
+
+@dataclass
+class TDigest:
+    """Centróides (média, peso) ordenados + mín/máx exatos."""
+
+    delta: float = DEFAULT_DELTA
+    means: np.ndarray = field(default_factory=_empty)
+    weights: np.ndarray = field(default_factory=_empty)
+    min: float = np.inf
+    max: float = -np.inf
+
+    @classmethod
+    def from_array(cls, x, delta: float = DEFAULT_DELTA) -> "TDigest":
+        x = np.asarray(x, dtype=float)
+        x = np.sort(x[np.isfinite(x)])
+        return cls(delta).merge_sorted(x, np.ones(len(x)))
+
+    @property
+    def n(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, x) -> "TDigest":
+        return self.merge(TDigest.from_array(x, self.delta))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if not len(other.weights):
+            return self
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        order = np.argsort(means, kind="stable")
+        return self._compress(means[order], weights[order])
+
+    def merge_sorted(self, means: np.ndarray, weights: np.ndarray) -> "TDigest":
+        """Incorpora pontos já ordenados (valores com peso 1 ou centróides de outro digest)."""
+        if not len(means):
+            return self
+        self.min, self.max = min(self.min, float(means[0])), max(self.max, float(means[-1]))
+        if len(self.weights):
+            return self.merge(TDigest(self.delta, means, weights, float(means[0]), float(means[-1])))
+        return self._compress(means, weights)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> "TDigest":
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.delta / (2 * np.pi) * np.arcsin(2 * q_left - 1)
+        cell = np.floor(k - k[0]).astype(np.int64)  # não decrescente: pontos vizinhos na mesma unidade de k
+        starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+        return self
+
+    def quantile(self, q):
+        """Quantil(is) por interpolação linear entre os centros dos centróides (mín/máx nas pontas)."""
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if not len(self.weights):
+            return np.full(len(q), np.nan)
+        total = self.weights.sum()
+        # posição do centro de cada centróide na escala 0..N−1 (a mesma do np.quantile "linear"):
+        # com centróides unitários o resultado é exatamente o quantil amostral
+        centers = (np.cumsum(self.weights) - (self.weights + 1) / 2) / max(total - 1, 1)
+        xs = np.r_[0.0, centers, 1.0]
+        ys = np.r_[self.min, self.means, self.max]
+        return np.interp(q, xs, ys)
+
+
+@dataclass
+class GroupedDigests:
+    """Um `TDigest` por chave (ex.: linguagem dominante); update ordena o pedaço uma vez só."""
+
+    delta: float = DEFAULT_DELTA
+    groups: dict = field(default_factory=dict)
+
+    def update(self, keys, values) -> "GroupedDigests":
+        codes, uniques = pd.factorize(np.asarray(keys, dtype=object), sort=False)
+        x = np.asarray(values, dtype=float)
+        ok = (codes >= 0) & np.isfinite(x)
+        codes, x = codes[ok], x[ok]
+        order = np.lexsort((x, codes))
+        codes, x = codes[order], x[order]
+        bounds = np.searchsorted(codes, np.arange(len(uniques) + 1))
+        for i, key in enumerate(uniques):
+            lo, hi = bounds[i], bounds[i + 1]
+            if hi > lo:
+                self.groups.setdefault(key, TDigest(self.delta)).merge_sorted(x[lo:hi], np.ones(hi - lo))
+        return self
+
+    def merge(self, other: "GroupedDigests") -> "GroupedDigests":
+        for key, d in other.groups.items():
+            self.groups.setdefault(key, TDigest(self.delta)).merge(d)
+        return self
+
+    def to_arrays(self) -> tuple[list, np.ndarray, np.ndarray, dict]:
+        """(chave de cada centróide, médias, pesos, {chave: [mín, máx]}) — formato gravado no cache."""
+        keys, means, weights = [], [], []
+        for key, d in self.groups.items():
+            keys.extend([key] * len(d.means))
+            means.append(d.means)
+            weights.append(d.weights)
+        extents = {key: [d.min, d.max] for key, d in self.groups.items()}
+        return keys, np.concatenate(means or [_empty()]), np.concatenate(weights or [_empty()]), extents
+
+    @classmethod
+    def from_arrays(cls, keys, means, weights, extents: dict, delta: float = DEFAULT_DELTA) -> "GroupedDigests":
+        keys = np.asarray(keys, dtype=object)
+        out = cls(delta)
+        for key, (lo, hi) in extents.items():
+            mask = keys == key
+            out.groups[key] = TDigest(delta, np.asarray(means)[mask], np.asarray(weights)[mask], lo, hi)
+        return out
+
+    def quantiles(self, qs, key_name: str = "key") -> pd.DataFrame:
+        """Uma linha por chave com os quantis pedidos (colunas = valores de `qs`) e o peso total `n`."""
+        rows = [[key, d.n, *d.quantile(qs)] for key, d in self.groups.items()]
+        return pd.DataFrame(rows, columns=[key_name, "n", *qs])
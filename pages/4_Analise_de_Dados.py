@@ -1,16 +1,41 @@
 # pages/4_Analise_de_Dados.py
 # Analise GitHub (BigQuery) – PROD: SA via secrets, cache, status, location=US
 
+import functools
 import math
+import os
+import threading
+import time
 import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
 from datetime import datetime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from google.cloud import bigquery
-from google.cloud.bigquery import QueryJobConfig
 from google.oauth2 import service_account
 
+from analise import analysis, density, pipeline, queries, resampling, sketches
+from analise.backends import BigQueryBackend, LocalBackend
+from analise.accumulators import PerRepoAccumulator
+from analise.buckets import BucketedPerRepo, contiguous_ranges
+from analise.cache import CachedBackend, DiskCache
+from analise.charts import (box_chart, cooccurrence_chart, density2d_chart, density_chart, hist_chart,
+                            timeseries_chart)
+from analise.cooccurrence import BucketedCoOccurrence, CoOccurrence
+from analise.events import DAILY_METRICS, DEFAULT_EVENTS_DIR, ROLLING_DAYS, EventStore
+from analise.fixtures import DEFAULT_FIXTURE_PATH
+from analise.governor import DEFAULT_LEDGER_PATH, BudgetExceeded, ByteLedger, GovernedBackend, Governor
+from analise.frames import compact_per_repo, memory_report
+from analise.inference import correlation_magnitude
+from analise.jobs import JobRunner
+from analise.materialize import DEFAULT_MATERIALIZED_DIR, PER_REPO_COLUMNS, MaterializedPerRepo
+from analise.refresh import DEFAULT_VERSIONS_PATH, DataVersions, Revalidator
+from analise.report import fmt_num, fmt_pct, human_age, human_bytes
+from analise.sampling import DEFAULT_LOCAL_BUCKETED_DIR
+from analise.singleflight import DEFAULT_LOCKS_DIR, SingleFlight
+from analise import pushdown
+
 # ===============================
 # CONFIG GLOBAL
 # ===============================
@@ -18,44 +43,60 @@ PAGE_TITLE = "🔎 Análise de Dados (GitHub - BigQuery)"
 BQ_LOCATION = "US"  # datasets públicos costumam ficar em US
 DEFAULT_TOP_N = 20
 DEFAULT_SAMPLE_PCT = 10
+# backend de consulta: "bigquery" (produção) ou "local" (DuckDB sobre Parquet, offline)
+BACKENDS = {"bigquery": "BigQuery", "local": "Local (DuckDB/Parquet, offline)"}
+DEFAULT_BACKEND = os.environ.get("ANALISE_BACKEND", "bigquery")
+LOCAL_DATA_PATH = os.environ.get("ANALISE_LOCAL_DATA", DEFAULT_FIXTURE_PATH)
+# cópia particionada por bucket (python -m analise.sampling create): o scan passa a escalar com a amostra
+BUCKETED_TABLE = os.environ.get("ANALISE_BUCKETED_TABLE") or None
+LOCAL_BUCKETED_PATH = os.environ.get("ANALISE_LOCAL_BUCKETED", DEFAULT_LOCAL_BUCKETED_DIR)
+# modo de cálculo das estatísticas da visão por repo
+CALC_MODES = {
+    "linhas": "Linhas (pandas)",
+    "pushdown": "Agregado no SQL (pushdown)",
+    "streaming": "Streaming por bucket (acumuladores)",
+}
+# visão por repo materializada offline (python -m analise.materialize)
+MATERIALIZED_DIR = os.environ.get("ANALISE_MATERIALIZED_DIR", DEFAULT_MATERIALIZED_DIR)
+# cache persistente em disco (sobrevive a restart/redeploy e é compartilhado entre workers)
+CACHE_DIR = os.environ.get("ANALISE_CACHE_DIR", os.path.join("data", "cache"))
+CACHE_TTL_HOURS = float(os.environ.get("ANALISE_CACHE_TTL_HOURS", "24"))
+CACHE_MAX_GB = float(os.environ.get("ANALISE_CACHE_MAX_GB", "2"))
+# single-flight entre workers: locks de arquivo por chave de consulta (fora do CACHE_DIR)
+LOCKS_DIR = os.environ.get("ANALISE_LOCKS_DIR", DEFAULT_LOCKS_DIR)
+# versão publicada de cada conjunto de dados (stale-while-revalidate; fora do CACHE_DIR, que tem LRU próprio)
+VERSIONS_PATH = os.environ.get("ANALISE_VERSIONS_PATH", DEFAULT_VERSIONS_PATH)
+# memo das etapas da análise (compartilhado pelas sessões do worker): limite em MB — a saída do log10 é a visão inteira
+MEMO_MAX_MB = float(os.environ.get("ANALISE_MEMO_MAX_MB", "256"))
+# bootstrap/permutação: processos do pool (1 = no próprio processo do Streamlit)
+RESAMPLING_WORKERS = int(os.environ.get("ANALISE_WORKERS", os.cpu_count() or 1))
+# tempo-alvo de bootstrap + permutação: só são oferecidas as reamostragens que cabem nele com RESAMPLING_WORKERS
+RESAMPLING_BUDGET_S = float(os.environ.get("ANALISE_RESAMPLING_BUDGET_S", "10"))
+RESAMPLE_OPTIONS = [1_000, 2_000, 5_000, 10_000]
+REPOS_PER_SAMPLE_PCT = 33_000  # github_repos.languages tem ~3,3 milhões de repos: linhas estimadas antes da consulta
+# orçamento de bytes processados (0 = sem limite) e ledger persistente de consultas/hits de cache
+BUDGET_SESSION_GB = float(os.environ.get("ANALISE_BUDGET_SESSION_GB", "0"))
+BUDGET_DAILY_GB = float(os.environ.get("ANALISE_BUDGET_DAILY_GB", "0"))
+LEDGER_PATH = os.environ.get("ANALISE_LEDGER_PATH", DEFAULT_LEDGER_PATH)
+GOVERNED_BACKENDS = os.environ.get("ANALISE_GOVERNED_BACKENDS", "bigquery").split(",")  # o local não custa nada
+SAMPLE_OPTIONS = [1, 2, 5, 10, 20, 50, 100]
+# séries temporais: agregados diários gerados por `python -m analise.events ingest`
+EVENTS_DIR = os.environ.get("ANALISE_EVENTS_DIR", DEFAULT_EVENTS_DIR)
 
 st.set_page_config(page_title="Análise de Dados", layout="wide")
+script_t0 = time.perf_counter()
+pipeline.MEMO.max_bytes = int(MEMO_MAX_MB * 1024**2)
+pipeline.MEMO.reset_runs()  # registra quais etapas este rerun recalcula
 st.title(PAGE_TITLE)
 st.caption("Foco de engenharia: modelagem por repositório, custo/escala, métricas, inferência e explicabilidade.")
 
 # ===============================
 # HELPERS GERAIS
 # ===============================
-def fmt_num(x, fmt="{:.3f}", fallback="—"):
-    try:
-        if x is None:
-            return fallback
-        if isinstance(x, (float, int, np.floating)) and (math.isnan(x) or math.isinf(x)):
-            return fallback
-        return fmt.format(x)
-    except Exception:
-        return fallback
-
-def fmt_pct(x, fallback="—"):
-    try:
-        if x is None or math.isnan(x):
-            return fallback
-        return f"{x:.1f}%"
-    except Exception:
-        return fallback
-
-def human_bytes(n: int) -> str:
-    if n is None or n < 0:
-        return "?"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    i, x = 0, float(n)
-    while x >= 1024 and i < len(units) - 1:
-        x /= 1024
-        i += 1
-    return f"{x:,.2f} {units[i]}"
+# fmt_num / fmt_pct / human_bytes: analise/report.py (compartilhados com CLI/benchmarks)
 
 # ===============================
-# AUTENTICAÇÃO / CLIENTE BQ
+# AUTENTICAÇÃO / CLIENTE BQ / BACKENDS
 # ===============================
 @st.cache_resource(show_spinner=False)
 def get_bq_client():
@@ -67,51 +108,309 @@ def get_bq_client():
         return bigquery.Client(credentials=creds, project=creds.project_id)
     return bigquery.Client()  # local (ADC via gcloud)
 
+@st.cache_resource(show_spinner=False)
+def get_bq_read_client():
+    """Cliente da Storage Read API (download paralelo em Arrow), reaproveitado entre consultas."""
+    from google.cloud import bigquery_storage
+    if "gcp_service_account" in st.secrets:  # deploy
+        creds = service_account.Credentials.from_service_account_info(
+            st.secrets["gcp_service_account"],
+            scopes=["https://www.googleapis.com/auth/cloud-platform"],
+        )
+        return bigquery_storage.BigQueryReadClient(credentials=creds)
+    return bigquery_storage.BigQueryReadClient()  # local (ADC via gcloud)
+
+@st.cache_resource(show_spinner=False)
+def get_disk_cache():
+    return DiskCache(CACHE_DIR, ttl_seconds=CACHE_TTL_HOURS * 3600, max_bytes=int(CACHE_MAX_GB * 1024**3))
+
+def _session_id() -> str | None:
+    ctx = get_script_run_ctx()  # também presente nas threads do JobRunner (add_script_run_ctx)
+    return ctx.session_id if ctx is not None else None
+
+@st.cache_resource(show_spinner=False)
+def get_governor():
+    return Governor(ByteLedger(LEDGER_PATH), session_budget=int(BUDGET_SESSION_GB * 1024**3),
+                    daily_budget=int(BUDGET_DAILY_GB * 1024**3), session_resolver=_session_id)
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight():
+    """Compartilhado por todas as sessões do worker: uma consulta/dry-run em andamento por chave."""
+    return SingleFlight(LOCKS_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_backend(kind: str):
+    if kind == "local":
+        inner = LocalBackend(LOCAL_DATA_PATH, bucketed_path=LOCAL_BUCKETED_PATH)
+    else:
+        inner = BigQueryBackend(get_bq_client(), location=BQ_LOCATION, read_client=get_bq_read_client(),
+                                bucketed_table=BUCKETED_TABLE)
+    governor = get_governor()
+    if kind in GOVERNED_BACKENDS:
+        inner = GovernedBackend(inner, governor)
+    return CachedBackend(inner, get_disk_cache(), flight=get_single_flight(),
+                         on_hit=lambda sql, saved: governor.record_hit(inner.name, sql, saved))
+
+@st.cache_resource(show_spinner=False)
+def get_versions():
+    return DataVersions(VERSIONS_PATH)
+
+@st.cache_resource(show_spinner=False)
+def get_revalidator():
+    return Revalidator(get_versions())
+
+@st.cache_resource(show_spinner=False)
+def get_process_pool():
+    return resampling.make_pool(RESAMPLING_WORKERS) if RESAMPLING_WORKERS > 1 else None
+
+@st.cache_data(show_spinner=False)
+def bq_estimate_bytes(sql: str, backend: str = "bigquery") -> int:
+    return get_backend(backend).estimate_bytes(sql)
+
+@st.cache_data(show_spinner=False)
+def bq_query(sql: str, backend: str = "bigquery", data_version: int = 0) -> tuple[pd.DataFrame, int]:
+    """Retorna (DataFrame, bytes processados). `data_version` (stale-while-revalidate) só entra na chave do cache."""
+    return get_backend(backend).query(sql)
+
+@st.cache_data(show_spinner=False)
+def bq_query_per_repo(sample_pct: int, backend: str = "bigquery", keep_repo_name: bool = False,
+                      materialized_version: float | None = None, data_version: int = 0) -> tuple[pd.DataFrame, int, dict]:
+    """Visão por repo: da materialização local (se houver) ou por bucket de hash (só busca os buckets que faltam no cache).
+
+    `materialized_version` e `data_version` entram na chave do cache: rematerializar ou publicar uma versão nova
+    troca o resultado servido.
+    Retorna (DataFrame com dtypes compactos, bytes processados nesta chamada, métricas de fetch/memória).
+    """
+    t0 = time.perf_counter()
+    if materialized_version is not None:
+        columns = PER_REPO_COLUMNS + (["repo_name"] if keep_repo_name else [])
+        table = MaterializedPerRepo(MATERIALIZED_DIR).load(sample_pct, columns)
+        bytes_processed, info = 0, {"source": "materializado"}
+    else:
+        store = BucketedPerRepo(get_backend(backend).inner, get_disk_cache(), get_single_flight())
+        table, bytes_processed, info = store.load(sample_pct)
+        info["source"] = "buckets"
+    t1 = time.perf_counter()
+    df = pipeline.with_fingerprint(compact_per_repo(table, keep_repo_name=keep_repo_name))  # chave das etapas
+    stats_fetch = memory_report(table, df)
+    stats_fetch.update(info, fetch_s=t1 - t0, convert_s=time.perf_counter() - t1)
+    return df, bytes_processed, stats_fetch
+
+@st.cache_data(show_spinner=False)
+def bq_stream_per_repo(sample_pct: int, backend: str = "bigquery", materialized_version: float | None = None,
+                       data_version: int = 0) -> tuple[PerRepoAccumulator, int, dict]:
+    """Acumula as estatísticas bucket a bucket (ou row group a row group, se materializado),
+    sem montar a visão por repo inteira em memória. Por bucket, o resumo (momentos + t-digests)
+    fica no cache em disco: aumentar a amostra só processa os buckets novos.
+
+    Retorna (acumulador, bytes processados nesta chamada, resumo da fonte).
+    """
+    t0 = time.perf_counter()
+    acc = PerRepoAccumulator()
+    if materialized_version is not None:
+        info = {"source": "materializado", "bytes_processed": 0}
+        for batch in MaterializedPerRepo(MATERIALIZED_DIR).iter_batches(sample_pct):
+            acc.update(batch)
+    else:
+        store = BucketedPerRepo(get_backend(backend).inner, get_disk_cache(), get_single_flight())
+        info = {"source": "buckets"}
+        acc = store.accumulate(sample_pct, info)
+    info["fetch_s"] = time.perf_counter() - t0
+    return acc, info.pop("bytes_processed"), info
+
+@st.cache_data(show_spinner=False)
+def kde_mono_multi(sample_pct: int, backend: str = "bigquery", keep_repo_name: bool = False,
+                   materialized_version: float | None = None, rule: str = "silverman", data_version: int = 0):
+    """KDE de log10(total_bytes+1) por grupo (mono/multi), com a mesma chave da visão por repo."""
+    df, _, _ = bq_query_per_repo(sample_pct, backend, keep_repo_name, materialized_version, data_version)
+    mono, multi = analysis.mono_multi(pipeline.transform(df))
+    return density.density_curves({"Monolíngue": mono, "Multilíngue": multi}, rule=rule)
+
+@st.cache_data(show_spinner=False)
+def boot_medians(sample_pct: int, backend: str, keep_repo_name: bool, materialized_version: float | None,
+                 metric: str, languages: tuple, n_resamples: int, data_version: int = 0) -> pd.DataFrame:
+    """IC 95% bootstrap das medianas por linguagem (seed fixa → mesmo resultado a cada rerun)."""
+    df, _, _ = bq_query_per_repo(sample_pct, backend, keep_repo_name, materialized_version, data_version)
+    return resampling.bootstrap_medians(pipeline.transform(df), metric, languages, n_resamples,
+                                        executor=get_process_pool())
+
+@st.cache_data(show_spinner=False)
+def boot_welch(sample_pct: int, backend: str, keep_repo_name: bool, materialized_version: float | None,
+               n_resamples: int, data_version: int = 0) -> dict:
+    """IC 95% bootstrap de Δ (multi − mono) e p-valor por permutação do t de Welch."""
+    t0 = time.perf_counter()
+    df, _, _ = bq_query_per_repo(sample_pct, backend, keep_repo_name, materialized_version, data_version)
+    mono, multi = analysis.mono_multi(pipeline.transform(df))
+    pool = get_process_pool()
+    lci, uci = resampling.bootstrap_mean_diff(multi, mono, n_resamples, executor=pool)
+    _, p_perm = resampling.permutation_welch(multi, mono, n_resamples, executor=pool)
+    return {"lci": lci, "uci": uci, "p_perm": p_perm, "elapsed_s": time.perf_counter() - t0}
+
 @st.cache_data(show_spinner=False)
-def bq_estimate_bytes(sql: str) -> int:
-    client = get_bq_client()
-    qcfg = QueryJobConfig(dry_run=True, use_query_cache=False)
-    job = client.query(sql, location=BQ_LOCATION, job_config=qcfg)
-    return int(job.total_bytes_processed)
+def bq_cooccurrence(sample_pct: int, backend: str = "bigquery", data_version: int = 0) -> tuple[CoOccurrence, int, dict]:
+    """Coocorrência de linguagens na amostra; por bucket, o estado (pares esparsos) fica no cache em disco.
+
+    Retorna (coocorrência, bytes processados nesta chamada, resumo dos buckets).
+    """
+    t0 = time.perf_counter()
+    info: dict = {}
+    co = BucketedCoOccurrence(get_backend(backend).inner, get_disk_cache(), get_single_flight()).accumulate(sample_pct, info)
+    info["fetch_s"] = time.perf_counter() - t0
+    return co, info.pop("bytes_processed"), info
+
+@st.cache_data(show_spinner=False, ttl=300)
+def source_modified(backend: str) -> float | None:
+    """Última modificação da tabela de origem (checada no máximo a cada 5 min)."""
+    return get_backend(backend).source_modified()
 
 @st.cache_data(show_spinner=False)
-def bq_query(sql: str) -> tuple[pd.DataFrame, int]:
-    """Retorna (DataFrame, bytes processados)."""
-    client = get_bq_client()
-    job = client.query(sql, location=BQ_LOCATION)
-    df = job.result().to_dataframe()
-    bytes_processed = getattr(job, "total_bytes_processed", None)
-    return df, (int(bytes_processed) if bytes_processed is not None else -1)
-
-def sanity_check():
+def load_event_daily(path: str, version: float) -> tuple[pd.DataFrame, dict]:
+    """Agregados diários por linguagem (só o daily.parquet, nunca os eventos); `version` = mtime do arquivo."""
+    store = EventStore(path)
+    return store.read_daily(), store.state()
+
+def sanity_check(backend: str) -> str | None:
+    """Testa o backend escolhido; se o BigQuery falhar, cai para o backend local. Retorna o backend efetivo."""
     try:
-        client = get_bq_client()
-        df = client.query("SELECT 1 AS ok", location=BQ_LOCATION).result().to_dataframe()
-        st.success(f"Conexão BigQuery OK!")
-        return True
+        get_backend(backend).ping()
+        st.success(f"Conexão {BACKENDS[backend]} OK!")
+        return backend
     except Exception as e:
+        if backend == "local":
+            st.error("Falha ao abrir o backend local (DuckDB/Parquet). Verifique `ANALISE_LOCAL_DATA`.")
+            st.exception(e)
+            return None
         st.error("Falha ao conectar no BigQuery. Verifique Service Account, roles e billing.")
         st.exception(e)
-        return False
+    try:
+        get_backend("local").ping()
+        st.warning("Usando o backend **local (offline)** como fallback — números refletem as fixtures, não o GitHub real.")
+        return "local"
+    except Exception as e:
+        st.exception(e)
+        return None
+
+def section(name: str):
+    """Seção como `st.fragment`: os controles declarados dentro dela só rerodam a própria seção.
+
+    A latência de cada rerun da seção é mostrada ao fim dela e guardada em `session_state`.
+    Dados da execução completa (visão por repo, acumuladores) são lidos do escopo do script.
+    """
+    def deco(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def wrapper():
+            t0 = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - t0
+            st.session_state.setdefault("section_latency", {})[name] = elapsed
+            st.caption(f"⏱️ Seção “{name}” renderizada em {elapsed * 1000:,.0f} ms.")
+        return wrapper
+    return deco
+
+# ---------- stale-while-revalidate ----------
+# Cada conjunto de dados exibido registra aqui como recalculá-lo; o botão de atualizar (ou a fonte ter mudado)
+# recalcula em segundo plano só esses, e a página segue servindo a versão publicada até a troca.
+def dataset_version(name: str, refresh) -> int:
+    """Registra o conjunto de dados usado nesta sessão e devolve a versão publicada (vai na chave do cache)."""
+    st.session_state.setdefault("datasets", {})[name] = refresh
+    entry = get_versions().observe(name)
+    modified = source_modified(name.split(":", 1)[0])
+    if modified is not None and entry["updated_at"] is not None and modified > entry["updated_at"]:
+        get_revalidator().submit(name, refresh)  # fonte mais nova que os dados: revalida sem esperar o clique
+    return entry["version"]
+
+def refresh_query(sql: str, backend: str):
+    def run(version: int):
+        get_backend(backend).refresh(sql)  # regrava a entrada do DiskCache (rename atômico)
+        bq_query(sql, backend, version)    # pré-aquece a versão nova antes de publicá-la
+    return run
+
+def refresh_per_repo(pct: int, backend: str, mode: str, keep_repo_name: bool):
+    def run(version: int):
+        if mode == "pushdown":
+            d = get_backend(backend).dialect
+            for sql in (queries.sql_per_repo_stats(pct, d), queries.sql_per_repo_hist(pct, d)):
+                refresh_query(sql, backend)(version)
+            return
+        store = BucketedPerRepo(get_backend(backend).inner, get_disk_cache(), get_single_flight())
+        if mode == "streaming":
+            store.accumulate(pct, refresh=True)
+            bq_stream_per_repo(pct, backend, None, version)
+        else:
+            store.load(pct, refresh=True)
+            bq_query_per_repo(pct, backend, keep_repo_name, None, version)
+    return run
+
+def refresh_cooccurrence(pct: int, backend: str):
+    def run(version: int):
+        BucketedCoOccurrence(get_backend(backend).inner, get_disk_cache(), get_single_flight()).accumulate(pct, refresh=True)
+        bq_cooccurrence(pct, backend, version)
+    return run
+
+# aviso acima do relatório (st.empty, recriado a cada execução completa); None até lá: na execução completa
+# o relatório é renderizado depois das seções e já sai atualizado
+report_status = None
+
+def report_markdown(ctx: dict) -> str:
+    return pipeline.report(ctx, ctx.get("calc_corr", False), ctx.get("calc_test", False))
+
+def report_ctx_update(**values) -> None:
+    """Cada seção publica sua parte do contexto do relatório; a seção do relatório lê tudo daqui.
+
+    Se a seção reroda sozinha e o texto do relatório na tela (e dos downloads) mudaria, marca-o como desatualizado.
+    """
+    ctx = st.session_state.setdefault("report_ctx", {})
+    ctx.update(values)
+    shown = st.session_state.get("report_md")
+    if report_status is None or shown is None:
+        return
+    if report_markdown(ctx) != shown:
+        report_status.warning("⚠️ Relatório desatualizado: uma seção acima mudou depois que ele foi gerado, e o texto "
+                              "e os downloads abaixo ainda são da versão anterior. Clique em “Regerar”.")
+    else:
+        report_status.empty()
 
 # ===============================
 # SIDEBAR (CONTROLES)
 # ===============================
 with st.sidebar:
     st.header("Configurações")
+    backend_choice = st.radio("Backend de consulta", list(BACKENDS),
+                              index=list(BACKENDS).index(DEFAULT_BACKEND) if DEFAULT_BACKEND in BACKENDS else 0,
+                              format_func=BACKENDS.get,
+                              help="Local: DuckDB sobre Parquet com o mesmo formato de `github_repos.languages` (sem rede/custo).")
     sample_pct = st.select_slider("Amostragem por repositório",
-                                  options=[1, 2, 5, 10, 20, 50, 100],
+                                  options=SAMPLE_OPTIONS,
                                   value=DEFAULT_SAMPLE_PCT,
                                   help="Amostra estável por hash do repo_name: reduz custo mantendo representatividade.")
     top_n = st.slider("Top-N linguagens por bytes (global)", 5, 30, DEFAULT_TOP_N, 1)
-    scale = st.radio("Escala para tamanhos de repositório", ["log10", "linear"], index=0)
-    calc_correlation = st.checkbox("Calcular correlação (r, p, IC)", value=True)
-    calc_test = st.checkbox("Teste de hipótese (Welch: multilíngues > monolíngues)", value=True)
-
+    calc_mode = st.radio("Modo de cálculo", list(CALC_MODES), index=0, format_func=CALC_MODES.get,
+                         help="Pushdown: o SQL devolve só momentos, quartis e contagens do histograma (alguns KB). "
+                              "Streaming: acumuladores mergeáveis bucket a bucket, em memória constante. "
+                              "Nos dois, scatter/densidade ficam de fora (exigem linhas).")
+    max_resamples = resampling.max_resamples(REPOS_PER_SAMPLE_PCT * sample_pct, RESAMPLING_WORKERS, RESAMPLING_BUDGET_S)
+    resample_options = [n for n in RESAMPLE_OPTIONS if n <= max_resamples] or RESAMPLE_OPTIONS[:1]
+    n_resamples = st.select_slider("Reamostragens (bootstrap/permutação)", options=resample_options,
+                                   value=min(2_000, resample_options[-1]),
+                                   help=f"Usado quando o IC por bootstrap é ligado nas seções (modo linhas). Até "
+                                        f"{resample_options[-1]:,} para caber em ~{RESAMPLING_BUDGET_S:g}s com "
+                                        f"{RESAMPLING_WORKERS} processo(s) nesta amostra.")
+    keep_repo_name = st.checkbox("Manter repo_name na visão por repo", value=False,
+                                 help="Não é usado nas análises; desmarcado economiza a maior parte da memória do DataFrame.")
+    prefer_materialized = st.checkbox("Usar visão materializada (Parquet local), se existir", value=True,
+                                      help="Gerada offline por `python -m analise.materialize`: lê só as partições "
+                                           "da amostra, sem custo de BigQuery.")
+    auto_sample = st.checkbox("Ajustar a amostra ao orçamento restante", value=True,
+                              disabled=not (BUDGET_SESSION_GB or BUDGET_DAILY_GB),
+                              help="Se a amostra escolhida estourar o orçamento de bytes, usa a maior que ainda cabe. "
+                                   "Desmarcado, a execução é bloqueada.")
+
+    st.caption("Escala, correlação, teste e bootstrap ficam em cada seção: mudar um deles reroda só aquela seção.")
     st.divider()
-    if st.button("🔄 Atualizar dados (limpar cache)"):
-        st.cache_data.clear()
-        st.success("Cache limpo. Rode novamente as consultas.")
+    refresh_clicked = st.button("🔄 Atualizar dados (em segundo plano)",
+                                help="Recalcula só os conjuntos de dados exibidos nesta sessão; enquanto isso, "
+                                     "todos continuam vendo a versão atual, trocada quando a nova fica pronta.")
 
 # ===============================
 # INTRO (contexto + ideia do trabalho)
@@ -170,84 +469,117 @@ st.dataframe(tipos_df, use_container_width=True)
 st.caption("Obs.: **Razão** tem zero absoluto e permite interpretações multiplicativas; **log10** estabiliza variância.")
 
 # ===============================
-# SANITY CHECK (BigQuery)
+# SANITY CHECK (backend)
 # ===============================
-st.subheader("Conexão BigQuery")
-if not sanity_check():
+st.subheader("Conexão com o backend")
+backend = sanity_check(backend_choice)
+if backend is None:
     st.stop()
 
 # ===============================
 # QUERIES
 # ===============================
-sql_top_langs = f"""
-SELECT
-  lang.name AS language_name,
-  SUM(lang.bytes) AS total_bytes
-FROM `bigquery-public-data.github_repos.languages`,
-UNNEST(language) AS lang
-GROUP BY language_name
-ORDER BY total_bytes DESC
-LIMIT {top_n}
-"""
-
-sql_per_repo = f"""
-WITH lang_bytes AS (
-  SELECT
-    repo_name,
-    lang.name AS language_name,
-    lang.bytes AS bytes
-  FROM `bigquery-public-data.github_repos.languages`,
-  UNNEST(language) AS lang
-),
-per_repo AS (
-  SELECT
-    repo_name,
-    language_name,
-    bytes,
-    SUM(bytes) OVER (PARTITION BY repo_name) AS total_bytes,
-    COUNT(*) OVER (PARTITION BY repo_name) AS num_languages,
-    ROW_NUMBER() OVER (PARTITION BY repo_name ORDER BY bytes DESC) AS rn
-  FROM lang_bytes
-  WHERE MOD(ABS(FARM_FINGERPRINT(repo_name)), 100) < {sample_pct}
-)
-SELECT
-  repo_name,
-  language_name AS dominant_language,
-  bytes AS dominant_bytes,
-  total_bytes,
-  num_languages
-FROM per_repo
-WHERE rn = 1
-"""
+dialect = get_backend(backend).dialect
+# Top-N: uma consulta com todas as linguagens (mesma chave de cache para qualquer posição do slider), cortada aqui
+top_spec = queries.top_langs(top_n, dialect)
+sql_top_langs = top_spec.sql
+sql_per_repo = queries.sql_per_repo(sample_pct, dialect)
+sql_stats = queries.sql_per_repo_stats(sample_pct, dialect)
+sql_hist = queries.sql_per_repo_hist(sample_pct, dialect)
+
+materialized = MaterializedPerRepo(MATERIALIZED_DIR)
+materialized_version = materialized.version if prefer_materialized and materialized.available(backend) else None
+
+# ===============================
+# ORÇAMENTO (dry-run antes de consultar)
+# ===============================
+def plan_bytes(pct: int) -> int:
+    """Bytes que esta execução processaria com amostra `pct` (consultas já em cache custam 0)."""
+    cached = get_backend(backend)
+    total = 0 if cached.is_cached(sql_top_langs) else max(cached.estimate_bytes(sql_top_langs), 0)
+    if materialized_version is not None and calc_mode != "pushdown":
+        return total
+    if calc_mode == "pushdown":
+        for sql in (queries.sql_per_repo_stats(pct, dialect), queries.sql_per_repo_hist(pct, dialect)):
+            total += 0 if cached.is_cached(sql) else max(cached.estimate_bytes(sql), 0)
+        return total
+    store = BucketedPerRepo(cached.inner, get_disk_cache(), cached.flight)
+    return total + store.estimate_bytes(pct, summaries=calc_mode == "streaming")
+
+governor = get_governor()
+if backend in GOVERNED_BACKENDS and (governor.session_budget or governor.daily_budget):
+    remaining = governor.remaining(backend)
+    planned = plan_bytes(sample_pct)
+    if planned > remaining:
+        fitting = governor.largest_fitting([o for o in SAMPLE_OPTIONS if o < sample_pct], plan_bytes, backend)
+        if auto_sample and fitting is not None:
+            st.warning(f"Amostra de {sample_pct}% custaria {human_bytes(planned)}, acima do orçamento restante "
+                       f"({human_bytes(remaining)}): usando **{fitting}%** ({human_bytes(plan_bytes(fitting))}).")
+            sample_pct = fitting
+            sql_per_repo = queries.sql_per_repo(sample_pct, dialect)
+            sql_stats = queries.sql_per_repo_stats(sample_pct, dialect)
+            sql_hist = queries.sql_per_repo_hist(sample_pct, dialect)
+        else:
+            st.error(f"Execução bloqueada: custaria {human_bytes(planned)} e restam {human_bytes(remaining)} "
+                     "no orçamento." + (f" A maior amostra que cabe é {fitting}%." if fitting else ""))
+            st.stop()
+
+# ===============================
+# VERSÕES DOS DADOS (stale-while-revalidate)
+# ===============================
+st.session_state["datasets"] = {}  # preenchido de novo a cada execução completa (e pelas seções que consultam)
+v_top = dataset_version(f"{backend}:top_langs", refresh_query(sql_top_langs, backend))
+# visão materializada: versionada pelo próprio `materialized_version` (rematerializar troca o resultado)
+v_repo = 0
+if calc_mode == "pushdown" or materialized_version is None:
+    v_repo = dataset_version(f"{backend}:per_repo:{sample_pct}:{calc_mode}",
+                             refresh_per_repo(sample_pct, backend, calc_mode, keep_repo_name))
 
 # ===============================
 # ESTIMATIVA DE CUSTO + EXECUÇÃO
 # ===============================
 st.subheader("Execução das consultas")
+# todos os jobs (dry-runs + consultas) saem juntos; cada seção espera só pelos dados que usa
+script_ctx = get_script_run_ctx()
+jobs = JobRunner(max_workers=6, initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx))
+jobs.submit("estimativa_top", bq_estimate_bytes, sql_top_langs, backend)
+jobs.submit("estimativa_repo", bq_estimate_bytes, sql_per_repo, backend)
+if queries.engine(dialect) != dialect:  # compara com o scan da tabela original
+    jobs.submit("estimativa_repo_hash", bq_estimate_bytes, queries.sql_per_repo(sample_pct, queries.engine(dialect)), backend)
+jobs.submit("top_langs", bq_query, sql_top_langs, backend, v_top)
+if calc_mode == "pushdown":
+    jobs.submit("per_repo_stats", bq_query, sql_stats, backend, v_repo)
+    jobs.submit("per_repo_hist", bq_query, sql_hist, backend, v_repo)
+elif calc_mode == "streaming":
+    jobs.submit("per_repo", bq_stream_per_repo, sample_pct, backend, materialized_version, v_repo)
+else:
+    jobs.submit("per_repo", bq_query_per_repo, sample_pct, backend, keep_repo_name, materialized_version, v_repo)
+
 col_est1, col_est2 = st.columns(2)
 with col_est1:
     try:
-        est_top = bq_estimate_bytes(sql_top_langs)
+        est_top = jobs.result("estimativa_top")
         st.info(f"Estimativa Top Linguagens: {human_bytes(est_top)}")
     except Exception:
         st.info("Estimativa Top Linguagens indisponível (ok).")
 with col_est2:
     try:
-        est_repo = bq_estimate_bytes(sql_per_repo)
+        est_repo = jobs.result("estimativa_repo")
         st.info(f"Estimativa Visão por Repo (amostra {sample_pct}%): {human_bytes(est_repo)}")
+        if queries.engine(dialect) != dialect:
+            est_full = jobs.result("estimativa_repo_hash")
+            st.caption(f"Fonte: cópia particionada por bucket — lê só as partições da amostra. Com o filtro por hash "
+                       f"na tabela original: {human_bytes(est_full)} (economia de {fmt_pct(100 * (1 - est_repo / est_full)) if est_full else '—'}).")
     except Exception:
         st.info("Estimativa por Repo indisponível (ok).")
 
-with st.status("Consultando BigQuery…", expanded=False) as s:
-    df_top, bytes_top = bq_query(sql_top_langs)
-    df_repo, bytes_repo = bq_query(sql_per_repo)
-    s.update(label="Consultas concluídas ✅", state="complete")
-
-colb1, colb2 = st.columns(2)
-with colb1:
-    st.success(f"Top Linguagens — bytes processados: {human_bytes(bytes_top)}")
-with colb2:
-    st.success(f"Visão por Repo — bytes processados: {human_bytes(bytes_repo)} (amostra {sample_pct}%)")
+try:
+    df_langs, bytes_top = jobs.result("top_langs")
+    df_top = top_spec.apply(df_langs)
+except BudgetExceeded as e:
+    st.error(f"Orçamento de bytes esgotado: {e}")
+    st.stop()
+st.success(f"Top Linguagens — bytes processados: {human_bytes(bytes_top)}")
 
 # ===============================
 # EXPLORAÇÃO
@@ -255,341 +587,461 @@ with colb2:
 st.header("Exploração: medidas, distribuições e correlação")
 
 # 2.1 Top linguagens
-st.subheader("Top linguagens por bytes (global)")
-st.dataframe(df_top, use_container_width=True)
-bar = (
-    alt.Chart(df_top)
-    .mark_bar()
-    .encode(
-        x=alt.X("total_bytes:Q", title="Total de bytes"),
-        y=alt.Y("language_name:N", sort="-x", title="Linguagem"),
-        tooltip=["language_name", alt.Tooltip("total_bytes:Q", format=",.0f")],
+@section("Top linguagens")
+def render_top():
+    st.subheader("Top linguagens por bytes (global)")
+    st.dataframe(df_top, use_container_width=True)
+    bar = (
+        alt.Chart(df_top)
+        .mark_bar()
+        .encode(
+            x=alt.X("total_bytes:Q", title="Total de bytes"),
+            y=alt.Y("language_name:N", sort="-x", title="Linguagem"),
+            tooltip=["language_name", alt.Tooltip("total_bytes:Q", format=",.0f")],
+        )
+        .properties(height=26 * len(df_top), width=700)
     )
-    .properties(height=26 * len(df_top), width=700)
-)
-st.altair_chart(bar, use_container_width=True)
-
-# métricas para relatório
-if len(df_top) >= 1:
-    top_total = df_top["total_bytes"].sum()
-    top1_name = df_top.iloc[0]["language_name"]
-    top1_share = (df_top.iloc[0]["total_bytes"] / top_total) * 100 if top_total else np.nan
-    top3_share = (df_top.iloc[:3]["total_bytes"].sum() / top_total) * 100 if len(df_top) >= 3 and top_total else np.nan
-else:
-    top_total = np.nan
-    top1_name = None
-    top1_share = np.nan
-    top3_share = np.nan
+    st.altair_chart(bar, use_container_width=True)
 
-st.markdown(
-    f"**Comentário:** No **Top-{top_n}**, **{top1_name or '—'}** concentra **{fmt_pct(top1_share)}**; as **3 primeiras** somam **{fmt_pct(top3_share)}** — indício de **concentração**."
-)
+    # métricas para relatório
+    top1_name, top1_share, top3_share = analysis.top_shares(df_top)
+    report_ctx_update(top_n=top_n, top1_name=top1_name, top1_share=top1_share, top3_share=top3_share)
 
-# 2.2 Medidas por linguagem dominante
-df_repo = df_repo.copy()
-df_repo["log10_total_bytes"] = np.log10(df_repo["total_bytes"] + 1)
-metric_scale = "log10_total_bytes" if scale == "log10" else "total_bytes"
-
-st.subheader("Medidas descritivas (por linguagem dominante)")
-st.caption(f"Métricas calculadas sobre: **{metric_scale}**")
-desc = (
-    df_repo.groupby("dominant_language")[metric_scale]
-    .agg(["count", "mean", "median", "std"])
-    .reset_index()
-    .sort_values("count", ascending=False)
-    .head(20)
-)
-st.dataframe(desc, use_container_width=True)
-st.markdown(
-    "**Comentário:** usamos **média/mediana** e **desvio-padrão**. Em **log10**, outliers pesam menos e comparações por grupo ficam mais robustas."
-)
+    st.markdown(
+        f"**Comentário:** No **Top-{top_n}**, **{top1_name or '—'}** concentra **{fmt_pct(top1_share)}**; as **3 primeiras** somam **{fmt_pct(top3_share)}** — indício de **concentração**."
+    )
 
-# 2.3 Distribuições
-st.subheader("Distribuição de tamanhos de repositório")
-left, right = st.columns(2)
-with left:
-    st.write("Histograma (geral)")
-    hist = (
-        alt.Chart(df_repo)
-        .mark_bar()
-        .encode(
-            x=alt.X(f"{metric_scale}:Q", bin=alt.Bin(maxbins=50), title=metric_scale),
-            y=alt.Y("count()", title="Contagem"),
-            tooltip=[alt.Tooltip(metric_scale, format=".3f"), alt.Tooltip("count()", format=",")]
-        )
-        .properties(height=300)
+render_top()
+
+# visão por repo: só agora esperamos pelo job mais pesado (o Top-N acima já foi renderizado)
+with st.status(f"Consultando visão por repo ({BACKENDS[backend]})…", expanded=False) as s:
+    df_repo = acc = None
+    try:
+        if calc_mode == "pushdown":
+            agg_stats, bytes_stats = jobs.result("per_repo_stats")
+            agg_hist, bytes_hist = jobs.result("per_repo_hist")
+            bytes_repo = bytes_stats + bytes_hist
+            acc = pushdown.accumulator_from_stats(agg_stats)
+        elif calc_mode == "streaming":
+            acc, bytes_repo, fetch_stats = jobs.result("per_repo")
+        else:
+            df_repo, bytes_repo, fetch_stats = jobs.result("per_repo")
+    except BudgetExceeded as e:
+        s.update(label="Bloqueada pelo orçamento", state="error")
+        st.error(f"Orçamento de bytes esgotado: {e}")
+        st.stop()
+    s.update(label="Consultas concluídas ✅", state="complete")
+
+st.success(f"Visão por Repo — bytes processados: {human_bytes(bytes_repo)} (amostra {sample_pct}%)")
+if calc_mode != "pushdown" and fetch_stats["source"] == "materializado":
+    st.caption(
+        f"Fonte: visão materializada em `{MATERIALIZED_DIR}` (partições `bucket < {sample_pct}`), "
+        f"gerada em {datetime.fromtimestamp(materialized_version).strftime('%Y-%m-%d %H:%M')} — sem consulta ao backend."
     )
-    st.altair_chart(hist, use_container_width=True)
-
-with right:
-    st.write("Boxplot por linguagem dominante (Top-10 por contagem)")
-    top_langs = df_repo["dominant_language"].value_counts().head(10).index.tolist()
-    box = (
-        alt.Chart(df_repo[df_repo["dominant_language"].isin(top_langs)])
-        .mark_boxplot()
-        .encode(
-            y=alt.Y("dominant_language:N", title="Linguagem"),
-            x=alt.X(f"{metric_scale}:Q", title=metric_scale),
-            tooltip=["dominant_language", alt.Tooltip(metric_scale, format=".3f")]
-        )
-        .properties(height=26 * len(top_langs))
+elif calc_mode != "pushdown":
+    st.caption(
+        f"Buckets de hash: {fetch_stats['cached_buckets']} do cache · {fetch_stats['fetched_buckets']} buscados "
+        f"em {fetch_stats['queries']} consulta(s)."
+        + (f" Resumos por bucket reaproveitados: {fetch_stats['summary_hits']}." if "summary_hits" in fetch_stats else "")
+    )
+if calc_mode == "pushdown":
+    agg_kb = (agg_stats.memory_usage(deep=True).sum() + agg_hist.memory_usage(deep=True).sum()) / 1024
+    st.caption(f"Modo agregado: {len(agg_stats)} + {len(agg_hist)} linhas de estatísticas (~{agg_kb:,.1f} KB) no lugar da visão por repo.")
+elif calc_mode == "streaming":
+    st.caption(f"Modo streaming: {acc.corr.n:,} repos acumulados bucket a bucket em {fetch_stats['fetch_s']:.2f}s (sem DataFrame por repo).")
+else:
+    st.caption(
+        f"Visão por repo: {fetch_stats['rows']:,} linhas · fetch Arrow {fetch_stats['fetch_s']:.2f}s "
+        f"+ conversão {fetch_stats['convert_s']:.2f}s · memória **{human_bytes(fetch_stats['pandas_compact_bytes'])}** "
+        f"(dtypes compactos) vs ~{human_bytes(fetch_stats['pandas_default_bytes'])} no `to_dataframe()` padrão "
+        f"(−{fmt_pct(100 * fetch_stats['reduction'])})."
     )
-    st.altair_chart(box, use_container_width=True)
+with st.expander("⏱️ Latência por job (submissão concorrente)"):
+    job_times = jobs.timings()
+    st.dataframe(job_times, use_container_width=True)
+    st.caption("Em série, o tempo total seria ~a soma de `exec_s`; em paralelo, é o wall time do lote.")
+    flight = get_single_flight().stats()
+    if flight:
+        st.dataframe(pd.DataFrame(flight).T.rename_axis("operação"), use_container_width=True)
+        st.caption("Single-flight (todas as sessões deste worker): **hit** = cache em disco, **miss** = foi ao backend, "
+                   "**coalesced** = esperou a mesma consulta já em andamento (nesta ou em outra sessão/worker).")
+with st.expander("💰 Custo acumulado (ledger)"):
+    spent = governor.spent(backend)
+    budgets = {"session": governor.session_budget, "day": governor.daily_budget}
+    c1, c2 = st.columns(2)
+    for col, (scope, label) in zip((c1, c2), (("session", "Sessão"), ("day", "Hoje"))):
+        tot = spent[scope]
+        limit = f" de {human_bytes(budgets[scope])}" if budgets[scope] and backend in GOVERNED_BACKENDS else ""
+        col.metric(f"{label}: bytes processados", f"{human_bytes(tot['processed'])}{limit}", f"{tot['queries']} consulta(s)",
+                   delta_color="off")
+        col.caption(f"Hits de cache: {tot['hits']} · economia estimada {human_bytes(tot['saved'])}.")
+    st.caption(f"Ledger: `{LEDGER_PATH}` (compartilhado entre sessões e processos). "
+               + ("Orçamento ativo neste backend." if backend in GOVERNED_BACKENDS else "Backend sem orçamento."))
 
-st.markdown(
-    "**Comentário:** histograma com **assimetria à direita** (muitos repos pequenos, poucos gigantes). No boxplot, observe **dispersão intra-grupo** e **outliers**."
-)
+# 2.2 Medidas por linguagem dominante
+if df_repo is not None:
+    df_repo = pipeline.transform(df_repo)  # memoizado: num rerun com os mesmos dados não copia de novo
+
+# 2.2–2.3 compartilham o controle de escala → uma seção só
+@section("Medidas e distribuições")
+def render_measures():
+    st.subheader("Medidas descritivas (por linguagem dominante)")
+    c_scale, c_boot = st.columns(2)
+    scale = c_scale.radio("Escala para tamanhos de repositório", ["log10", "linear"], index=0, horizontal=True)
+    calc_boot_medians = c_boot.checkbox("IC 95% bootstrap das medianas", value=False, disabled=calc_mode != "linhas",
+                                        help="Não paramétrico (robusto à cauda pesada). Só no modo linhas; seed fixa.")
+    metric_scale = "log10_total_bytes" if scale == "log10" else "total_bytes"
+    st.caption(f"Métricas calculadas sobre: **{metric_scale}**")
+    if calc_mode == "pushdown":
+        desc = pushdown.describe_from_stats(agg_stats, metric_scale).head(20)
+        if queries.engine(dialect) == "bigquery":
+            st.caption("Modo agregado: mediana via `APPROX_QUANTILES` (aproximada).")
+    elif calc_mode == "streaming":
+        desc = acc.describe(metric_scale).head(20)
+        st.caption(f"Modo streaming: mediana via t-digest (δ={sketches.DEFAULT_DELTA:.0f}; erro de posto na mediana "
+                   f"≲ {fmt_pct(100 * math.pi * 0.5 / sketches.DEFAULT_DELTA)}).")
+    else:
+        desc = pipeline.descriptives(df_repo, metric_scale, top=20)
+        if calc_boot_medians:
+            desc = desc.copy()  # o resultado memoizado é compartilhado entre reruns
+            with st.spinner("Bootstrap das medianas..."):
+                ci = boot_medians(sample_pct, backend, keep_repo_name, materialized_version, metric_scale,
+                                  tuple(desc["dominant_language"].astype(str)), n_resamples, v_repo)
+            ci = ci.set_index("dominant_language")
+            for col in ("median_ci_low", "median_ci_high"):
+                desc[col] = desc["dominant_language"].astype(str).map(ci[col]).to_numpy()
+            st.caption(f"median_ci_low/high: IC 95% percentil da mediana ({n_resamples:,} reamostragens bootstrap, seed fixa).")
+    st.dataframe(desc, use_container_width=True)
+    st.markdown(
+        "**Comentário:** usamos **média/mediana** e **desvio-padrão**. Em **log10**, outliers pesam menos e comparações por grupo ficam mais robustas."
+    )
+
+    # 2.3 Distribuições
+    st.subheader("Distribuição de tamanhos de repositório")
+    left, right = st.columns(2)
+    with left:
+        st.write("Histograma (geral)")
+        if calc_mode == "pushdown":
+            hist = hist_chart(pushdown.hist_bins(agg_hist, metric_scale), metric_scale)
+        elif calc_mode == "streaming":
+            hist = None
+            st.caption("Modo streaming: histograma não disponível.")
+        else:
+            hist = hist_chart(pipeline.histogram(df_repo, metric_scale, maxbins=50), metric_scale)
+        if hist is not None:
+            st.altair_chart(hist, use_container_width=True)
+
+    with right:
+        st.write("Boxplot por linguagem dominante (Top-10 por contagem)")
+        if calc_mode == "pushdown":
+            box = box_chart(pushdown.quartiles_from_stats(agg_stats, metric_scale, top=10), metric_scale)
+            st.caption("Modo agregado: bigodes = mín–máx.")
+        elif calc_mode == "streaming":
+            box = box_chart(acc.box_quartiles(metric_scale, top=10), metric_scale, lower="whisker_lo", upper="whisker_hi")
+            st.caption("Modo streaming: quartis via t-digest; bigodes = cercas de Tukey limitadas ao mín/máx.")
+        else:
+            box = box_chart(pipeline.boxplot(df_repo, metric_scale, top=10), metric_scale,
+                            lower="whisker_lo", upper="whisker_hi")
+            st.caption("Bigodes = 1,5×IQR (Tukey); quartis calculados no servidor.")
+        if box is not None:
+            st.altair_chart(box, use_container_width=True)
+
+    st.markdown(
+        "**Comentário:** histograma com **assimetria à direita** (muitos repos pequenos, poucos gigantes). No boxplot, observe **dispersão intra-grupo** e **outliers**."
+    )
+
+render_measures()
 
 # 2.4 Correlação
-st.subheader("Correlação entre número de linguagens e tamanho")
-corr_success = False
-r = p = r_low = r_high = np.nan
-mag = "—"
-if calc_correlation:
-    from scipy import stats
-    corr_df = df_repo[["num_languages", "log10_total_bytes"]].dropna()
-    n = len(corr_df)
-    if n >= 4:
-        r, p = stats.pearsonr(corr_df["num_languages"], corr_df["log10_total_bytes"])
-        z = np.arctanh(r); se = 1 / math.sqrt(n - 3)
-        zcrit = stats.norm.ppf(0.975)
-        r_low, r_high = np.tanh([z - zcrit*se, z + zcrit*se])
-        abs_r = abs(r)
-        if abs_r < 0.1: mag = "muito fraca"
-        elif abs_r < 0.3: mag = "fraca"
-        elif abs_r < 0.5: mag = "moderada"
-        else: mag = "forte"
-        corr_success = True
-
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Correlação (r)", fmt_num(r))
-        c2.metric("p-valor", fmt_num(p, "{:.3g}"))
-        c3.metric("IC 95% de r", f"[{fmt_num(r_low)}, {fmt_num(r_high)}]")
-
-        s = corr_df.sample(min(10000, n), random_state=42)
-        scatter = (
-            alt.Chart(s)
-            .mark_point(opacity=0.25)
-            .encode(
-                x=alt.X("num_languages:Q", title="Número de linguagens"),
-                y=alt.Y("log10_total_bytes:Q", title="log10(total_bytes+1)"),
-                tooltip=[alt.Tooltip("num_languages:Q"), alt.Tooltip("log10_total_bytes:Q", format=".3f")]
-            )
-            .properties(height=350)
-        )
-        st.altair_chart(scatter, use_container_width=True)
+@section("Correlação")
+def render_correlation():
+    st.subheader("Correlação entre número de linguagens e tamanho")
+    calc_correlation = st.checkbox("Calcular correlação (r, p, IC)", value=True)
+    corr_success = False
+    r = p = r_low = r_high = np.nan
+    mag = "—"
+    if calc_correlation:
+        if acc is not None:
+            r, p, r_low, r_high, n = acc.correlation()
+        else:
+            r, p, r_low, r_high, n = pipeline.correlation(df_repo)
+        if n >= 4:
+            mag = correlation_magnitude(r)
+            corr_success = True
+
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Correlação (r)", fmt_num(r))
+            c2.metric("p-valor", fmt_num(p, "{:.3g}"))
+            c3.metric("IC 95% de r", f"[{fmt_num(r_low)}, {fmt_num(r_high)}]")
+
+            if df_repo is not None:
+                # densidade 2D agregada no servidor: todos os repos entram, payload fixo (células não vazias)
+                scatter = density2d_chart(pipeline.scatter(df_repo), "Número de linguagens", "log10(total_bytes+1)")
+                st.altair_chart(scatter, use_container_width=True)
+            else:
+                st.caption("Modo agregado/streaming: r calculado a partir de n, variâncias e covariância (sem scatter).")
+        else:
+            st.info("Amostra insuficiente para correlação (n < 4).")
     else:
-        st.info("Amostra insuficiente para correlação (n < 4).")
-else:
-    st.info("Marque a opção na barra lateral para calcular correlação.")
+        st.info("Marque a opção acima para calcular correlação.")
 
-if corr_success:
+    if corr_success:
+        st.markdown(
+            f"**Comentário:** r = **{fmt_num(r)}** ({mag}), IC95% **[{fmt_num(r_low)}; {fmt_num(r_high)}]**, p **{fmt_num(p, '{:.3g}')}**. "
+            "Em média, repos com **mais linguagens** tendem a ser **maiores** (em log10). *Correlação ≠ causalidade*."
+        )
+    report_ctx_update(calc_corr=calc_correlation, corr_success=corr_success,
+                      r=r, p=p, r_low=r_low, r_high=r_high, mag=mag)
+
+render_correlation()
+
+# 2.5 Coocorrência
+@section("Coocorrência de linguagens")
+def render_cooccurrence():
+    st.subheader("Coocorrência de linguagens (quais aparecem juntas)")
+    calc_cooc = st.checkbox("Calcular coocorrência (matriz esparsa repo × linguagem)", value=False,
+                            help="Consulta própria (lista de linguagens por repo, sem UNNEST); o resultado por bucket "
+                                 "fica no cache em disco, então aumentar a amostra só busca os buckets novos.")
+    if not calc_cooc:
+        store = BucketedCoOccurrence(get_backend(backend).inner, get_disk_cache(), get_single_flight())
+        missing = store.missing(sample_pct)
+        # dry-runs memoizados por intervalo: reabrir a seção não repete a estimativa
+        estimate = sum(bq_estimate_bytes(queries.sql_repo_languages_buckets(lo, hi, dialect), backend)
+                       for lo, hi in contiguous_ranges(missing))
+        st.info("Marque a opção acima para calcular a coocorrência. "
+                + (f"Custo estimado: {human_bytes(estimate)} ({len(missing)} bucket(s) fora do cache)."
+                   if missing else "Todos os buckets da amostra já estão em cache (custo 0)."))
+        return
+    try:
+        v_cooc = dataset_version(f"{backend}:cooccurrence:{sample_pct}", refresh_cooccurrence(sample_pct, backend))
+        co, bytes_cooc, info = bq_cooccurrence(sample_pct, backend, v_cooc)
+    except BudgetExceeded as e:
+        st.error(f"Orçamento de bytes esgotado: {e}")
+        return
+
+    c_order, c_min, c_top = st.columns(3)
+    order = c_order.selectbox("Ordenar pares por", ["lift", "pmi", "repos", "weight"],
+                              format_func={"lift": "lift", "pmi": "PMI", "repos": "nº de repos",
+                                           "weight": "peso por bytes"}.get)
+    min_repos = c_min.number_input("Mínimo de repos por par", min_value=1, value=max(co.n_repos // 1000, 5), step=5,
+                                   help="Pares raros têm lift alto por acaso; o suporte mínimo filtra o ruído.")
+    k = c_top.slider("Linguagens no heatmap (mais frequentes)", 5, 30, 15)
+
+    pairs = co.pairs(int(min_repos))
+    st.dataframe(pairs.sort_values(order, ascending=False).head(20), use_container_width=True, hide_index=True)
+    value = "pmi" if order == "lift" else order
+    st.altair_chart(cooccurrence_chart(co.heatmap_cells(k, int(min_repos)), value,
+                                       {"pmi": "PMI", "repos": "Repos", "weight": "Peso (bytes)"}[value]),
+                    use_container_width=True)
+    st.caption(f"{co.n_repos:,} repos · {len(co.languages)} linguagens · {co.counts.nnz:,} células não nulas em C "
+               f"(sem matriz densa) · buckets: {info['cached_buckets']} do cache, {info['fetched_buckets']} buscados "
+               f"({human_bytes(bytes_cooc)}) em {info['fetch_s']:.2f}s.")
     st.markdown(
-        f"**Comentário:** r = **{fmt_num(r)}** ({mag}), IC95% **[{fmt_num(r_low)}; {fmt_num(r_high)}]**, p **{fmt_num(p, '{:.3g}')}**. "
-        "Em média, repos com **mais linguagens** tendem a ser **maiores** (em log10). *Correlação ≠ causalidade*."
+        "**Leitura:** lift = P(a, b) / (P(a)·P(b)) — acima de 1, as linguagens aparecem juntas mais do que o acaso "
+        "(PMI = log2 do lift). O **peso por bytes** soma, por repo, fração_a × fração_b: privilegia pares que dividem "
+        "o código de fato, não um arquivo de build perdido num repo grande."
     )
 
+render_cooccurrence()
+
 # ===============================
 # INFERÊNCIA (Welch)
 # ===============================
 st.header("Inferência: IC 95% e Teste de hipótese (Welch)")
-def welch_t_ci(a: np.ndarray, b: np.ndarray, alpha=0.05):
-    from scipy import stats
-    a = np.asarray(a, dtype=float); b = np.asarray(b, dtype=float)
-    ma, mb = a.mean(), b.mean()
-    va, vb = a.var(ddof=1), b.var(ddof=1)
-    na, nb = len(a), len(b)
-    diff = ma - mb
-    se = math.sqrt(max(va/na + vb/nb, 0))
-    if na <= 1 or nb <= 1 or se == 0:
-        return diff, np.nan, np.nan, np.nan, np.nan, np.nan
-    df = (va/na + vb/nb)**2 / ((va**2)/((na**2)*(na-1)) + (vb**2)/((nb**2)*(nb-1)))
-    t = diff / se
-    p_two = 2 * (1 - stats.t.cdf(abs(t), df))
-    tcrit = stats.t.ppf(1 - alpha/2, df)
-    ci_low, ci_high = diff - tcrit * se, diff + tcrit * se
-    return diff, t, p_two, df, ci_low, ci_high
-
-st.subheader("Hipótese: multilíngues são maiores que monolíngues")
-st.caption("Métrica: **log10(total_bytes+1)** | Teste: **Welch (variâncias possivelmente diferentes)**")
-
-test_success = False
-diff = tval = p_two = dfw = lci = uci = np.nan
-p_one = fator = fator_l = fator_u = np.nan
-
-if calc_test:
-    mono = df_repo.loc[df_repo["num_languages"] == 1, "log10_total_bytes"].dropna().to_numpy()
-    multi = df_repo.loc[df_repo["num_languages"] >= 2, "log10_total_bytes"].dropna().to_numpy()
-    if len(mono) > 5 and len(multi) > 5:
-        diff, tval, p_two, dfw, lci, uci = welch_t_ci(multi, mono, alpha=0.05)
-        p_one = (p_two / 2) if diff > 0 else 1 - (p_two / 2)
-        fator   = 10 ** diff if not math.isnan(diff) else np.nan
-        fator_l = 10 ** lci  if not math.isnan(lci)  else np.nan
-        fator_u = 10 ** uci  if not math.isnan(uci)  else np.nan
-        test_success = True
-
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Δ média (log10)", fmt_num(diff))
-        c2.metric("t (Welch)", fmt_num(tval, "{:.2f}"))
-        c3.metric("p (one-sided)", fmt_num(p_one, "{:.3g}"))
-        c4.metric("IC 95% (Δ)", f"[{fmt_num(lci)}, {fmt_num(uci)}]")
-
-        df_mm = pd.DataFrame({
-            "grupo": (["Monolíngue"] * len(mono)) + (["Multilíngue"] * len(multi)),
-            "valor": np.concatenate([mono, multi])
-        })
-        vplot = (
-            alt.Chart(df_mm)
-            .transform_density("valor", as_=["valor", "density"], groupby=["grupo"])
-            .mark_area(opacity=0.4)
-            .encode(
-                x=alt.X("valor:Q", title="log10(total_bytes+1)"),
-                y=alt.Y("density:Q", title="Densidade"),
-                color="grupo:N"
-            )
-            .properties(height=300)
-        )
-        st.altair_chart(vplot, use_container_width=True)
+
+@section("Inferência")
+def render_inference():
+
+    st.subheader("Hipótese: multilíngues são maiores que monolíngues")
+    st.caption("Métrica: **log10(total_bytes+1)** | Teste: **Welch (variâncias possivelmente diferentes)**")
+    c_test, c_kde, c_boot = st.columns(3)
+    calc_test = c_test.checkbox("Teste de hipótese (Welch: multilíngues > monolíngues)", value=True)
+    kde_rule = c_kde.selectbox("Largura de banda da densidade (KDE)", list(density.BANDWIDTH_RULES),
+                               format_func=str.capitalize,
+                               help="Silverman usa min(desvio, IQR/1,349) — mais robusta a caudas pesadas; Scott usa só o desvio.")
+    calc_resampling = c_boot.checkbox("IC por bootstrap e p por permutação", value=False, disabled=calc_mode != "linhas",
+                                      help="Não paramétricos (robustos à cauda pesada). Só no modo linhas; seed fixa.")
+
+    test_success = False
+    diff = tval = p_two = dfw = lci = uci = np.nan
+    p_one = fator = fator_l = fator_u = np.nan
+    boot_lci = boot_uci = p_perm = np.nan
+
+    if calc_test:
+        if acc is not None:
+            n_mono, n_multi = acc.mono.n, acc.multi.n
+        else:
+            n_mono, n_multi, welch_result = pipeline.welch(df_repo, alpha=0.05)
+        if n_mono > 5 and n_multi > 5:
+            if acc is not None:
+                diff, tval, p_two, dfw, lci, uci = acc.welch(alpha=0.05)
+            else:
+                diff, tval, p_two, dfw, lci, uci = welch_result
+            p_one = (p_two / 2) if diff > 0 else 1 - (p_two / 2)
+            fator   = 10 ** diff if not math.isnan(diff) else np.nan
+            fator_l = 10 ** lci  if not math.isnan(lci)  else np.nan
+            fator_u = 10 ** uci  if not math.isnan(uci)  else np.nan
+            test_success = True
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Δ média (log10)", fmt_num(diff))
+            c2.metric("t (Welch)", fmt_num(tval, "{:.2f}"))
+            c3.metric("p (one-sided)", fmt_num(p_one, "{:.3g}"))
+            c4.metric("IC 95% (Δ)", f"[{fmt_num(lci)}, {fmt_num(uci)}]")
+
+            if calc_resampling and acc is None:
+                with st.spinner(f"Bootstrap e permutação ({n_resamples:,} reamostragens)..."):
+                    boot = boot_welch(sample_pct, backend, keep_repo_name, materialized_version, n_resamples, v_repo)
+                boot_lci, boot_uci, p_perm = boot["lci"], boot["uci"], boot["p_perm"]
+                b1, b2, _, _ = st.columns(4)
+                b1.metric("IC 95% bootstrap (Δ)", f"[{fmt_num(boot_lci)}, {fmt_num(boot_uci)}]")
+                b2.metric("p (permutação, one-sided)", fmt_num(p_perm, "{:.3g}"))
+                floor_note = " p = 1/(R+1): nenhuma permutação superou o t observado." if p_perm <= 1 / (n_resamples + 1) else ""
+                st.caption(f"{n_resamples:,} reamostragens (seed fixa) em {boot['elapsed_s']:.1f}s · "
+                           f"{RESAMPLING_WORKERS} processo(s).{floor_note}")
+            elif calc_resampling:
+                st.caption("Bootstrap/permutação exigem linhas: disponíveis só no modo linhas.")
+
+            if acc is not None:
+                st.caption("Modo agregado/streaming: teste calculado a partir de n, média e variância de cada grupo (sem gráfico de densidade).")
+            else:
+                curves = kde_mono_multi(sample_pct, backend, keep_repo_name, materialized_version, kde_rule, v_repo)
+                st.altair_chart(density_chart(curves, "log10(total_bytes+1)"), use_container_width=True)
+                bws = curves.groupby("grupo")["bw"].first()
+                st.caption("Densidade: KDE gaussiano binado (FFT) em grade de "
+                           f"{density.DEFAULT_GRID} pontos · h = " + ", ".join(f"{g} {fmt_num(h)}" for g, h in bws.items()) + ".")
+        else:
+            st.warning("Amostra insuficiente para o teste (precisa de >5 observações por grupo).")
     else:
-        st.warning("Amostra insuficiente para o teste (precisa de >5 observações por grupo).")
-else:
-    st.info("Marque a opção na barra lateral para executar o teste de hipótese.")
+        st.info("Marque a opção acima para executar o teste de hipótese.")
+
+    if test_success:
+        st.markdown(
+            f"**Leitura executiva:** a média log10 dos **multilíngues** excede a dos **monolíngues** em **{fmt_num(diff)}** "
+            f"(t={fmt_num(tval, '{:.2f}')}, df≈{fmt_num(dfw, '{:.0f}')}, p(one-sided)={fmt_num(p_one, '{:.3g}')}). "
+            f"Isto equivale a um fator multiplicativo de **×{fmt_num(fator, '{:.2f}')}** na escala original "
+            f"(IC95% do fator: **×{fmt_num(fator_l, '{:.2f}')}** a **×{fmt_num(fator_u, '{:.2f}')}**). "
+            "Em termos simples: repositórios com 2+ linguagens tendem a ser **maiores**."
+        )
+        st.markdown("_Nota:_ o **Welch** evita assumir variâncias iguais; trabalhar em **log10** dá leitura em **razões de tamanho**.")
+    report_ctx_update(calc_test=calc_test, test_success=test_success,
+                      diff=diff, tval=tval, dfw=dfw, lci=lci, uci=uci, p_one=p_one,
+                      fator=fator, fator_l=fator_l, fator_u=fator_u,
+                      boot_lci=boot_lci, boot_uci=boot_uci, p_perm=p_perm)
 
-if test_success:
-    st.markdown(
-        f"**Leitura executiva:** a média log10 dos **multilíngues** excede a dos **monolíngues** em **{fmt_num(diff)}** "
-        f"(t={fmt_num(tval, '{:.2f}')}, df≈{fmt_num(dfw, '{:.0f}')}, p(one-sided)={fmt_num(p_one, '{:.3g}')}). "
-        f"Isto equivale a um fator multiplicativo de **×{fmt_num(fator, '{:.2f}')}** na escala original "
-        f"(IC95% do fator: **×{fmt_num(fator_l, '{:.2f}')}** a **×{fmt_num(fator_u, '{:.2f}')}**). "
-        "Em termos simples: repositórios com 2+ linguagens tendem a ser **maiores**."
-    )
-    st.markdown("_Nota:_ o **Welch** evita assumir variâncias iguais; trabalhar em **log10** dá leitura em **razões de tamanho**.")
+render_inference()
+
+# ===============================
+# SÉRIES TEMPORAIS (eventos)
+# ===============================
+st.header("Séries temporais: atividade por linguagem (eventos)")
+
+@section("Séries temporais")
+def render_timeseries():
+    daily_path = EventStore(EVENTS_DIR).daily_path
+    if not os.path.exists(daily_path):
+        st.info(f"Nenhum agregado em `{EVENTS_DIR}`. Gere com `python -m analise.events generate` "
+                "e `python -m analise.events ingest` (arquivos no formato do GitHub Archive).")
+        return
+    daily, state = load_event_daily(EVENTS_DIR, os.path.getmtime(daily_path))
+    c_metric, c_window, c_k = st.columns(3)
+    metric = c_metric.selectbox("Métrica", DAILY_METRICS, format_func=lambda m: m.replace("_", " "))
+    rolling = c_window.radio("Janela", ["diária", f"móvel {ROLLING_DAYS} dias"], horizontal=True) != "diária"
+    k = c_k.slider("Linguagens (maior volume no período)", 3, 15, 8)
+    column = f"{metric}_{ROLLING_DAYS}d" if rolling else metric
+    top_langs = daily.groupby("language")[metric].sum().nlargest(k).index
+    st.altair_chart(timeseries_chart(daily[daily["language"].isin(top_langs)], column,
+                                     f"{metric} ({'soma móvel ' + str(ROLLING_DAYS) + 'd' if rolling else 'por dia'})"),
+                    use_container_width=True)
+    st.caption(f"Agregados diários de {state.get('files', 0):,} arquivo(s) / {state.get('events', 0):,} eventos · "
+               f"watermark {state.get('watermark') or '—'} ({state.get('late', 0):,} atrasado(s)) · {len(daily):,} linhas (dia × linguagem) lidas de "
+               f"`{daily_path}`. Linguagem = dominante do repo na visão por repo.")
+
+render_timeseries()
 
 # ===============================
 # RELATÓRIO TEXTUAL (Markdown caprichado)
 # ===============================
 st.header("Relatório textual")
-
-def build_report_md(ctx: dict, *, calc_corr: bool, calc_test: bool) -> str:
-    # Top linguagens (sempre aparece)
-    top_lang_txt = (
-        f"- **Linguagem líder:** **{ctx.get('top1_name') or '—'}** · **Participação:** {fmt_pct(ctx.get('top1_share'))}\n"
-        f"- **Top 3 linguagens (soma):** {fmt_pct(ctx.get('top3_share'))}"
+report_status = st.empty()
+
+@section("Relatório")
+def render_report():
+    # o contexto é montado pelas seções acima (cada uma publica sua parte ao rerodar)
+    st.button("🔄 Regerar com os resultados atuais das seções",
+              help="Depois de mudar um controle de outra seção, reroda só o relatório com o contexto novo.")
+    report_md = report_markdown(dict(st.session_state.get("report_ctx", {})))
+    st.session_state["report_md"] = report_md  # o que está na tela e nos downloads
+    report_status.empty()
+
+    with st.expander("📄 Visualizar relatório (Markdown)", expanded=True):
+        st.markdown(report_md)
+        st.caption("Copiar texto puro / colar no Docs:")
+        st.code(report_md, language="markdown")
+
+    # Downloads (MD e TXT)
+    st.download_button(
+        "⬇️ Baixar relatório (.md)",
+        data=report_md.encode("utf-8"),
+        file_name="relatorio_github_bigquery.md",
+        mime="text/markdown",
+    )
+    st.download_button(
+        "⬇️ Baixar relatório (.txt)",
+        data=report_md.replace("#", "").encode("utf-8"),
+        file_name="relatorio_github_bigquery.txt",
+        mime="text/plain",
     )
 
-    # Correlação
-    if calc_corr and ctx.get("corr_success"):
-        corr_txt = (
-            f"- **Correlação (r):** {fmt_num(ctx.get('r'))} ({ctx.get('mag', '—')})\n"
-            f"- **IC 95% de r:** [{fmt_num(ctx.get('r_low'))}; {fmt_num(ctx.get('r_high'))}]\n"
-            f"- **p-valor:** {fmt_num(ctx.get('p'), '{:.3g}')}\n"
-            f"- **Leitura:** mais linguagens → tendência a repositórios maiores (em log10)."
-        )
-    else:
-        corr_txt = "- **Correlação:** não calculada neste run (opção desmarcada ou amostra insuficiente)."
-
-    # Teste de hipótese
-    if calc_test and ctx.get("test_success"):
-        test_txt = (
-            f"- **Δ média (log10):** {fmt_num(ctx.get('diff'))}  |  **t:** {fmt_num(ctx.get('tval'), '{:.2f}')}  |  **df≈** {fmt_num(ctx.get('dfw'), '{:.0f}')}\n"
-            f"- **IC 95% (Δ):** [{fmt_num(ctx.get('lci'))}; {fmt_num(ctx.get('uci'))}]  |  **p (one-sided):** {fmt_num(ctx.get('p_one'), '{:.3g}')}\n"
-            f"- **Fator multiplicativo (bytes):** ×{fmt_num(ctx.get('fator'), '{:.2f}')} "
-            f"(IC95% ×{fmt_num(ctx.get('fator_l'), '{:.2f}')}–×{fmt_num(ctx.get('fator_u'), '{:.2f}')} )\n"
-            f"- **Conclusão:** repositórios **multilíngues** tendem a ser **maiores** que **monolíngues**."
-        )
-    else:
-        test_txt = "- **Teste (Welch):** não executado neste run (opção desmarcada ou amostra insuficiente)."
-
-    md_sections = [
-f"""## 1) Contexto e ideia
-
-Projeto no estilo entrevista de **engenharia de dados / back-end**: dados públicos em larga escala → **evidências quantitativas**
-e **insights acionáveis** com custo controlado. Foco em **raciocínio de produção**: modelagem por repositório,
-queries transparentes, amostragem estável e inferência com IC/teste.""",
-
-"""## 2) Base de dados
-
-- **Fonte:** `bigquery-public-data.github_repos.languages`
-- **Unidade após UNNEST:** (repositório, linguagem, bytes)
-- **Visão por repositório:** linguagem dominante · total de bytes · número de linguagens""",
-
-f"""## 3) Perguntas
-
-- Quais linguagens acumulam mais **volume de código** (Top-{ctx.get('top_n')})?
-- Repositórios **multilíngues** (≥2 linguagens) tendem a ser **maiores** do que monolíngues?
-- Qual a **relação** entre **nº de linguagens** e **tamanho** do repositório?""",
-
-f"""## 4) Resultados descritivos
-
-**Top-{ctx.get('top_n')} por volume**
-{top_lang_txt}
-
-**Distribuições e medidas**
-- `total_bytes` tem **assimetria à direita** (cauda pesada); análise em **log10** melhora a robustez.
-- Medianas/boxplots por **linguagem dominante** mostram diferenças com variabilidade intra-grupo.""",
-
-f"""## 5) Correlação (nº linguagens × tamanho em log10)
-
-{corr_txt}""",
-
-f"""## 6) Teste de hipótese (Welch — multilíngues > monolíngues)
-
-{test_txt}""",
-
-"""## 7) Conclusões
-
-- **Concentração:** poucas linguagens carregam a maior parte do volume de código.
-- **Cauda pesada:** trabalhar em **log10** é apropriado.
-- **Relação positiva:** mais linguagens costuma vir com repositórios **maiores** (efeito fraco–moderado).
-- **Inferência:** evidência de **multilíngues > monolíngues** em média (com leitura em **razões de tamanho**).""",
-
-"""## 8) Limitações e próximos passos
-
-- **Bytes ≠ qualidade/popularidade**; possíveis vieses (monorepos, mirrors).
-- **Sem causalidade:** análise é descritiva/inferencial, não causal.
-- **Extensões:** segmentar por ecossistema, adicionar séries temporais (GitHub Archive), expor métricas via API."""
-    ]
-
-    return "\n\n".join(md_sections).strip()
-
-# montar o contexto com TUDO que o relatório precisa
-ctx = {
-    "top_n": top_n,
-    "top1_name": top1_name,
-    "top1_share": top1_share,
-    "top3_share": top3_share,
-    "corr_success": corr_success,
-    "r": r, "p": p, "r_low": r_low, "r_high": r_high, "mag": mag,
-    "test_success": test_success,
-    "diff": diff, "tval": tval, "dfw": dfw, "lci": lci, "uci": uci, "p_one": p_one,
-    "fator": fator, "fator_l": fator_l, "fator_u": fator_u,
-}
-
-report_md = build_report_md(ctx, calc_corr=calc_correlation, calc_test=calc_test)
-
-with st.expander("📄 Visualizar relatório (Markdown)", expanded=True):
-    st.markdown(report_md)
-    st.caption("Copiar texto puro / colar no Docs:")
-    st.code(report_md, language="markdown")
+render_report()
 
-# Downloads (MD e TXT)
-st.download_button(
-    "⬇️ Baixar relatório (.md)",
-    data=report_md.encode("utf-8"),
-    file_name="relatorio_github_bigquery.md",
-    mime="text/markdown",
-)
-st.download_button(
-    "⬇️ Baixar relatório (.txt)",
-    data=report_md.replace("#", "").encode("utf-8"),
-    file_name="relatorio_github_bigquery.txt",
-    mime="text/plain",
-)
+# ===============================
+# IDADE DOS DADOS / ATUALIZAÇÃO EM SEGUNDO PLANO
+# ===============================
+def render_data_age(names: list[str]) -> None:
+    """Versão e idade de cada conjunto exibido; com recálculo em andamento, confere a cada 2 s e reroda ao terminar."""
+    versions = get_versions()
+    refreshing = any(versions.get(name)["refreshing_since"] is not None for name in names)
+
+    def panel():
+        now, rows, pending = time.time(), [], False
+        for name in names:
+            e = versions.get(name)
+            pending |= e["refreshing_since"] is not None
+            rows.append({"dados": name.split(":", 1)[1], "versão": e["version"],
+                         "idade": human_age(now - e["updated_at"]) if e["updated_at"] else "?",
+                         "estado": "🔄 recalculando" if e["refreshing_since"] else
+                                   (f"⚠️ {e['error']}" if e["error"] else "✅")})
+        if refreshing and not pending:
+            st.rerun()  # versão nova publicada (ou falha registrada): a página toda passa a usá-la
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        if pending:
+            st.caption("Recalculando em segundo plano — a versão atual continua valendo até a troca.")
+
+    st.fragment(panel, run_every=2 if refreshing else None)()
+
+datasets = st.session_state.get("datasets", {})
+if refresh_clicked:
+    started = [name for name, refresh in datasets.items() if get_revalidator().submit(name, refresh)]
+    st.toast(f"Recalculando {len(started)} conjunto(s) de dados em segundo plano." if started
+             else "Os dados desta página já estão sendo recalculados.")
+with st.sidebar:
+    st.caption("Idade dos dados exibidos")
+    render_data_age(list(datasets))
 
 # ===============================
 # RODAPÉ
 # ===============================
+jobs.shutdown()
+if pipeline.MEMO.runs:
+    redone = [name for name, how in pipeline.MEMO.runs.items() if how == "miss"]
+    reused = [name for name, how in pipeline.MEMO.runs.items() if how == "hit"]
+    st.caption(f"Etapas recalculadas neste rerun: {', '.join(redone) or 'nenhuma'} · "
+               f"reaproveitadas (mesmo fingerprint dos dados): {', '.join(reused) or 'nenhuma'} · "
+               f"memo: {human_bytes(pipeline.MEMO.nbytes)} de {human_bytes(pipeline.MEMO.max_bytes)}.")
+st.caption(f"Execução completa do script: {(time.perf_counter() - script_t0) * 1000:,.0f} ms "
+           "(mudar um controle de seção reroda só a seção — veja o ⏱️ ao fim de cada uma).")
 st.caption(
     f"Última execução: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • "
-    f"Amostra: {sample_pct}% • Top-N: {top_n} • Escala: {scale} • Região BQ: {BQ_LOCATION}"
+    f"Amostra: {sample_pct}% • Top-N: {top_n} • Backend: {BACKENDS[backend]} • Região BQ: {BQ_LOCATION}"
 )
@@ -0,0 +1,90 @@
+# tests/test_events.py
+# Ingestão incremental de eventos de ponta a ponta sobre fixtures locais (analise/fixtures.py)
+
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from analise.events import UNKNOWN_LANGUAGE, EventStore, RepoLanguages
+from analise.fixtures import event_file_name, generate_event_files
+
+START = "2015-01-01"
+EVENTS_PER_HOUR = 200
+
+
+def _hour(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc)
+
+
+def _expected_daily(paths) -> pd.DataFrame:
+    """Contagens por dia lidas direto dos .json.gz, para comparar com os agregados do store."""
+    rows = []
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                e = json.loads(line)
+                rows.append({"day": e["created_at"][:10], "type": e["type"],
+                             "commits": e["payload"].get("size", 0) if e["type"] == "PushEvent" else 0})
+    df = pd.DataFrame(rows)
+    return pd.DataFrame({
+        "events": df.groupby("day").size(),
+        "pushes": df[df["type"] == "PushEvent"].groupby("day").size(),
+        "commits": df.groupby("day")["commits"].sum(),
+    }).fillna(0).astype("int64").sort_index()
+
+
+def _actual_daily(store: EventStore) -> pd.DataFrame:
+    daily = store.read_daily()
+    out = daily.groupby(daily["day"].dt.strftime("%Y-%m-%d"))[["events", "pushes", "commits"]].sum()
+    return out.astype("int64").sort_index().rename_axis(None)
+
+
+@pytest.fixture
+def repo_languages():
+    # repos 0..99 da fixture de eventos com linguagem conhecida; o resto cai em UNKNOWN_LANGUAGE
+    names = [f"user{r % 9973}/repo-{r}" for r in range(100)]
+    return RepoLanguages(names, ["Python" if r % 2 else "Go" for r in range(100)])
+
+
+def test_ingest_then_new_hours_advances_watermark(tmp_path, repo_languages):
+    raw, store = str(tmp_path / "raw"), EventStore(str(tmp_path / "store"))
+    first = generate_event_files(raw, START, hours=30, events_per_hour=EVENTS_PER_HOUR)
+
+    summary = store.ingest(raw, repo_languages, chunk_lines=70, log=lambda msg: None)
+    assert summary["files"] == 30 and summary["late"] == 0
+    assert store.watermark() == _hour("2015-01-02T05:00")
+    pd.testing.assert_frame_equal(_actual_daily(store), _expected_daily(first), check_names=False)
+
+    all_paths = generate_event_files(raw, START, hours=48, events_per_hour=EVENTS_PER_HOUR)  # 18 horas novas
+    summary = store.ingest(raw, repo_languages, chunk_lines=70, log=lambda msg: None)
+    assert summary["files"] == 18
+    assert store.watermark() == _hour("2015-01-02T23:00")
+    assert store.state()["files"] == 48
+    pd.testing.assert_frame_equal(_actual_daily(store), _expected_daily(all_paths), check_names=False)
+
+    daily = store.read_daily()
+    assert {"Go", "Python", UNKNOWN_LANGUAGE} <= set(daily["language"])
+    assert store.ingest(raw, repo_languages, log=lambda msg: None)["files"] == 0  # nada pendente
+
+
+def test_late_file_is_ingested_and_counted(tmp_path, repo_languages):
+    raw, store = str(tmp_path / "raw"), EventStore(str(tmp_path / "store"))
+    paths = generate_event_files(raw, START, hours=10, events_per_hour=EVENTS_PER_HOUR)
+    late_path = os.path.join(raw, event_file_name(_hour("2015-01-01T03:00")))
+    os.remove(late_path)
+
+    store.ingest(raw, repo_languages, log=lambda msg: None)
+    assert store.watermark() == _hour("2015-01-01T09:00")
+
+    generate_event_files(raw, START, hours=10, events_per_hour=EVENTS_PER_HOUR)  # recria só a hora ausente
+    logged = []
+    summary = store.ingest(raw, repo_languages, log=logged.append)
+    assert summary["files"] == 1 and summary["late"] == 1
+    assert any("atrasado" in msg for msg in logged)
+    assert store.watermark() == _hour("2015-01-01T09:00")  # não volta no tempo
+    pd.testing.assert_frame_equal(_actual_daily(store), _expected_daily(paths), check_names=False)
+